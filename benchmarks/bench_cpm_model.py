@@ -0,0 +1,65 @@
+"""
+Memory / allocation comparison: nested-dict CPM frames vs ``CpmFrame``.
+
+    python benchmarks/bench_cpm_model.py --frames 2000 --objects 30
+"""
+import argparse
+import random
+import tracemalloc
+
+from advercpm.data.cpm_model import CpmFrame
+
+
+def synthetic_cpm(n_objects, rng):
+    vehicles = {
+        1000 + i: {
+            "angle": [0.0, rng.uniform(-180, 180), 0.0],
+            "center": [0.0, 0.0, rng.uniform(0.5, 1.0)],
+            "extent": [rng.uniform(2, 3), rng.uniform(0.9, 1.1), rng.uniform(0.7, 0.9)],
+            "location": [rng.uniform(-50, 50), rng.uniform(-50, 50), 0.03],
+            "speed": rng.uniform(0, 30),
+        }
+        for i in range(n_objects)
+    }
+    pose = [rng.uniform(-100, 100), rng.uniform(-100, 100), 1.9, 0.0, 12.0, 0.0]
+    return {"ego_speed": 18.0, "lidar_pose": pose, "true_ego_pos": list(pose), "vehicles": vehicles}
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    held = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(s.size_diff for s in stats)
+    blocks = sum(s.count_diff for s in stats)
+    return held, size, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--objects", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # fresh float objects per frame, as parse_yaml would produce
+    dicts, dict_bytes, dict_blocks = measure(
+        lambda: [synthetic_cpm(args.objects, rng) for _ in range(args.frames)]
+    )
+    frames, frame_bytes, frame_blocks = measure(
+        lambda: [CpmFrame.from_dict(d) for d in dicts]
+    )
+    assert all(f.to_dict() == d for f, d in zip(frames, dicts))
+
+    n = args.frames
+    print(f"[RESULT] {n} frames x {args.objects} objects")
+    print(f"[RESULT] dict     : {dict_bytes / n:9.0f} B/frame  {dict_blocks / n:7.1f} allocs/frame")
+    print(f"[RESULT] CpmFrame : {frame_bytes / n:9.0f} B/frame  {frame_blocks / n:7.1f} allocs/frame")
+    print(f"[RESULT] reduction: {dict_bytes / frame_bytes:.1f}x bytes, "
+          f"{dict_blocks / frame_blocks:.1f}x allocations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Point-cloud and geometry kernels: NumPy vs. the Numba backend (when installed).
+
+    python benchmarks/bench_kernels.py --points 100000 1000000 --boxes 32
+"""
+import argparse
+import time
+
+import numpy as np
+
+from advercpm.utils import kernels
+from advercpm.utils.geometry import points_in_boxes, segments_hit_boxes
+from advercpm.utils.math_utils import pose_to_matrix, transform_columns
+
+
+def random_cloud(n, rng):
+    cloud = np.zeros(n, dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("intensity", "<f4")])
+    cloud["x"], cloud["y"] = rng.uniform(-80, 80, size=(2, n))
+    cloud["z"] = rng.uniform(-2.0, 1.0, size=n)
+    return cloud
+
+
+def random_boxes(n, rng):
+    boxes = np.empty((n, 7))
+    boxes[:, 0:2] = rng.uniform(-60, 60, size=(n, 2))
+    boxes[:, 2] = -1.0
+    boxes[:, 3] = rng.uniform(-np.pi, np.pi, size=n)
+    boxes[:, 4:7] = rng.uniform([1.8, 0.8, 0.7], [2.6, 1.1, 0.9], size=(n, 3))
+    return boxes
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def run_kernels(cloud, boxes, rays, mat):
+    """{kernel: (result, seconds)} on the current backend (first call warms the JIT up)."""
+    def transform():
+        moved = cloud.copy()
+        transform_columns(moved["x"], moved["y"], moved["z"], mat)
+        return moved
+
+    origins = np.zeros((rays, 2))
+    targets = np.stack([cloud["x"][:rays], cloud["y"][:rays]], axis=1).astype(float)
+    calls = {
+        "transform": transform,
+        "crop to boxes": lambda: points_in_boxes(cloud["x"], cloud["y"], cloud["z"], boxes),
+        "ray casting": lambda: segments_hit_boxes(origins, targets, boxes[:, 0:2], boxes[:, 4:6], boxes[:, 3]),
+    }
+    return {name: timed(fn) for name, fn in calls.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--boxes", type=int, default=32, help="boxes to crop to / cast rays against")
+    parser.add_argument("--rays", type=int, default=100_000, help="rays cast (at most one per point)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    boxes = random_boxes(args.boxes, rng)
+    mat = pose_to_matrix(np.array([3.0, -2.0, 0.5, 0.5, 30.0, -1.0]))
+    backends = kernels.available_backends()
+    if "numba" not in backends:
+        print("[INFO] numba is not installed: NumPy backend only (pip install numba)")
+
+    for n in args.points:
+        cloud = random_cloud(n, rng)
+        rays = min(args.rays, n)
+        results = {}
+        for backend in backends:
+            with kernels.use_backend(backend):
+                run_kernels(cloud[:1000], boxes, min(rays, 1000), mat)      # JIT warm-up
+                results[backend] = run_kernels(cloud, boxes, rays, mat)
+
+        print(f"[RESULT] {n} points, {args.boxes} boxes, {rays} rays")
+        for name, (out, t_numpy) in results["numpy"].items():
+            line = f"[RESULT]   {name:<14}: numpy {t_numpy * 1e3:8.1f} ms"
+            if "numba" in results:
+                jit_out, t_numba = results["numba"][name]
+                np.testing.assert_array_equal(jit_out, out)
+                line += f" | numba {t_numba * 1e3:8.1f} ms ({t_numpy / t_numba:.1f}x)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
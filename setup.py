@@ -33,11 +33,16 @@ setup(
     extras_require={
         "dev": ["pytest", "black", "flake8", "pre-commit"],  # pip install .[dev]
         "docs": ["sphinx", "mkdocs"],
+        "zstd": ["zstandard"],  # compressed output shards
+        "jit": ["numba"],  # compiled point-cloud / geometry kernels
     },
     include_package_data=True,  # Uses MANIFEST.in
     entry_points={
         "console_scripts": [
             "advercpm-run=advercpm.simulation.runner:main",
+            "advercpm-serve=advercpm.simulation.service:main",
+            "advercpm-loadgen=advercpm.simulation.loadgen:main",
+            "advercpm-results=advercpm.simulation.warehouse:main",
         ],
     },
 
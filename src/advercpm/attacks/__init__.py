@@ -1,6 +1,8 @@
 import importlib
 from pathlib import Path
 
+from .base_attack import compile_params
+
 
 def snake_to_pascal(name: str) -> str:
     """Convert snake_case attack name to PascalCase for class lookup."""
@@ -41,7 +43,11 @@ def build_attack(cfg):
     """
 
     attack_cls = get_attack_class(cfg.type)
-    return attack_cls(cfg.parameters)
+    schema = getattr(attack_cls, "Params", None)
+    if schema is None:
+        return attack_cls(cfg.parameters)
+    # validated and compiled once; per-frame code reads plain attributes
+    return attack_cls(compile_params(schema, cfg.parameters, owner=cfg.type))
 
 
 def available_attacks():
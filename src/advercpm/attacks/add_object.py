@@ -1,37 +1,173 @@
-import math
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Tuple
+
+import numpy as np
+
+from advercpm.utils.geometry import (
+    box_corners_bev,
+    boxes_from_vehicles,
+    boxes_overlap_bev,
+    segments_hit_boxes,
+)
+from advercpm.utils.math_utils import local_to_world, vehicle_poses
+from .base_attack import accepts_cpm_frame, compile_params
+
+
+class Placement(Enum):
+    FIXED = "fixed"
+    OCCLUSION_AWARE = "occlusion_aware"
+
+
+@dataclass(frozen=True)
+class AddObjectParams:
+    ego_id: Any = None
+    malicious_id: Any = None
+    object_id: Any = 9999
+    distance_ahead: float = 10.0
+    vel: float = 0.0
+    extent: Tuple[float, ...] = (4.0, 2.0, 1.5)
+    placement: Placement = Placement.OCCLUSION_AWARE
+    search_steps: int = 5
+    step: float = 2.0
+    lateral_offsets: Tuple[float, ...] = (0.0, 3.5, -3.5)
+    clearance: float = 0.5
+    max_range: float = 70.0
+    min_visible_rays: int = 3
 
 
 class AddObjectAttack:
+    """
+    Add Object Attack:
+    Injects a fabricated vehicle in front of the ego.
+
+    Placement:
+        - fixed: ``distance_ahead`` along the ego heading.
+        - occlusion_aware: among candidates around that point (along and
+          across the ego heading), the first one the sending CAV's lidar
+          (``lidar_pose``) has line of sight to and that overlaps no reported
+          box. Nothing is injected in frames without such a position.
+
+    Parameters:
+        ego_id, malicious_id: ids of the ego and the attacker.
+        object_id (int): id of the fabricated vehicle. (default: 9999)
+        distance_ahead (float): preferred distance ahead of the ego (m). (default: 10.0)
+        vel (float): reported speed of the fake vehicle. (default: 0.0)
+        extent (list): half-extents of the fake vehicle. (default: [4.0, 2.0, 1.5])
+        placement (str): "fixed" or "occlusion_aware". (default: "occlusion_aware")
+        search_steps (int): candidates on each side of ``distance_ahead``. (default: 5)
+        step (float): spacing of those candidates (m). (default: 2.0)
+        lateral_offsets (list): lateral candidate offsets (m). (default: [0.0, 3.5, -3.5])
+        clearance (float): minimum gap to reported boxes (m). (default: 0.5)
+        max_range (float): maximum distance from the attacker (m). (default: 70.0)
+        min_visible_rays (int): unobstructed rays (center + 4 corners) required. (default: 3)
+    """
+
+    Params = AddObjectParams
+
     def __init__(self, params):
-        self.ego_id = params.get("ego_id")
-        self.object_id = params.get("object_id", 9999)
-        self.distance_ahead = params.get("distance_ahead", 10.0)
-        self.vel = params.get("vel", 0.0)
-        self.extent = params.get("extent", [4.0, 2.0, 1.5])
-        self.malicious_id = params.get("malicious_id")  # 👈 NEW
+        p = compile_params(AddObjectParams, params, "add_object")
+        self.ego_id = p.ego_id
+        self.object_id = p.object_id
+        self.distance_ahead = p.distance_ahead
+        self.vel = p.vel
+        self.extent = list(p.extent)
+        self.malicious_id = p.malicious_id  # 👈 NEW
+
+        self.fixed = p.placement is Placement.FIXED
+        self.search_steps = p.search_steps
+        self.step = p.step
+        self.lateral_offsets = list(p.lateral_offsets)
+        self.clearance = p.clearance
+        self.max_range = p.max_range
+        self.min_visible_rays = p.min_visible_rays
+        self.last_meta = None
+
+        # candidate offsets only depend on the parameters
+        self._offsets = self._candidates()
+
+    def _candidates(self) -> np.ndarray:
+        """(C, 3) offsets (along, lateral, 0) in ego frame, most preferred first."""
+        along = self.distance_ahead + self.step * np.arange(-self.search_steps, self.search_steps + 1)
+        along = along[along > 0]
+        grid = np.array([(a, lat, 0.0) for a in along for lat in self.lateral_offsets], dtype=float)
+        grid = grid.reshape(-1, 3)
+        cost = np.abs(grid[:, 0] - self.distance_ahead) + np.abs(grid[:, 1])
+        return grid[np.argsort(cost, kind="stable")]
+
+    def _plausible_center(self, vehicles, ego_pose: np.ndarray, origin: np.ndarray):
+        """First candidate box center visible from ``origin`` and collision-free, else None."""
+        cands = local_to_world(self._offsets, ego_pose)[:, :2]
+        yaw = np.radians(ego_pose[4])
+
+        fake_half = np.asarray(self.extent[:2], dtype=float)
+        fake_yaw = np.full(len(cands), yaw)
+
+        real = {k: v for k, v in vehicles.items() if k != self.object_id}
+        ids, centers, half, yaws = boxes_from_vehicles(real)
+        # broad phase: drop boxes whose bounding circle misses the region
+        # spanned by the attacker and all candidate boxes
+        pad = np.linalg.norm(fake_half) + self.clearance
+        lo = np.minimum(cands.min(axis=0), origin) - pad
+        hi = np.maximum(cands.max(axis=0), origin) + pad
+        radius = np.linalg.norm(half, axis=1, keepdims=True)
+        near = np.all((centers + radius >= lo) & (centers - radius <= hi), axis=1)
+        ids = [vid for vid, keep in zip(ids, near) if keep]
+        centers, half, yaws = centers[near], half[near], yaws[near]
+
+        overlap = boxes_overlap_bev(
+            cands, np.broadcast_to(fake_half + self.clearance, cands.shape), fake_yaw,
+            centers, half, yaws,
+        ).any(axis=1)
+
+        corners = box_corners_bev(cands, np.broadcast_to(fake_half, cands.shape), fake_yaw)
+        targets = np.concatenate([cands[:, None], corners], axis=1)          # (C, 5, 2)
+        occluder = np.array([vid != self.malicious_id for vid in ids], dtype=bool)
+        hits = segments_hit_boxes(
+            np.broadcast_to(origin, (targets.shape[0] * 5, 2)), targets.reshape(-1, 2),
+            centers[occluder], half[occluder], yaws[occluder],
+        ).any(axis=1).reshape(-1, 5)
+        visible = (~hits).sum(axis=1) >= self.min_visible_rays
+        in_range = np.linalg.norm(cands - origin, axis=1) <= self.max_range
+
+        ok = np.flatnonzero(~overlap & visible & in_range)
+        if not len(ok):
+            return None
+        return cands[ok[0]]
 
+    @accepts_cpm_frame
     def apply(self, cpm: dict) -> dict:
         vehicles = cpm.get("vehicles", {})
 
-        if self.ego_id not in vehicles or self.malicious_id not in vehicles:
-            return cpm  # only apply if both ego + malicious exist
+        if self.ego_id not in vehicles:
+            return cpm  # only apply if the ego is reported
 
         ego = vehicles[self.ego_id]
+        ego_pose = vehicle_poses(ego["location"], ego["angle"])
 
-        # Place fake object in front of ego
-        x, y, _ = ego["location"]
-        yaw = ego["angle"][1]
-        dx = self.distance_ahead * math.cos(yaw)
-        dy = self.distance_ahead * math.sin(yaw)
+        if self.fixed:
+            # Place fake object in front of ego
+            location = local_to_world([[self.distance_ahead, 0.0, 0.0]], ego_pose)[0]
+        else:
+            # rays start at the sender's own lidar: a CAV's CPM never lists itself
+            origin = np.asarray(cpm["lidar_pose"][:2], dtype=float)
+            center = self._plausible_center(vehicles, ego_pose, origin)
+            if center is None:
+                self.last_meta = {"placed": False}
+                return cpm
+            # candidates are box centers; shift back by the (rotated) box offset
+            offset = local_to_world([ego["center"]], ego_pose)[0] - ego_pose[:3]
+            location = center - offset[:2]
 
         fake_obj = {
             "angle": ego["angle"].copy(),  # inherit orientation
             "center": ego["center"].copy(),
-            "extent": self.extent,
-            "location": [x + dx, y + dy, ego["location"][2]],
+            "extent": list(self.extent),
+            "location": [float(location[0]), float(location[1]), ego["location"][2]],
             "speed": self.vel,
         }
 
         vehicles[self.object_id] = fake_obj
         cpm["vehicles"] = vehicles
+        self.last_meta = {"placed": True, "location": fake_obj["location"]}
         return cpm
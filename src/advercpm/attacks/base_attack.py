@@ -1,5 +1,119 @@
+import dataclasses
+import functools
+import typing
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from enum import Enum
+from typing import Dict, Any, Mapping, Optional
+
+from omegaconf import OmegaConf
+
+from advercpm.data.cpm_model import CpmFrame
+
+
+# ----------------------------
+# Parameter schemas
+# ----------------------------
+
+def _coerce(tp, value, name: str, owner: str):
+    """Convert one raw parameter value to the schema field type ``tp``."""
+    def fail():
+        label = getattr(tp, "__name__", None) or str(tp).replace("typing.", "")
+        return ValueError(f"{owner}: parameter '{name}' expects {label}, got {value!r}")
+
+    if tp is Any:
+        return value
+    origin = typing.get_origin(tp) if hasattr(typing, "get_origin") else getattr(tp, "__origin__", None)
+    args = getattr(tp, "__args__", ()) or ()
+    if origin is typing.Union:
+        if value is None and type(None) in args:
+            return None
+        inner = [a for a in args if a is not type(None)]
+        return _coerce(inner[0], value, name, owner)
+    if origin in (tuple, typing.Tuple):
+        if isinstance(value, (str, bytes)) or not hasattr(value, "__iter__"):
+            raise fail()
+        return tuple(_coerce(args[0], v, name, owner) for v in value)
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        if isinstance(value, tp):
+            return value
+        try:
+            return tp(str(value).lower())
+        except ValueError:
+            options = ", ".join(repr(m.value) for m in tp)
+            raise ValueError(f"{owner}: parameter '{name}' must be one of {options}, got {value!r}")
+    if tp is bool:
+        if isinstance(value, bool):
+            return value
+        raise fail()
+    if tp is int:
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or int(value) != value:
+            raise fail()
+        return int(value)
+    if tp is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise fail()
+        return float(value)
+    if tp is str:
+        if not isinstance(value, str):
+            raise fail()
+        return value
+    return value
+
+
+def compile_params(schema, raw: Optional[Mapping[str, Any]], owner: Optional[str] = None):
+    """
+    Validate raw attack parameters and compile them into a ``schema`` instance.
+
+    ``schema`` is a frozen dataclass; its optional ``ALIASES`` class
+    attribute maps legacy names to field names. Values are converted to the
+    field types (enums from their lower-case value). Unknown keys and
+    values of the wrong type raise ``ValueError``. Already compiled
+    parameters are returned unchanged.
+    """
+    if isinstance(raw, schema):
+        return raw
+    owner = owner or schema.__qualname__.split(".")[0]
+    if raw is None:
+        raw = {}
+    elif OmegaConf.is_config(raw):
+        raw = OmegaConf.to_container(raw, resolve=True)
+    raw = dict(raw)
+
+    for old, new in getattr(schema, "ALIASES", {}).items():
+        if old in raw:
+            if new in raw:
+                raise ValueError(f"{owner}: give either '{new}' or its alias '{old}', not both")
+            raw[new] = raw.pop(old)
+
+    fields = {f.name: f for f in dataclasses.fields(schema) if f.init}
+    unknown = [k for k in raw if k not in fields]
+    if unknown:
+        raise ValueError(
+            f"{owner}: unknown parameter(s) {', '.join(map(repr, unknown))}.\n"
+            f"Accepted parameters: {', '.join(fields)}"
+        )
+    hints = typing.get_type_hints(schema)
+    return schema(**{k: _coerce(hints[k], v, k, owner) for k, v in raw.items()})
+
+
+def accepts_cpm_frame(apply):
+    """
+    Let an attack's ``apply`` take a :class:`CpmFrame` as well as a dict.
+
+    Attacks defining ``apply_frame`` handle frames natively (vectorized);
+    the others run on the dict form and the result is packed back.
+    """
+
+    @functools.wraps(apply)
+    def wrapper(self, cpm):
+        if isinstance(cpm, CpmFrame):
+            native = getattr(self, "apply_frame", None)
+            if native is not None:
+                return native(cpm)
+            return CpmFrame.from_dict(apply(self, cpm.to_dict()))
+        return apply(self, cpm)
+
+    return wrapper
 
 
 class Attack(ABC):
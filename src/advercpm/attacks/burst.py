@@ -1,5 +1,16 @@
 import numpy as np
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, ClassVar
+from .base_attack import accepts_cpm_frame, compile_params
+
+
+@dataclass(frozen=True)
+class BurstParams:
+    rate: float = 0.2
+    max_jitter: float = 5.0
+
+    # "lambda" is the documented key but not a valid field name
+    ALIASES: ClassVar[Dict[str, str]] = {"lambda": "rate"}
 
 
 class BurstAttack:
@@ -9,10 +20,14 @@ class BurstAttack:
     in vehicle positions (Poisson-distributed).
     """
 
+    Params = BurstParams
+
     def __init__(self, params: Dict[str, Any]):
-        self.lambda_ = params.get("lambda", 0.2)  # Poisson rate
-        self.max_jitter = params.get("max_jitter", 5.0)  # meters
+        p = compile_params(BurstParams, params, "burst")
+        self.lambda_ = p.rate  # Poisson rate
+        self.max_jitter = p.max_jitter  # meters
 
+    @accepts_cpm_frame
     def apply(self, cpm: dict) -> dict:
         vehicles = cpm.get("vehicles", {})
 
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict
+
+from advercpm.data.cpm_model import CpmFrame
+from advercpm.data.frame_buffer import FrameRingBuffer
+from .base_attack import Attack, accepts_cpm_frame, compile_params
+
+
+class Scope(Enum):
+    OBJECTS = "objects"
+    MESSAGE = "message"
+
+
+@dataclass(frozen=True)
+class DelayParams:
+    delay_frames: int = 10
+    scope: Scope = Scope.OBJECTS
+
+    def __post_init__(self):
+        if self.delay_frames < 0:
+            raise ValueError(f"DelayAttack: delay_frames must be >= 0, got {self.delay_frames}")
+
+
+class DelayAttack(Attack):
+    """
+    Delay Attack:
+    Sends, at every frame, the content of the frame ``delay_frames`` earlier.
+
+    Scopes:
+        - objects: current header (poses, speeds) with the stale object list,
+          i.e. outdated perception presented as fresh.
+        - message: the whole stale message.
+
+    Until ``delay_frames`` frames have been seen, the oldest frame available
+    is sent (the stream freezes at its first frame and then lags behind).
+
+    Parameters:
+        delay_frames (int): delay in frames. (default: 10)
+        scope (str): "objects" or "message". (default: "objects")
+    """
+
+    Params = DelayParams
+
+    def __init__(self, parameters: Dict[str, Any]):
+        p = compile_params(DelayParams, parameters, "delay")
+        super().__init__(p)
+        self.delay_frames: int = p.delay_frames
+        self.keep_header: bool = p.scope is Scope.OBJECTS
+        self.buffer = FrameRingBuffer(self.delay_frames + 1)
+        self.last_meta = None
+
+    @accepts_cpm_frame
+    def apply(self, cpm_frame: Dict[str, Any]) -> Dict[str, Any]:
+        return self.apply_frame(CpmFrame.from_dict(cpm_frame)).to_dict()
+
+    def apply_frame(self, frame: CpmFrame) -> CpmFrame:
+        self.buffer.push(frame)
+        lag = min(self.delay_frames, len(self.buffer) - 1)
+        stale = self.buffer.get(lag)
+        if self.keep_header:
+            stale.meta = frame.meta
+        self.last_meta = {"lag_frames": lag}
+        return stale
@@ -3,8 +3,61 @@ from __future__ import annotations
 import math
 import numpy as np
 from collections import defaultdict
-from typing import Dict, Any, Iterable
-from .base_attack import Attack
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, ClassVar, Iterable, Tuple
+from advercpm.data.cpm_model import CpmFrame
+from advercpm.utils.math_utils import euler_to_rotation
+from .base_attack import Attack, accepts_cpm_frame, compile_params
+
+
+_DIRECTION_VECTORS = {
+    "N": (0.0, 1.0),
+    "S": (0.0, -1.0),
+    "E": (1.0, 0.0),
+    "W": (-1.0, 0.0),
+    "NE": (math.sqrt(0.5), math.sqrt(0.5)),
+    "NW": (-math.sqrt(0.5), math.sqrt(0.5)),
+    "SE": (math.sqrt(0.5), -math.sqrt(0.5)),
+    "SW": (-math.sqrt(0.5), -math.sqrt(0.5)),
+}
+
+
+class DriftMode(Enum):
+    LINEAR = "linear"
+    BIASED = "biased"
+
+
+class Reference(Enum):
+    WORLD = "world"
+    EGO = "ego"
+
+
+@dataclass(frozen=True)
+class DriftParams:
+    drift_rate: float = 0.5
+    direction: str = "NE"
+    reference: Reference = Reference.WORLD
+    apply_to_all: bool = True
+    target_id: Any = None
+    yaw_drift_deg_per_frame: float = 0.0
+    mode: DriftMode = DriftMode.LINEAR
+    sigma: float = 0.1
+    # derived: unit drift direction (dx, dy)
+    vector: Tuple[float, float] = field(init=False)
+
+    # legacy name of yaw_drift_deg_per_frame (the drift was always per frame)
+    ALIASES: ClassVar[Dict[str, str]] = {"yaw_drift_deg_per_s": "yaw_drift_deg_per_frame"}
+
+    def __post_init__(self):
+        direction = self.direction.upper()
+        if direction not in _DIRECTION_VECTORS:
+            raise ValueError(
+                f"DriftAttack: unknown direction {self.direction!r} "
+                f"(expected one of {', '.join(_DIRECTION_VECTORS)})"
+            )
+        object.__setattr__(self, "direction", direction)
+        object.__setattr__(self, "vector", _DIRECTION_VECTORS[direction])
 
 
 class DriftAttack(Attack):
@@ -19,6 +72,8 @@ class DriftAttack(Attack):
     Parameters:
         drift_rate (float): drift speed (meters per frame).
         direction (str): cardinal direction (N, S, E, W, NE, NW, SE, SW).
+        reference (str): "world" (default) or "ego"; with "ego", N is the
+            sender's heading and E its +y axis, taken from ``lidar_pose``.
         apply_to_all (bool): if True, apply drift to all vehicles. (default: True)
         target_id: single vehicle id to target (ignored if apply_to_all=True).
         yaw_drift_deg_per_frame (float): optional yaw drift per frame.
@@ -26,33 +81,24 @@ class DriftAttack(Attack):
         sigma (float): noise std deviation for biased mode.
     """
 
-    _DIRECTION_VECTORS = {
-        "N": (0.0, 1.0),
-        "S": (0.0, -1.0),
-        "E": (1.0, 0.0),
-        "W": (-1.0, 0.0),
-        "NE": (math.sqrt(0.5), math.sqrt(0.5)),
-        "NW": (-math.sqrt(0.5), math.sqrt(0.5)),
-        "SE": (math.sqrt(0.5), -math.sqrt(0.5)),
-        "SW": (-math.sqrt(0.5), -math.sqrt(0.5)),
-    }
+    Params = DriftParams
 
     def __init__(self, parameters: Dict[str, Any]):
-        super().__init__(parameters)
-        self.drift_rate: float = float(parameters.get("drift_rate", 0.5))
-        direction = str(parameters.get("direction", "NE")).upper()
-        self.dx, self.dy = self._DIRECTION_VECTORS.get(direction, (0.0, 0.0))
+        p = compile_params(DriftParams, parameters, "drift")
+        super().__init__(p)
+        self.drift_rate: float = p.drift_rate
+        self.dx, self.dy = p.vector
+        self.ego_reference: bool = p.reference is Reference.EGO
 
         # FIX: default to all vehicles unless explicitly narrowed
-        self.apply_to_all: bool = bool(parameters.get("apply_to_all", True))
-        self.target_id = parameters.get("target_id", None)
+        self.apply_to_all: bool = p.apply_to_all
+        self.target_id = p.target_id
 
         # Naming clarified: per *frame*
-        self.yaw_drift_per_frame: float = float(parameters.get("yaw_drift_deg_per_frame",
-                                                               parameters.get("yaw_drift_deg_per_s", 0.0)))
+        self.yaw_drift_per_frame: float = p.yaw_drift_deg_per_frame
 
-        self.mode: str = str(parameters.get("mode", "linear")).lower()
-        self.sigma: float = float(parameters.get("sigma", 0.1))
+        self.biased: bool = p.mode is DriftMode.BIASED
+        self.sigma: float = p.sigma
 
         # Each vehicle keeps its own drift counter across frames
         self.vehicle_steps = defaultdict(int)
@@ -95,16 +141,25 @@ class DriftAttack(Attack):
         if isinstance(ang, dict) and "yaw" in ang:
             ang["yaw"] = float(ang["yaw"]) + yaw_delta
             return
-        # list/tuple format; try to treat index 2 as yaw if present, else index 1 (legacy)
+        # list/tuple format: [roll, yaw, pitch] (OPV2V)
         if isinstance(ang, tuple):
             ang = list(ang)
             vehicle["angle"] = ang
-        if isinstance(ang, list):
-            if len(ang) >= 3:
-                ang[2] = float(ang[2]) + yaw_delta
-            elif len(ang) >= 2:
-                ang[1] = float(ang[1]) + yaw_delta
-
+        if isinstance(ang, list) and len(ang) >= 2:
+            ang[1] = float(ang[1]) + yaw_delta
+
+    def _direction(self, cpm_meta: Dict[str, Any]):
+        """Unit drift direction in world coordinates."""
+        if not self.ego_reference:
+            return self.dx, self.dy
+        pose = cpm_meta.get("lidar_pose")
+        if pose is None or len(pose) < 6:
+            return self.dx, self.dy
+        # N/E map to the sender's forward (+x) / right (+y) axes
+        world = euler_to_rotation(pose[3:6]) @ np.array([self.dy, self.dx, 0.0])
+        return float(world[0]), float(world[1])
+
+    @accepts_cpm_frame
     def apply(self, cpm_frame: Dict[str, Any]) -> Dict[str, Any]:
         vehicles = cpm_frame.get("vehicles", {})
         if not vehicles:
@@ -114,6 +169,7 @@ class DriftAttack(Attack):
         if not target_ids:
             # No valid targets; do nothing
             return cpm_frame
+        dx, dy = self._direction(cpm_frame)
 
         for vid in target_ids:
             if vid not in vehicles:
@@ -124,10 +180,10 @@ class DriftAttack(Attack):
             step = self.vehicle_steps[vid]
 
             # compute drift (cumulative over frames)
-            base_shift_x = self.dx * self.drift_rate * step
-            base_shift_y = self.dy * self.drift_rate * step
+            base_shift_x = dx * self.drift_rate * step
+            base_shift_y = dy * self.drift_rate * step
 
-            if self.mode == "biased":
+            if self.biased:
                 shift_x = base_shift_x + np.random.normal(0.0, self.sigma)
                 shift_y = base_shift_y + np.random.normal(0.0, self.sigma)
             else:
@@ -138,3 +194,31 @@ class DriftAttack(Attack):
             self._apply_yaw_drift(vehicle, self.yaw_drift_per_frame)
 
         return cpm_frame
+
+    def apply_frame(self, frame: CpmFrame) -> CpmFrame:
+        """
+        Vectorized :meth:`apply` for a :class:`CpmFrame`.
+
+        Produces the same result (and random draws) as the dict path.
+        """
+        if frame.irregular:
+            return CpmFrame.from_dict(self.apply(frame.to_dict()))
+
+        target_ids = self._select_targets(dict.fromkeys(frame.ids))
+        if not target_ids:
+            return frame
+
+        rows = np.array([frame.row_of(vid) for vid in target_ids], dtype=np.int64)
+        steps = np.empty(len(target_ids))
+        for k, vid in enumerate(target_ids):
+            self.vehicle_steps[vid] += 1
+            steps[k] = self.vehicle_steps[vid]
+
+        shift = steps[:, None] * (np.array(self._direction(frame.meta)) * self.drift_rate)
+        if self.biased:
+            shift += np.random.normal(0.0, self.sigma, size=shift.shape)
+
+        frame.data[rows, 0:2] += shift
+        if abs(self.yaw_drift_per_frame) >= 1e-12:
+            frame.data[rows, 4] += self.yaw_drift_per_frame
+        return frame
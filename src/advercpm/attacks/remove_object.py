@@ -1,6 +1,20 @@
 # src/advercpm/attacks/remove_object.py
-from .base_attack import Attack
+from .base_attack import Attack, accepts_cpm_frame, compile_params
 import random
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+
+class RemoveMode(Enum):
+    TARGETED = "targeted"
+    RANDOM = "random"
+
+
+@dataclass(frozen=True)
+class RemoveObjectParams:
+    omitted_id: Any = None
+    mode: RemoveMode = RemoveMode.TARGETED
 
 
 class RemoveObjectAttack(Attack):
@@ -10,11 +24,15 @@ class RemoveObjectAttack(Attack):
     - Random mode: remove one randomly chosen vehicle (not ego)
     """
 
+    Params = RemoveObjectParams
+
     def __init__(self, params):
-        super().__init__(params)
-        self.omitted_id = params.get("omitted_id", None)
-        self.mode = params.get("mode", "targeted")
+        p = compile_params(RemoveObjectParams, params, "remove_object")
+        super().__init__(p)
+        self.omitted_id = p.omitted_id
+        self.mode = p.mode
 
+    @accepts_cpm_frame
     def apply(self, cpm: dict) -> dict:
         vehicles = cpm.get("vehicles", {})
 
@@ -22,10 +40,10 @@ class RemoveObjectAttack(Attack):
             return cpm
 
         removed_id = None
-        if self.mode == "targeted" and self.omitted_id in vehicles:
+        if self.mode is RemoveMode.TARGETED and self.omitted_id in vehicles:
             removed_id = self.omitted_id
             vehicles.pop(removed_id, None)
-        elif self.mode == "random":
+        elif self.mode is RemoveMode.RANDOM:
             choices = list(vehicles.keys())
             if choices:
                 removed_id = random.choice(choices)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from advercpm.data.cpm_model import CpmFrame
+from advercpm.data.frame_buffer import FrameRingBuffer
+from .base_attack import Attack, accepts_cpm_frame, compile_params
+from .delay import Scope
+
+
+@dataclass(frozen=True)
+class ReplayParams:
+    record_frames: int = 20
+    start_frame: Optional[int] = None
+    loop: bool = True
+    scope: Scope = Scope.OBJECTS
+
+    def __post_init__(self):
+        if self.record_frames < 1:
+            raise ValueError(f"ReplayAttack: record_frames must be >= 1, got {self.record_frames}")
+
+
+class ReplayAttack(Attack):
+    """
+    Replay Attack:
+    Records a window of genuine frames, then sends them again instead of the
+    live ones.
+
+    The ``record_frames`` frames right before ``start_frame`` are kept; from
+    ``start_frame`` on they are replayed oldest first, cyclically if ``loop``
+    (otherwise live frames pass through once the window is exhausted).
+
+    Scopes:
+        - objects: current header (poses, speeds) with the replayed object list.
+        - message: the whole recorded message.
+
+    Parameters:
+        record_frames (int): length of the recorded window. (default: 20)
+        start_frame (int): index of the first replaced frame. (default: record_frames)
+        loop (bool): replay the window repeatedly. (default: True)
+        scope (str): "objects" or "message". (default: "objects")
+    """
+
+    Params = ReplayParams
+
+    def __init__(self, parameters: Dict[str, Any]):
+        p = compile_params(ReplayParams, parameters, "replay")
+        super().__init__(p)
+        self.record_frames: int = p.record_frames
+        self.start_frame: int = self.record_frames if p.start_frame is None else p.start_frame
+        self.loop: bool = p.loop
+        self.keep_header: bool = p.scope is Scope.OBJECTS
+        self.buffer = FrameRingBuffer(self.record_frames)
+        self.frame_index = 0
+        self.last_meta = None
+
+    @accepts_cpm_frame
+    def apply(self, cpm_frame: Dict[str, Any]) -> Dict[str, Any]:
+        return self.apply_frame(CpmFrame.from_dict(cpm_frame)).to_dict()
+
+    def apply_frame(self, frame: CpmFrame) -> CpmFrame:
+        index = self.frame_index
+        self.frame_index += 1
+        if index < self.start_frame:
+            self.buffer.push(frame)
+            self.last_meta = None
+            return frame
+
+        recorded = len(self.buffer)
+        k = index - self.start_frame
+        if recorded == 0 or (not self.loop and k >= recorded):
+            self.last_meta = None
+            return frame
+
+        position = k % recorded
+        replayed = self.buffer.get(recorded - 1 - position)
+        if self.keep_header:
+            replayed.meta = frame.meta
+        self.last_meta = {"replayed_frame": self.start_frame - recorded + position}
+        return replayed
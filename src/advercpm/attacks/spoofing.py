@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from advercpm.data.lidar_reader import DEFAULT_CHUNK_POINTS
+from advercpm.utils.math_utils import (
+    euler_to_rotation, invert_transform, pose_to_matrix, rotation_to_euler, vehicle_poses,
+)
+from .base_attack import Attack, accepts_cpm_frame, compile_params
+from .drift import Reference
+
+
+class Anchor(Enum):
+    WORLD = "world"
+    SENSOR = "sensor"
+
+
+@dataclass(frozen=True)
+class SpoofingParams:
+    offset: Tuple[float, ...] = (2.0, 0.0, 0.0)
+    yaw_offset_deg: float = 0.0
+    reference: Reference = Reference.EGO
+    start_frame: int = 0
+    ramp_frames: int = 0
+    anchor: Anchor = Anchor.WORLD
+    pose_fields: Tuple[str, ...] = ("lidar_pose", "true_ego_pos", "predicted_ego_pos")
+    chunk_points: int = DEFAULT_CHUNK_POINTS
+
+    def __post_init__(self):
+        if len(self.offset) not in (2, 3):
+            raise ValueError(f"SpoofingAttack: offset must be [dx, dy] or [dx, dy, dz], got {self.offset}")
+        if len(self.offset) == 2:
+            object.__setattr__(self, "offset", tuple(self.offset) + (0.0,))
+        if self.start_frame < 0 or self.ramp_frames < 0:
+            raise ValueError("SpoofingAttack: start_frame and ramp_frames must be >= 0")
+        if self.chunk_points < 1:
+            raise ValueError(f"SpoofingAttack: chunk_points must be >= 1, got {self.chunk_points}")
+
+
+class SpoofingAttack(Attack):
+    """
+    Pose Spoofing Attack:
+    Reports a false pose for the sending CAV and keeps its point cloud
+    consistent with it.
+
+    The claimed pose is the ``lidar_pose`` moved by ``offset`` and turned by
+    ``yaw_offset_deg``; the same rigid transform is applied to every field
+    of ``pose_fields``.
+
+    Anchors:
+        - world: the scene stays where it is. Objects (world coordinates)
+          are untouched and the point cloud is re-expressed in the claimed
+          sensor frame, as if it had been captured there.
+        - sensor: the whole perception moves with the claimed pose. Objects
+          are moved by the same transform; the point cloud (sensor frame)
+          is unchanged.
+
+    The point cloud transform of the last frame is exposed as
+    ``point_cloud_transform`` (None when nothing changes); the runner
+    streams the frame's ``.pcd`` through it, ``chunk_points`` at a time.
+
+    Parameters:
+        offset (list): [dx, dy(, dz)] of the claimed position (m). (default: [2.0, 0.0, 0.0])
+        yaw_offset_deg (float): heading offset of the claimed pose. (default: 0.0)
+        reference (str): "ego" (offset along the sensor axes) or "world". (default: "ego")
+        start_frame (int): first spoofed frame. (default: 0)
+        ramp_frames (int): frames over which the offset grows to full size (0 = at once). (default: 0)
+        anchor (str): "world" or "sensor". (default: "world")
+        pose_fields (list): pose entries moved. (default: [lidar_pose, true_ego_pos, predicted_ego_pos])
+        chunk_points (int): points per streamed point cloud chunk. (default: 1048576)
+    """
+
+    Params = SpoofingParams
+
+    def __init__(self, parameters: Dict[str, Any]):
+        p = compile_params(SpoofingParams, parameters, "spoofing")
+        super().__init__(p)
+        self.offset = np.asarray(p.offset, dtype=float)
+        self.yaw_offset: float = p.yaw_offset_deg
+        self.ego_reference: bool = p.reference is Reference.EGO
+        self.start_frame: int = p.start_frame
+        self.ramp_frames: int = p.ramp_frames
+        self.move_objects: bool = p.anchor is Anchor.SENSOR
+        self.pose_fields = p.pose_fields
+        self.chunk_points: int = p.chunk_points
+        self.frame_index = 0
+        self.point_cloud_transform: Optional[np.ndarray] = None
+        self.last_meta = None
+
+    def _strength(self, index: int) -> float:
+        k = index - self.start_frame
+        if k < 0:
+            return 0.0
+        return 1.0 if self.ramp_frames == 0 else min(1.0, (k + 1) / self.ramp_frames)
+
+    def world_transform(self, lidar_pose, strength: float = 1.0) -> np.ndarray:
+        """(4, 4) world-frame transform taking the true sensor pose to the claimed one."""
+        pose = np.asarray(lidar_pose, dtype=float)
+        shift = strength * self.offset
+        if self.ego_reference:
+            shift = euler_to_rotation(pose[3:6]) @ shift
+        claimed = pose.copy()
+        claimed[:3] += shift
+        claimed[4] += strength * self.yaw_offset
+        return pose_to_matrix(claimed) @ invert_transform(pose_to_matrix(pose))
+
+    @accepts_cpm_frame
+    def apply(self, cpm_frame: Dict[str, Any]) -> Dict[str, Any]:
+        strength = self._strength(self.frame_index)
+        self.frame_index += 1
+        lidar_pose = cpm_frame.get("lidar_pose")
+        if strength == 0.0 or lidar_pose is None or len(lidar_pose) < 6:
+            self.point_cloud_transform = None
+            self.last_meta = None
+            return cpm_frame
+
+        delta = self.world_transform(lidar_pose, strength)
+        for name in self.pose_fields:
+            pose = cpm_frame.get(name)
+            if pose is not None and len(pose) >= 6:
+                cpm_frame[name] = _moved_poses(delta, np.asarray(pose[:6], dtype=float)).tolist()
+
+        if self.move_objects:
+            self.point_cloud_transform = None
+            vehicles = cpm_frame.get("vehicles") or {}
+            ids = [vid for vid, v in vehicles.items() if "location" in v]
+            if ids:
+                poses = vehicle_poses([vehicles[vid]["location"][:3] for vid in ids],
+                                      [vehicles[vid].get("angle", [0.0, 0.0, 0.0])[:3] for vid in ids])
+                moved = _moved_poses(delta, poses)
+                for vid, row in zip(ids, moved):
+                    vehicles[vid]["location"] = row[:3].tolist()
+                    if "angle" in vehicles[vid]:
+                        vehicles[vid]["angle"] = row[3:6].tolist()
+        else:
+            # sensor frame of the claimed pose: T(claimed)^-1 T(true) = T(true)^-1 delta^-1 T(true)
+            true = pose_to_matrix(np.asarray(lidar_pose[:6], dtype=float))
+            self.point_cloud_transform = invert_transform(delta @ true) @ true
+
+        self.last_meta = {"strength": strength, "lidar_pose": cpm_frame.get("lidar_pose")}
+        return cpm_frame
+
+
+def _moved_poses(delta: np.ndarray, poses: np.ndarray) -> np.ndarray:
+    """Apply a (4, 4) world transform to (..., 6) ``[x, y, z, roll, yaw, pitch]`` poses."""
+    mats = delta @ pose_to_matrix(poses)
+    return np.concatenate([mats[..., :3, 3], rotation_to_euler(mats[..., :3, :3])], axis=-1)
@@ -1,5 +1,14 @@
 import numpy as np
+from dataclasses import dataclass
 from typing import Dict, Any
+from advercpm.data.cpm_model import CpmFrame
+from .base_attack import accepts_cpm_frame, compile_params
+
+
+@dataclass(frozen=True)
+class WhiteNoiseParams:
+    sigma: float = 0.5
+    apply_velocity: bool = False
 
 
 class WhiteNoiseAttack:
@@ -8,10 +17,14 @@ class WhiteNoiseAttack:
     Adds zero-mean Gaussian noise to vehicle positions (and optionally velocity).
     """
 
+    Params = WhiteNoiseParams
+
     def __init__(self, params: Dict[str, Any]):
-        self.sigma = params.get("sigma", 0.5)  # meters
-        self.apply_velocity = params.get("apply_velocity", False)
+        p = compile_params(WhiteNoiseParams, params, "white_noise")
+        self.sigma = p.sigma  # meters
+        self.apply_velocity = p.apply_velocity
 
+    @accepts_cpm_frame
     def apply(self, cpm: dict) -> dict:
         vehicles = cpm.get("vehicles", {})
 
@@ -26,3 +39,21 @@ class WhiteNoiseAttack:
                 v["speed"] = float(v["speed"] + np.random.normal(0, self.sigma))
 
         return cpm
+
+    def apply_frame(self, frame: CpmFrame) -> CpmFrame:
+        """
+        Vectorized :meth:`apply` for a :class:`CpmFrame`.
+
+        Draws the same random numbers in the same order as the dict path.
+        """
+        if frame.irregular:
+            return CpmFrame.from_dict(self.apply(frame.to_dict()))
+
+        width = 4 if self.apply_velocity else 3
+        noise = np.random.normal(0, self.sigma, size=(len(frame), width))
+        loc = frame.location
+        loc += noise[:, :3]
+        if self.apply_velocity:
+            speed = frame.speed
+            speed += noise[:, 3]
+        return frame
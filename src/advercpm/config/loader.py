@@ -20,12 +20,26 @@ class DataCfg:
     overwrite: bool = False
     allow_missing_frames: bool = False
     file_extensions: List[str] = field(default_factory=lambda: ["yaml", "pcd"])
+    output_mode: str = "files"          # "files" or "sharded"
+    shard_size_mb: int = 1024           # start a new shard past this size
+    shard_compression: Optional[str] = None  # null or "zstd" (per member)
+    scenario_index: bool = True         # list scenarios through their .scenario_index.json sidecar
 
 
 @dataclass
 class AttackCfg:
     type: str = "unset"
     parameters: Dict[str, Any] = field(default_factory=dict)
+    schedule: Dict[str, Any] = field(default_factory=dict)  # when it runs (empty = every frame)
+
+
+@dataclass
+class AttackersCfg:
+    select: str = "last"               # "last", "ids", "fraction" or "all" (never the ego)
+    ids: List[int] = field(default_factory=list)  # select == "ids"
+    fraction: float = 0.5              # select == "fraction": share of the non-ego CAVs
+    coordinated: bool = False          # all attackers run `attack`, seeded alike (identical draws)
+    attacks: Dict[int, Any] = field(default_factory=dict)  # per-CAV {type, parameters, schedule}, by vehicle id
 
 
 @dataclass
@@ -34,6 +48,7 @@ class SimulationCfg:
     shuffle: bool = False
     max_frames: Optional[int] = None
     num_workers: int = 0                # data-loading workers (0 = main thread)
+    prefetch_factor: int = 2            # batches in flight per worker
     device: str = "cpu"                 # "cpu" or "cuda"
     visualization: bool = False
     save_visualization: bool = False
@@ -47,6 +62,91 @@ class EvaluationCfg:
     save_results: bool = True
     results_path: str = "./experiments/results"
     per_frame_csv: bool = True
+    warehouse: bool = True             # append runs to <results_path>/warehouse.sqlite
+    warehouse_journal: str = "delete"  # SQLite journal: "delete" (any storage) or "wal" (local disks only)
+
+
+@dataclass
+class DetectionCfg:
+    gate: float = 3.0                  # association gate (m)
+    drift_threshold: float = 1.0       # residual flagged as drift (m)
+    sensing_range: float = 70.0        # CAV perception radius (m)
+    self_radius: float = 2.5           # objects this close to a CAV are the CAV itself
+    min_witnesses: int = 1
+    min_support: int = 1
+    chunk_size: int = 64               # frames per vectorized chunk
+
+
+@dataclass
+class FusionCfg:
+    enabled: bool = True               # score late fusion of all CPMs in every evaluation run
+    gate: float = 2.0                  # association gate between a cluster and a report (m)
+    min_support: int = 1               # CAVs that must report an object for it to be kept
+    eval_gate: float = 2.0             # gate when matching fused to true objects (m)
+    eval_min_iou: float = 0.0          # 3D IoU a fused/true match also needs (0 = distance only)
+    chunk_size: int = 64               # frames per vectorized chunk
+
+
+@dataclass
+class CpmGenerationCfg:
+    enabled: bool = False              # drop objects the CPM generation rules would not send
+    position_threshold: float = 4.0    # m
+    speed_threshold: float = 1.8       # dataset speed unit (OPV2V km/h; 1.8 = 0.5 m/s)
+    heading_threshold: float = 4.0     # deg
+    max_interval: float = 1.0          # s; objects are re-sent at least this often
+    frame_period: float = 0.1          # s between frames
+
+
+@dataclass
+class ServiceCfg:
+    host: str = "127.0.0.1"
+    port: int = 8765
+    unix_socket: Optional[str] = None  # listen on a Unix socket instead of TCP
+    max_message_bytes: int = 16 * 1024 * 1024
+    stats_interval: float = 30.0       # seconds between latency log lines (0 = off)
+
+
+@dataclass
+class SearchCfg:
+    parameters: Dict[str, Any] = field(default_factory=dict)  # name -> [low, high]
+    metric: str = "trajectory_divergence"
+    target: float = 1.0                # smallest effect that counts as "effective"
+    method: str = "auto"               # "auto", "bisection", "successive_halving"
+    tolerance: float = 0.01            # bisection stops below this bracket width
+    max_evals: int = 64
+    n_workers: int = 4                 # parallel evaluations
+    candidates: int = 16               # successive halving: initial candidates
+    halving_rate: int = 2              # successive halving: keep 1/halving_rate
+    seed: int = 0
+    cache_dir: Optional[str] = "./experiments/cache/search"
+    vehicle_id: Optional[int] = None   # attacked vehicle (default: largest id)
+
+
+@dataclass
+class CheckpointCfg:
+    enabled: bool = False              # periodic checkpoints of attack state and progress
+    every_frames: int = 500            # frames between checkpoints
+    resume: bool = False               # continue from the checkpoint (--resume)
+
+
+@dataclass
+class QueueCfg:
+    path: Optional[str] = None         # queue directory on storage shared by all nodes
+    lease_seconds: float = 600.0       # a silent worker loses its item after this long
+    heartbeat_seconds: Optional[float] = None  # lease renewal period (default: lease / 4)
+    max_attempts: int = 3              # failed/expired runs before an item is given up
+    poll_interval: float = 10.0        # s between polls while other nodes hold leases
+
+
+@dataclass
+class ProfilingCfg:
+    cprofile: bool = False             # dump <name>.prof per process
+    tracemalloc: bool = False          # allocation snapshots at stage boundaries
+    tracemalloc_frames: int = 1        # traceback depth kept per allocation
+    top_n: int = 20                    # allocation sites listed per snapshot
+    sampler: bool = False              # periodic stack sampler (collapsed stacks)
+    sample_interval: float = 0.01      # seconds between samples
+    output_dir: Optional[str] = None   # default: the run's log directory
 
 
 @dataclass
@@ -109,8 +209,17 @@ class RootCfg:
     experiment: ExperimentCfg = field(default_factory=ExperimentCfg)
     data: DataCfg = field(default_factory=DataCfg)
     attack: AttackCfg = field(default_factory=AttackCfg)
+    attackers: AttackersCfg = field(default_factory=AttackersCfg)
     simulation: SimulationCfg = field(default_factory=SimulationCfg)
     evaluation: EvaluationCfg = field(default_factory=EvaluationCfg)
+    detection: DetectionCfg = field(default_factory=DetectionCfg)
+    fusion: FusionCfg = field(default_factory=FusionCfg)
+    cpm_generation: CpmGenerationCfg = field(default_factory=CpmGenerationCfg)
+    service: ServiceCfg = field(default_factory=ServiceCfg)
+    search: SearchCfg = field(default_factory=SearchCfg)
+    queue: QueueCfg = field(default_factory=QueueCfg)
+    checkpoint: CheckpointCfg = field(default_factory=CheckpointCfg)
+    profiling: ProfilingCfg = field(default_factory=ProfilingCfg)
     logging: LoggingCfg = field(default_factory=LoggingCfg)
 
 
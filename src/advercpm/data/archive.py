@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from advercpm.utils.file_ops import dump_yaml, loads_yaml, save_yaml
+
+try:  # optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+
+logger = logging.getLogger("advercpm.archive")
+
+INDEX_NAME = "index.json"
+SHARD_PATTERN = "shard-{:05d}.tar"
+
+# Streamed members larger than this are spooled to disk, not memory.
+_SPOOL_BYTES = 64 * 1024 * 1024
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise ImportError(
+            "Shard compression 'zstd' requires the 'zstandard' package "
+            "(pip install zstandard)."
+        )
+
+
+class DirectoryWriter:
+    """
+    Default output mode: one file per vehicle per frame under ``root``.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _target(self, key: str) -> Path:
+        dst = self.root / key
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        return dst
+
+    def write_yaml(self, key: str, data) -> None:
+        save_yaml(data, self._target(key))
+
+    def copy_file(self, key: str, src) -> None:
+        shutil.copy2(src, self._target(key))
+
+    @contextmanager
+    def open_file(self, key: str) -> Iterator[BinaryIO]:
+        """Binary file to stream a member into (e.g. a large point cloud)."""
+        with open(self._target(key), "wb") as f:
+            yield f
+
+    def state(self) -> None:
+        """Checkpoint state (files are complete once written: nothing to keep)."""
+        return None
+
+    def restore(self, state) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardWriter:
+    """
+    Packs output files into large uncompressed tar shards with a JSON index.
+
+    Each member may be zstd-compressed individually (``compression="zstd"``),
+    so any file can still be read with one seek + one read. A new shard is
+    started once the current one exceeds ``shard_size`` bytes. The index is
+    written (atomically) on :meth:`close`:
+
+        {"compression": null|"zstd", "shards": [...],
+         "members": {key: [shard, offset, size]}}
+    """
+
+    def __init__(self, root, shard_size: int = 1 << 30, compression: Optional[str] = None,
+                 level: int = 3):
+        if compression not in (None, "zstd"):
+            raise ValueError(f"Unknown shard compression '{compression}' (expected null or 'zstd')")
+        if compression == "zstd":
+            _require_zstd()
+            self._compressor = zstandard.ZstdCompressor(level=level)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_size = int(shard_size)
+        self.compression = compression
+        self.members: Dict[str, Tuple[int, int, int]] = {}
+        self.shards: List[str] = []
+        self._tar: Optional[tarfile.TarFile] = None
+        self._file = None
+
+    def _open_next_shard(self) -> None:
+        self._close_shard()
+        name = SHARD_PATTERN.format(len(self.shards))
+        self.shards.append(name)
+        self._file = open(self.root / name, "wb")
+        self._tar = tarfile.open(fileobj=self._file, mode="w", format=tarfile.GNU_FORMAT)
+        logger.debug("Opened shard %s", self.root / name)
+
+    def _close_shard(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._file.close()
+            self._tar = self._file = None
+
+    def write_bytes(self, key: str, payload: bytes) -> None:
+        if self.compression == "zstd":
+            payload = self._compressor.compress(payload)
+        self._add_member(key, io.BytesIO(payload), len(payload))
+
+    def _add_member(self, key: str, fileobj: BinaryIO, size: int) -> None:
+        """Append ``size`` (already encoded) bytes read from ``fileobj``."""
+        if key in self.members:
+            raise ValueError(f"Duplicate archive key: {key}")
+        if self._tar is None or self._file.tell() >= self.shard_size:
+            self._open_next_shard()
+
+        info = tarfile.TarInfo(key + (".zst" if self.compression else ""))
+        info.size = size
+        self._tar.addfile(info, fileobj)
+        # member data ends at the (512-byte padded) current tar offset
+        padded = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        self.members[key] = (len(self.shards) - 1, self._tar.offset - padded, info.size)
+
+    def write_yaml(self, key: str, data) -> None:
+        self.write_bytes(key, dump_yaml(data).encode("utf-8"))
+
+    def copy_file(self, key: str, src) -> None:
+        with open(src, "rb") as f:
+            self._add_stream(key, f, os.fstat(f.fileno()).st_size)
+
+    @contextmanager
+    def open_file(self, key: str) -> Iterator[BinaryIO]:
+        """
+        Binary file to stream a member into. It is spooled (to disk past
+        ``_SPOOL_BYTES``) and appended on exit, so large members never sit
+        whole in memory.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES, dir=self.root) as tmp:
+            yield tmp
+            size = tmp.tell()
+            tmp.seek(0)
+            self._add_stream(key, tmp, size)
+
+    def _add_stream(self, key: str, fileobj: BinaryIO, size: int) -> None:
+        if self.compression != "zstd":
+            self._add_member(key, fileobj, size)
+            return
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES, dir=self.root) as packed:
+            # ``size`` goes into the frame header, as with one-shot compress()
+            self._compressor.copy_stream(fileobj, packed, size=size)
+            packed_size = packed.tell()
+            packed.seek(0)
+            self._add_member(key, packed, packed_size)
+
+    def state(self) -> Dict[str, object]:
+        """
+        Checkpoint state: the members written so far (flushed to disk).
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return {"shards": list(self.shards), "members": dict(self.members)}
+
+    def restore(self, state: Dict[str, object]) -> None:
+        """
+        Continue from a :meth:`state` checkpoint. Members written after it
+        stay in the old shards but are dropped from the index; new members
+        go to a new shard.
+        """
+        self._close_shard()
+        self.shards = list(state["shards"])
+        self.members = dict(state["members"])
+
+    def close(self) -> None:
+        self._close_shard()
+        index = {
+            "compression": self.compression,
+            "shards": self.shards,
+            "members": self.members,
+        }
+        tmp = self.root / (INDEX_NAME + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.root / INDEX_NAME)
+        logger.info("Wrote %d members into %d shard(s) under %s",
+                    len(self.members), len(self.shards), self.root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ShardReader:
+    """
+    Random-access and sequential reader for :class:`ShardWriter` output.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        index_path = self.root / INDEX_NAME
+        if not index_path.exists():
+            raise FileNotFoundError(f"Shard index not found: {index_path}")
+        with open(index_path) as f:
+            index = json.load(f)
+        self.compression = index["compression"]
+        self.shards: List[str] = index["shards"]
+        self.members: Dict[str, Tuple[int, int, int]] = {
+            k: tuple(v) for k, v in index["members"].items()
+        }
+        if self.compression == "zstd":
+            _require_zstd()
+            self._decompressor = zstandard.ZstdDecompressor()
+        self._handles: Dict[int, object] = {}
+
+    def keys(self) -> List[str]:
+        return list(self.members)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.members
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def _handle(self, shard: int):
+        fh = self._handles.get(shard)
+        if fh is None:
+            fh = open(self.root / self.shards[shard], "rb")
+            self._handles[shard] = fh
+        return fh
+
+    def _decode(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._decompressor.decompress(payload)
+        return payload
+
+    def read_bytes(self, key: str) -> bytes:
+        shard, offset, size = self.members[key]
+        fh = self._handle(shard)
+        fh.seek(offset)
+        return self._decode(fh.read(size))
+
+    def read_yaml(self, key: str) -> dict:
+        return loads_yaml(self.read_bytes(key).decode("utf-8"))
+
+    def __iter__(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield ``(key, bytes)`` in on-disk order (sequential reads)."""
+        ordered = sorted(self.members.items(), key=lambda kv: (kv[1][0], kv[1][1]))
+        for key, _ in ordered:
+            yield key, self.read_bytes(key)
+
+    def vehicle_frames(self, vehicle_id) -> List[str]:
+        """Sorted keys of one vehicle's YAML frames (``"<vid>/<frame>.yaml"``)."""
+        prefix = f"{vehicle_id}/"
+        return sorted(k for k in self.members if k.startswith(prefix) and k.endswith(".yaml"))
+
+    def close(self) -> None:
+        for fh in self._handles.values():
+            fh.close()
+        self._handles.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_output(data_cfg, root):
+    """
+    Build the output writer selected by ``data.output_mode``.
+    """
+    mode = str(data_cfg.get("output_mode", "files")).lower()
+    if mode == "files":
+        return DirectoryWriter(root)
+    if mode == "sharded":
+        return ShardWriter(
+            root,
+            shard_size=int(data_cfg.get("shard_size_mb", 1024)) * 1024 * 1024,
+            compression=data_cfg.get("shard_compression", None),
+        )
+    raise ValueError(f"Unknown data.output_mode '{mode}' (expected 'files' or 'sharded')")
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from advercpm.data.cpm_model import N_COLUMNS, CpmFrame
+
+
+logger = logging.getLogger("advercpm.codec")
+
+# Compact binary CPM, loosely following the ETSI CPM (TS 103 324) encoding:
+# fixed-point integers, object positions relative to the sender.
+#
+#   header   sender position (cm), orientation (0.1 deg), speed, object count
+#   object   id, position offset to the sender (cm), heading (0.1 deg,
+#            0..3599), roll/pitch (0.1 deg), speed, half-extent and box
+#            centre offset (cm)
+#
+# Everything is little-endian and unpadded, so a message is exactly
+# HEADER_SIZE + n_objects * OBJECT_SIZE bytes. Only what a CPM carries is
+# encoded (``lidar_pose``, ``ego_speed`` and ``vehicles``); other top-level
+# keys of the YAML frames are dropped.
+
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("version", "u1"),
+    ("n_objects", "<u2"),
+    ("position", "<i4", (3,)),      # cm
+    ("heading", "<u2"),             # 0.1 deg, 0..3599
+    ("roll_pitch", "<i2", (2,)),    # 0.1 deg
+    ("speed", "<i2"),               # 0.01 (dataset speed unit)
+])
+
+OBJECT_DTYPE = np.dtype([
+    ("id", "<u4"),
+    ("offset_xy", "<i4", (2,)),     # cm relative to the sender
+    ("offset_z", "<i2"),            # cm
+    ("heading", "<u2"),             # 0.1 deg, 0..3599
+    ("roll_pitch", "<i2", (2,)),    # 0.1 deg
+    ("speed", "<i2"),               # 0.01 (dataset speed unit)
+    ("extent", "<u2", (3,)),        # cm, half-size
+    ("center", "<i2", (3,)),        # cm
+])
+
+HEADER_SIZE = HEADER_DTYPE.itemsize
+OBJECT_SIZE = OBJECT_DTYPE.itemsize
+
+_CM = 100.0
+_DECIDEG = 10.0
+_SPEED = 100.0
+
+Frame = Union[Dict[str, Any], CpmFrame]
+
+
+# ----------------------------
+# Frame -> arrays
+# ----------------------------
+
+def _irregular_row(v: Dict[str, Any]) -> List[float]:
+    """Row of a vehicle dict that did not fit the float-only CpmFrame schema."""
+    def triple(name):
+        value = v.get(name) or (0, 0, 0)
+        return [float(x) for x in list(value)[:3]] + [0.0] * (3 - len(value))
+    return triple("location") + triple("angle") + triple("extent") + triple("center") \
+        + [float(v.get("speed", 0.0) or 0.0)]
+
+
+def _object_table(cpm: Frame) -> Tuple[List[Any], np.ndarray, np.ndarray, float]:
+    """ids, (N, 13) object rows, (6,) sender pose, sender speed of one frame."""
+    if isinstance(cpm, CpmFrame):
+        ids, data = cpm.ids, cpm.data
+        if cpm.irregular:
+            data = data.copy()
+            for vid, v in cpm.irregular.items():
+                data[cpm.row_of(vid)] = _irregular_row(v)
+        meta = cpm.meta
+    else:
+        vehicles = cpm.get("vehicles") or {}
+        ids = list(vehicles)
+        try:
+            data = np.array([[*v["location"], *v["angle"], *v["extent"], *v["center"], v["speed"]]
+                             for v in vehicles.values()], dtype=float)
+            if data.ndim != 2 or data.shape[1] != N_COLUMNS:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            data = np.array([_irregular_row(v) for v in vehicles.values()], dtype=float)
+        data = data.reshape(-1, N_COLUMNS)
+        meta = cpm
+    pose = np.zeros(6)
+    raw_pose = meta.get("lidar_pose")
+    if raw_pose is not None:
+        pose[: min(6, len(raw_pose))] = list(raw_pose)[:6]
+    return ids, data, pose, float(meta.get("ego_speed", 0.0) or 0.0)
+
+
+def _quantize(values: np.ndarray, scale: float, dtype) -> Tuple[np.ndarray, int]:
+    info = np.iinfo(dtype)
+    q = np.round(np.nan_to_num(values) * scale)
+    clipped = int(np.count_nonzero((q < info.min) | (q > info.max)))
+    return np.clip(q, info.min, info.max).astype(dtype), clipped
+
+
+def _heading(yaw_deg: np.ndarray) -> np.ndarray:
+    return np.round(np.mod(np.nan_to_num(yaw_deg), 360.0) * _DECIDEG).astype(np.int64) % 3600
+
+
+# ----------------------------
+# Encoding / decoding
+# ----------------------------
+
+def encode_frames(frames: Sequence[Frame]) -> List[bytes]:
+    """
+    Encode a batch of frames; all objects are quantized in one pass.
+
+    Values outside a field's range saturate (a warning reports how many).
+    Object ids must be integers in [0, 2**32).
+
+    Returns:
+        One message per frame.
+    """
+    tables = [_object_table(f) for f in frames]
+    counts = np.array([len(t[0]) for t in tables], dtype=np.int64)
+    if np.any(counts > np.iinfo(np.uint16).max):
+        raise ValueError("A CPM holds at most 65535 objects")
+    poses = np.array([t[2] for t in tables]).reshape(-1, 6)
+    rows = np.concatenate([t[1] for t in tables]) if tables else np.empty((0, N_COLUMNS))
+    ids = [vid for t in tables for vid in t[0]]
+    try:
+        id_arr = np.array(ids, dtype=np.int64)
+    except (TypeError, ValueError):
+        raise ValueError("Binary CPM encoding needs integer object ids")
+    if len(id_arr) and (id_arr.min() < 0 or id_arr.max() > np.iinfo(np.uint32).max):
+        raise ValueError("Object ids must fit in 32 bits")
+
+    clipped = 0
+    headers = np.zeros(len(tables), dtype=HEADER_DTYPE)
+    headers["version"] = VERSION
+    headers["n_objects"] = counts
+    headers["position"], c = _quantize(poses[:, 0:3], _CM, np.int32)
+    clipped += c
+    headers["heading"] = _heading(poses[:, 4])
+    headers["roll_pitch"], c = _quantize(poses[:, [3, 5]], _DECIDEG, np.int16)
+    clipped += c
+    headers["speed"], c = _quantize(np.array([t[3] for t in tables]), _SPEED, np.int16)
+    clipped += c
+
+    objects = np.zeros(len(rows), dtype=OBJECT_DTYPE)
+    ref = np.repeat(poses[:, 0:3], counts, axis=0)
+    offset = rows[:, 0:3] - ref
+    objects["id"] = id_arr
+    objects["offset_xy"], c = _quantize(offset[:, 0:2], _CM, np.int32)
+    clipped += c
+    objects["offset_z"], c = _quantize(offset[:, 2], _CM, np.int16)
+    clipped += c
+    objects["heading"] = _heading(rows[:, 4])
+    objects["roll_pitch"], c = _quantize(rows[:, [3, 5]], _DECIDEG, np.int16)
+    clipped += c
+    objects["speed"], c = _quantize(rows[:, 12], _SPEED, np.int16)
+    clipped += c
+    objects["extent"], c = _quantize(rows[:, 6:9], _CM, np.uint16)
+    clipped += c
+    objects["center"], c = _quantize(rows[:, 9:12], _CM, np.int16)
+    clipped += c
+    if clipped:
+        logger.warning("Binary CPM encoding saturated %d value(s)", clipped)
+
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    return [headers[i].tobytes() + objects[s:e].tobytes()
+            for i, (s, e) in enumerate(zip(starts, ends))]
+
+
+def encode_frame(cpm: Frame) -> bytes:
+    return encode_frames([cpm])[0]
+
+
+def decode_frame(message: bytes) -> Dict[str, Any]:
+    """
+    Decode one message back into CPM dict form (up to quantization).
+
+    Returns:
+        ``{"lidar_pose", "ego_speed", "vehicles"}``.
+    """
+    header = np.frombuffer(message, dtype=HEADER_DTYPE, count=1)[0]
+    if header["version"] != VERSION:
+        raise ValueError(f"Unsupported binary CPM version {header['version']}")
+    n = int(header["n_objects"])
+    if len(message) != HEADER_SIZE + n * OBJECT_SIZE:
+        raise ValueError(f"Truncated binary CPM: {len(message)} bytes for {n} objects")
+    objects = np.frombuffer(message, dtype=OBJECT_DTYPE, count=n, offset=HEADER_SIZE)
+
+    position = header["position"] / _CM
+    roll, pitch = header["roll_pitch"] / _DECIDEG
+    heading = header["heading"] / _DECIDEG
+    location = np.empty((n, 3))
+    location[:, 0:2] = objects["offset_xy"] / _CM + position[0:2]
+    location[:, 2] = objects["offset_z"] / _CM + position[2]
+    angle = np.stack([objects["roll_pitch"][:, 0] / _DECIDEG,
+                      objects["heading"] / _DECIDEG,
+                      objects["roll_pitch"][:, 1] / _DECIDEG], axis=1)
+
+    vehicles = {}
+    for k, vid in enumerate(objects["id"].tolist()):
+        vehicles[vid] = {
+            "angle": angle[k].tolist(),
+            "center": (objects["center"][k] / _CM).tolist(),
+            "extent": (objects["extent"][k] / _CM).tolist(),
+            "location": location[k].tolist(),
+            "speed": float(objects["speed"][k] / _SPEED),
+        }
+    return {
+        "ego_speed": float(header["speed"] / _SPEED),
+        "lidar_pose": position.tolist() + [float(roll), float(heading), float(pitch)],
+        "vehicles": vehicles,
+    }
+
+
+# ----------------------------
+# Size accounting
+# ----------------------------
+
+def message_sizes(frames: Sequence[Frame]) -> np.ndarray:
+    """
+    Encoded size in bytes of each frame, without encoding it.
+
+    Returns:
+        (F,) int64 array.
+    """
+    return sizes_for_counts([len(f) if isinstance(f, CpmFrame) else len(f.get("vehicles") or {})
+                             for f in frames])
+
+
+def sizes_for_counts(object_counts: Sequence[int]) -> np.ndarray:
+    """Encoded size in bytes of messages reporting ``object_counts`` objects, (F,) int64."""
+    return HEADER_SIZE + OBJECT_SIZE * np.asarray(object_counts, dtype=np.int64)
+
+
+def size_summary(sizes: np.ndarray, frame_period: float = 0.1) -> Dict[str, float]:
+    """Totals and channel load (bits/s) of one sender's message sizes."""
+    sizes = np.asarray(sizes, dtype=float)
+    if not len(sizes):
+        return {"messages": 0, "total_bytes": 0, "mean_bytes": 0.0, "max_bytes": 0,
+                "bitrate_bps": 0.0}
+    return {
+        "messages": int(len(sizes)),
+        "total_bytes": int(sizes.sum()),
+        "mean_bytes": float(sizes.mean()),
+        "max_bytes": int(sizes.max()),
+        "bitrate_bps": float(sizes.mean() * 8.0 / frame_period),
+    }
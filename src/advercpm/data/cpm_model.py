@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from advercpm.data.overlay import materialize
+
+
+# Column layout of ``CpmFrame.data`` (one row per perceived object).
+FIELDS = ("location", "angle", "extent", "center", "speed")
+_SLICES = {
+    "location": slice(0, 3),
+    "angle": slice(3, 6),
+    "extent": slice(6, 9),
+    "center": slice(9, 12),
+    "speed": 12,
+}
+N_COLUMNS = 13
+
+
+def _is_regular(vehicle: Any) -> bool:
+    """True if ``vehicle`` has exactly the standard fields with the standard shapes."""
+    if not isinstance(vehicle, dict) or len(vehicle) != len(FIELDS):
+        return False
+    for name in FIELDS[:-1]:
+        value = vehicle.get(name)
+        if not isinstance(value, list) or len(value) != 3:
+            return False
+        if not all(isinstance(x, float) for x in value):
+            return False
+    return isinstance(vehicle.get("speed"), float)
+
+
+class PerceivedObject:
+    """
+    Lightweight view of one row of a :class:`CpmFrame`.
+
+    Field accessors return NumPy views, so writes go straight to the frame.
+    """
+
+    __slots__ = ("frame", "row", "id")
+
+    def __init__(self, frame: "CpmFrame", row: int, object_id: Any):
+        self.frame = frame
+        self.row = row
+        self.id = object_id
+
+    @property
+    def location(self) -> np.ndarray:
+        return self.frame.data[self.row, _SLICES["location"]]
+
+    @property
+    def angle(self) -> np.ndarray:
+        return self.frame.data[self.row, _SLICES["angle"]]
+
+    @property
+    def extent(self) -> np.ndarray:
+        return self.frame.data[self.row, _SLICES["extent"]]
+
+    @property
+    def center(self) -> np.ndarray:
+        return self.frame.data[self.row, _SLICES["center"]]
+
+    @property
+    def speed(self) -> float:
+        return float(self.frame.data[self.row, _SLICES["speed"]])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self.frame.data[self.row, _SLICES["speed"]] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        irregular = self.frame.irregular.get(self.id)
+        if irregular is not None:
+            return irregular
+        row = self.frame.data[self.row]
+        return {
+            "angle": row[_SLICES["angle"]].tolist(),
+            "center": row[_SLICES["center"]].tolist(),
+            "extent": row[_SLICES["extent"]].tolist(),
+            "location": row[_SLICES["location"]].tolist(),
+            "speed": float(row[_SLICES["speed"]]),
+        }
+
+    def __repr__(self):
+        return f"PerceivedObject(id={self.id!r}, location={self.location.tolist()})"
+
+
+class CpmFrame:
+    """
+    Compact in-memory CPM frame.
+
+    All perceived objects share one (N, 13) float64 array (see ``FIELDS``)
+    instead of one dict and four lists per object. Top-level keys other than
+    ``vehicles`` (poses, speeds, sensor params) are kept as-is in ``meta``.
+    Objects that do not follow the standard vehicle schema are kept verbatim
+    in ``irregular`` (their data row is NaN), so ``from_dict``/``to_dict``
+    round-trips exactly.
+    """
+
+    __slots__ = ("ids", "data", "meta", "irregular", "has_vehicles", "_rows")
+
+    def __init__(
+        self,
+        ids: List[Any],
+        data: np.ndarray,
+        meta: Optional[Dict[str, Any]] = None,
+        irregular: Optional[Dict[Any, Any]] = None,
+        has_vehicles: bool = True,
+    ):
+        self.ids = ids
+        self.data = data
+        self.meta = meta if meta is not None else {}
+        self.irregular = irregular if irregular is not None else {}
+        self.has_vehicles = has_vehicles
+        self._rows = None
+
+    # ----------------------
+    # Conversion
+    # ----------------------
+
+    @classmethod
+    def from_dict(cls, cpm: Dict[str, Any]) -> "CpmFrame":
+        cpm = materialize(cpm)
+        vehicles = cpm.get("vehicles")
+        if not isinstance(vehicles, dict):
+            # absent or non-mapping "vehicles": keep the frame verbatim in meta
+            return cls([], np.empty((0, N_COLUMNS)), dict(cpm), None, has_vehicles=False)
+
+        meta = {k: v for k, v in cpm.items() if k != "vehicles"}
+
+        ids = list(vehicles)
+        data = np.full((len(ids), N_COLUMNS), np.nan)
+        irregular = {}
+        for row, (vid, v) in enumerate(vehicles.items()):
+            if _is_regular(v):
+                data[row, 0:3] = v["location"]
+                data[row, 3:6] = v["angle"]
+                data[row, 6:9] = v["extent"]
+                data[row, 9:12] = v["center"]
+                data[row, 12] = v["speed"]
+            else:
+                irregular[vid] = v
+        return cls(ids, data, meta, irregular)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = dict(self.meta)
+        if not self.has_vehicles:
+            return out
+        rows = self.data.tolist()
+        vehicles = {}
+        for vid, row in zip(self.ids, rows):
+            irregular = self.irregular.get(vid)
+            if irregular is not None:
+                vehicles[vid] = irregular
+                continue
+            vehicles[vid] = {
+                "angle": row[3:6],
+                "center": row[9:12],
+                "extent": row[6:9],
+                "location": row[0:3],
+                "speed": row[12],
+            }
+        out["vehicles"] = vehicles
+        return out
+
+    # ----------------------
+    # Column views
+    # ----------------------
+
+    @property
+    def location(self) -> np.ndarray:
+        return self.data[:, _SLICES["location"]]
+
+    @property
+    def angle(self) -> np.ndarray:
+        return self.data[:, _SLICES["angle"]]
+
+    @property
+    def extent(self) -> np.ndarray:
+        return self.data[:, _SLICES["extent"]]
+
+    @property
+    def center(self) -> np.ndarray:
+        return self.data[:, _SLICES["center"]]
+
+    @property
+    def speed(self) -> np.ndarray:
+        return self.data[:, _SLICES["speed"]]
+
+    @property
+    def regular(self) -> np.ndarray:
+        """(N,) mask of rows backed by ``data`` (False for irregular objects)."""
+        if not self.irregular:
+            return np.ones(len(self.ids), dtype=bool)
+        return np.array([vid not in self.irregular for vid in self.ids], dtype=bool)
+
+    # ----------------------
+    # Object access / editing
+    # ----------------------
+
+    def row_of(self, object_id: Any) -> int:
+        if self._rows is None:
+            self._rows = {vid: row for row, vid in enumerate(self.ids)}
+        return self._rows[object_id]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, object_id: Any) -> bool:
+        try:
+            self.row_of(object_id)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, object_id: Any) -> PerceivedObject:
+        return PerceivedObject(self, self.row_of(object_id), object_id)
+
+    def __iter__(self) -> Iterator[PerceivedObject]:
+        for row, vid in enumerate(self.ids):
+            yield PerceivedObject(self, row, vid)
+
+    def add(self, object_id: Any, vehicle: Dict[str, Any]) -> None:
+        """Append (or replace) one object given in YAML dict form."""
+        other = CpmFrame.from_dict({"vehicles": {object_id: vehicle}})
+        if object_id in self:
+            row = self.row_of(object_id)
+            self.data[row] = other.data[0]
+            self.irregular.pop(object_id, None)
+            self.irregular.update(other.irregular)
+            return
+        self.ids = self.ids + other.ids
+        self.data = np.concatenate([self.data, other.data])
+        self.irregular.update(other.irregular)
+        self.has_vehicles = True
+        self._rows = None
+
+    def remove(self, object_id: Any) -> None:
+        row = self.row_of(object_id)
+        self.ids = self.ids[:row] + self.ids[row + 1:]
+        self.data = np.delete(self.data, row, axis=0)
+        self.irregular.pop(object_id, None)
+        self._rows = None
+
+    def copy(self) -> "CpmFrame":
+        return CpmFrame(
+            list(self.ids), self.data.copy(), dict(self.meta),
+            dict(self.irregular), self.has_vehicles,
+        )
+
+    def nbytes(self) -> int:
+        """Approximate size of the object payload in bytes."""
+        return int(self.data.nbytes)
+
+    def __repr__(self):
+        return f"CpmFrame(objects={len(self.ids)}, meta_keys={sorted(self.meta)})"
+
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import queue
+import traceback
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from advercpm.attacks import build_attack
+from advercpm.data.scenario_index import ScenarioIndex, load_index
+from advercpm.data.yaml_parser import list_frames, list_vehicle_ids
+from advercpm.simulation.checkpoint import restore_rng, rng_state, seed_everything
+from advercpm.simulation.schedule import ScheduleParams, active_frames, compile_schedule
+from advercpm.utils.file_ops import parse_yaml
+from advercpm.utils.profiling import worker_profiler
+
+
+logger = logging.getLogger("advercpm.dataloader")
+
+# (scenario name, vehicle id, frame stem, yaml path, apply attack?)
+Sample = Tuple[str, int, str, str, bool]
+
+# how often the loader checks its workers are alive while waiting for a sample (s)
+WORKER_POLL_INTERVAL = 1.0
+
+
+def discover_samples(
+    simulation_path,
+    max_frames: Optional[int] = None,
+    attacked_ids: Optional[Sequence[int]] = None,
+    use_index: bool = True,
+    schedule: Optional[ScheduleParams] = None,
+) -> List[Sample]:
+    """
+    List every (scenario, vehicle, frame) under ``simulation_path`` in time order.
+
+    Args:
+        simulation_path: root holding one folder per scenario.
+        max_frames: keep only the first ``max_frames`` frames of each vehicle.
+        attacked_ids: vehicles whose frames get attacked (None = all).
+        use_index: list scenarios through their index sidecar
+            (:func:`advercpm.data.scenario_index.load_index`).
+        schedule: attack only the frames it selects (see
+            :mod:`advercpm.simulation.schedule`; the ego is the smallest id).
+    """
+    root = Path(simulation_path)
+    if not root.exists():
+        raise FileNotFoundError(f"Simulation path not found: {root}")
+    attacked = None if attacked_ids is None else {int(v) for v in attacked_ids}
+
+    samples: List[Sample] = []
+    for scenario in sorted(p for p in root.iterdir() if p.is_dir()):
+        index = load_index(scenario) if use_index else None
+        if index is None and schedule is not None:
+            index = ScenarioIndex.build(scenario)       # frame arrays for the schedule
+        for vid in (index.vehicle_ids if index is not None else list_vehicle_ids(scenario)):
+            if index is not None:
+                stems = index.frames(vid, max_frames)
+            else:
+                stems = list_frames(scenario / str(vid))[:max_frames]
+            hit = attacked is None or vid in attacked
+            active = active_frames(schedule, index, vid, index.vehicle_ids[0], max_frames) \
+                if hit and schedule is not None else None
+            samples.extend(
+                (scenario.name, vid, stem, str(scenario / str(vid) / f"{stem}.yaml"),
+                 hit and (active is None or stem in active))
+                for stem in stems
+            )
+    return samples
+
+
+def vehicle_seed(seed: int, scenario: str, vid: int) -> int:
+    """Seed of one vehicle's attack stream: the epoch seed offset by a stable hash of the vehicle."""
+    return (int(seed) + zlib.crc32(f"{scenario}/{vid}".encode())) % 2 ** 32
+
+
+def _load_sample(
+    sample: Sample, attacks: Dict[Tuple[str, int], Any], attack_cfg, seed: Optional[int],
+) -> Dict[str, Any]:
+    """
+    Parse (and attack) one sample. ``attacks`` maps (scenario, vehicle) to its
+    attack and, when seeded, the random state it left behind, so every vehicle
+    draws from its own stream whatever it is interleaved with.
+    """
+    scenario, vid, stem, path, hit = sample
+    cpm = parse_yaml(path)
+    if hit:
+        key = (scenario, vid)
+        if key in attacks:
+            attack, state = attacks[key]
+            if state is not None:
+                restore_rng(state)
+        else:
+            if seed is not None:
+                seed_everything(vehicle_seed(seed, scenario, vid))
+            attack = build_attack(attack_cfg)
+        cpm = attack.apply(cpm)
+        attacks[key] = (attack, rng_state() if seed is not None else None)
+    return {"scenario": scenario, "vehicle_id": vid, "frame": stem, "attacked": hit, "cpm": cpm}
+
+
+def _worker_loop(worker_id: int, attack_cfg, seed: Optional[int], in_q, out_q) -> None:
+    attacks: Dict[Tuple[str, int], Any] = {}
+    with worker_profiler(f"loader{worker_id}"):
+        while True:
+            task = in_q.get()
+            if task is None:
+                break
+            seq, sample = task
+            try:
+                out_q.put((seq, _load_sample(sample, attacks, attack_cfg, seed), None))
+            except Exception:
+                out_q.put((seq, None, traceback.format_exc()))
+
+
+class AdversarialDataLoader:
+    """
+    Iterable yielding batches of attacked CPM frames, computed on the fly.
+
+    Honours ``simulation.batch_size``, ``shuffle``, ``max_frames``,
+    ``num_workers`` and ``prefetch_factor``. Each batch is a list of samples:
+
+        {"scenario", "vehicle_id", "frame", "attacked", "cpm"}
+
+    One attack instance is kept per (scenario, vehicle), as in the runner, so
+    stateful attacks evolve along each vehicle's frame sequence. With workers,
+    every vehicle is always routed to the same worker process, so its frames
+    reach that instance in iteration order (time order unless shuffled).
+    Frames ``attack.schedule`` leaves out are yielded unattacked.
+
+    When deterministic, every vehicle's random draws are seeded from
+    ``experiment.seed + epoch`` and the vehicle key, so epochs differ and the
+    output does not depend on ``num_workers``.
+    """
+
+    def __init__(
+        self,
+        cfg,
+        simulation_path=None,
+        attacked_ids: Optional[Sequence[int]] = None,
+    ):
+        sim = cfg.simulation
+        self.attack_cfg = cfg.attack
+        self.batch_size = max(1, int(sim.batch_size))
+        self.shuffle = bool(sim.shuffle)
+        self.num_workers = max(0, int(sim.num_workers))
+        self.prefetch_factor = max(1, int(sim.get("prefetch_factor", 2)))
+        self.seed = cfg.experiment.get("seed", None) if sim.deterministic else None
+        self.samples = discover_samples(
+            simulation_path or cfg.data.simulation_path, sim.max_frames, attacked_ids,
+            use_index=cfg.data.get("scenario_index", True),
+            schedule=compile_schedule(cfg.attack.get("schedule")),
+        )
+        self._epoch = 0
+        logger.info("Data loader: %d samples, batch_size=%d, workers=%d",
+                    len(self.samples), self.batch_size, self.num_workers)
+
+    def __len__(self) -> int:
+        return -(-len(self.samples) // self.batch_size)
+
+    def _epoch_order(self) -> List[Sample]:
+        if not self.shuffle:
+            return list(self.samples)
+        seed = None if self.seed is None else self.seed + self._epoch
+        perm = np.random.RandomState(seed).permutation(len(self.samples))
+        return [self.samples[i] for i in perm]
+
+    def __iter__(self) -> Iterator[List[Dict[str, Any]]]:
+        order = self._epoch_order()
+        seed = None if self.seed is None else self.seed + self._epoch
+        self._epoch += 1
+        items = self._iter_serial(order, seed) if self.num_workers == 0 else self._iter_workers(order, seed)
+
+        batch: List[Dict[str, Any]] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _iter_serial(self, order: List[Sample], seed: Optional[int]) -> Iterator[Dict[str, Any]]:
+        attacks: Dict[Tuple[str, int], Any] = {}
+        for sample in order:
+            yield _load_sample(sample, attacks, self.attack_cfg, seed)
+
+    def _iter_workers(self, order: List[Sample], seed: Optional[int]) -> Iterator[Dict[str, Any]]:
+        ctx = mp.get_context()
+        out_q = ctx.Queue()
+        in_qs = [ctx.Queue() for _ in range(self.num_workers)]
+        workers = [
+            ctx.Process(
+                target=_worker_loop,
+                args=(w, self.attack_cfg, seed, in_qs[w], out_q),
+                daemon=True,
+            )
+            for w in range(self.num_workers)
+        ]
+        for p in workers:
+            p.start()
+
+        routes: Dict[Tuple[str, int], int] = {}
+        max_in_flight = self.prefetch_factor * self.batch_size * self.num_workers
+        sent = received = 0
+        pending: Dict[int, Dict[str, Any]] = {}
+        try:
+            while received < len(order):
+                while sent < len(order) and sent - received < max_in_flight:
+                    sample = order[sent]
+                    key = (sample[0], sample[1])
+                    worker = routes.setdefault(key, len(routes) % self.num_workers)
+                    in_qs[worker].put((sent, sample))
+                    sent += 1
+                while received not in pending:
+                    try:
+                        seq, item, error = out_q.get(timeout=WORKER_POLL_INTERVAL)
+                    except queue.Empty:
+                        # a killed worker (OOM, crash in a native reader) never answers
+                        dead = [(w, p.exitcode) for w, p in enumerate(workers) if not p.is_alive()]
+                        if dead:
+                            raise RuntimeError(
+                                "Data loader worker(s) exited unexpectedly: "
+                                + ", ".join(f"worker {w} (exit code {code})" for w, code in dead)
+                            )
+                        continue
+                    if error is not None:
+                        raise RuntimeError(f"Data loader worker failed:\n{error}")
+                    pending[seq] = item
+                yield pending.pop(received)
+                received += 1
+        finally:
+            for q in in_qs:
+                q.put(None)
+            for p in workers:
+                p.join(timeout=5)
+                if p.is_alive():
+                    p.terminate()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from advercpm.data.cpm_model import N_COLUMNS, CpmFrame
+
+
+class FrameRingBuffer:
+    """
+    Fixed-capacity history of :class:`CpmFrame` objects.
+
+    Object rows of every slot live in one preallocated
+    ``(capacity, max_objects, 13)`` array, overwritten in place as frames are
+    pushed, so holding hundreds of past frames costs constant memory and no
+    per-frame dict copies. ``max_objects`` grows (once per new maximum) if a
+    frame carries more objects.
+
+    ``meta`` and ``irregular`` are stored as shallow copies; their values
+    (e.g. ``lidar_pose`` lists) are shared with the pushed frame.
+    """
+
+    def __init__(self, capacity: int, max_objects: int = 64):
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = int(capacity)
+        self._data = np.empty((self.capacity, max(1, int(max_objects)), N_COLUMNS))
+        self._counts = np.zeros(self.capacity, dtype=np.int64)
+        self._ids: List[Optional[List[Any]]] = [None] * self.capacity
+        self._meta: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._irregular: List[Optional[Dict[Any, Any]]] = [None] * self.capacity
+        self._has_vehicles = np.zeros(self.capacity, dtype=bool)
+        self._head = 0      # next slot to write
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def full(self) -> bool:
+        return self._size == self.capacity
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+        self._ids = [None] * self.capacity
+        self._meta = [None] * self.capacity
+        self._irregular = [None] * self.capacity
+
+    def _grow(self, n_objects: int) -> None:
+        new_max = max(n_objects, 2 * self._data.shape[1])
+        data = np.empty((self.capacity, new_max, N_COLUMNS))
+        data[:, : self._data.shape[1]] = self._data
+        self._data = data
+
+    def push(self, frame: CpmFrame) -> None:
+        """Store ``frame``, overwriting the oldest one once the buffer is full."""
+        n = len(frame.ids)
+        if n > self._data.shape[1]:
+            self._grow(n)
+        slot = self._head
+        self._data[slot, :n] = frame.data
+        self._counts[slot] = n
+        # CpmFrame.add/remove rebind ``ids`` instead of mutating it, so sharing is safe
+        self._ids[slot] = frame.ids
+        self._meta[slot] = dict(frame.meta)
+        self._irregular[slot] = dict(frame.irregular) if frame.irregular else None
+        self._has_vehicles[slot] = frame.has_vehicles
+        self._head = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def get(self, lag: int = 0) -> CpmFrame:
+        """
+        Frame pushed ``lag`` pushes ago (0 = most recent).
+
+        Returns:
+            A new :class:`CpmFrame`; editing it does not touch the buffer.
+        """
+        if not 0 <= lag < self._size:
+            raise IndexError(f"lag {lag} out of range for {self._size} buffered frames")
+        slot = (self._head - 1 - lag) % self.capacity
+        n = int(self._counts[slot])
+        irregular = self._irregular[slot]
+        return CpmFrame(
+            list(self._ids[slot]),
+            self._data[slot, :n].copy(),
+            dict(self._meta[slot]),
+            dict(irregular) if irregular else None,
+            bool(self._has_vehicles[slot]),
+        )
+
+    def oldest(self) -> CpmFrame:
+        return self.get(self._size - 1)
+
+    def nbytes(self) -> int:
+        """Size of the preallocated object array in bytes."""
+        return int(self._data.nbytes)
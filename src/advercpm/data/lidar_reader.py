@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import io
+import itertools
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Tuple
+
+import numpy as np
+
+from advercpm.utils.math_utils import transform_columns
+
+
+# Chunk size of streamed point clouds: 1M points of x/y/z/intensity is 16 MB.
+DEFAULT_CHUNK_POINTS = 1 << 20
+
+_NUMPY_TYPES = {
+    ("F", 4): "<f4", ("F", 8): "<f8",
+    ("I", 1): "i1", ("I", 2): "<i2", ("I", 4): "<i4", ("I", 8): "<i8",
+    ("U", 1): "u1", ("U", 2): "<u2", ("U", 4): "<u4", ("U", 8): "<u8",
+}
+
+
+@dataclass
+class PcdHeader:
+    """Parsed header of a PCD file (``text`` is the raw header, DATA line included)."""
+    fields: List[str]
+    sizes: List[int]
+    types: List[str]
+    counts: List[int]
+    points: int
+    data: str                  # "ascii", "binary" or "binary_compressed"
+    text: bytes
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Structured dtype of one point."""
+        spec = []
+        for name, size, tp, count in zip(self.fields, self.sizes, self.types, self.counts):
+            base = _NUMPY_TYPES.get((tp, size))
+            if base is None:
+                raise ValueError(f"Unsupported PCD field type {tp}{size} ('{name}')")
+            spec.append((name, base) if count == 1 else (name, base, (count,)))
+        return np.dtype(spec)
+
+
+def read_pcd_header(f: BinaryIO) -> PcdHeader:
+    """Read the header of an open PCD file, leaving ``f`` at the first data byte."""
+    lines, values = [], {}
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("Truncated PCD header (no DATA line)")
+        lines.append(line)
+        parts = line.decode("ascii").split()
+        if not parts or parts[0].startswith("#"):
+            continue
+        values[parts[0].upper()] = parts[1:]
+        if parts[0].upper() == "DATA":
+            break
+
+    fields = values["FIELDS"]
+    counts = [int(c) for c in values.get("COUNT", ["1"] * len(fields))]
+    points = values.get("POINTS")
+    if points is None:
+        points = [int(values["WIDTH"][0]) * int(values["HEIGHT"][0])]
+    return PcdHeader(
+        fields=fields,
+        sizes=[int(s) for s in values["SIZE"]],
+        types=[t.upper() for t in values["TYPE"]],
+        counts=counts,
+        points=int(points[0]),
+        data=values["DATA"][0].lower(),
+        text=b"".join(lines),
+    )
+
+
+def iter_pcd_chunks(
+    f: BinaryIO, header: PcdHeader, chunk_points: int = DEFAULT_CHUNK_POINTS,
+) -> Iterator[np.ndarray]:
+    """Yield the points after the header as writable structured arrays of up to ``chunk_points``."""
+    dtype = header.dtype
+    chunk_points = max(1, int(chunk_points))
+    if header.data == "binary":
+        remaining = header.points
+        while remaining > 0:
+            n = min(chunk_points, remaining)
+            buf = f.read(n * dtype.itemsize)
+            if len(buf) < n * dtype.itemsize:
+                raise ValueError("Truncated PCD data")
+            yield np.frombuffer(buf, dtype=dtype).copy()
+            remaining -= n
+    elif header.data == "ascii":
+        columns = sum(header.counts)
+        lines = (line for line in f if line.strip())
+        while True:
+            block = list(itertools.islice(lines, chunk_points))
+            if not block:
+                break
+            values = np.loadtxt(io.BytesIO(b"".join(block)), dtype=float, ndmin=2)
+            if values.shape[1] != columns:
+                raise ValueError(f"PCD row has {values.shape[1]} values, expected {columns}")
+            out = np.empty(len(values), dtype=dtype)
+            col = 0
+            for name, count in zip(header.fields, header.counts):
+                out[name] = values[:, col] if count == 1 else values[:, col: col + count]
+                col += count
+            yield out
+    else:
+        raise ValueError(f"Unsupported PCD data encoding '{header.data}' (ascii or binary only)")
+
+
+def write_pcd_chunk(f: BinaryIO, header: PcdHeader, points: np.ndarray) -> None:
+    """Append points in the encoding of ``header`` (after ``header.text``)."""
+    if header.data == "binary":
+        f.write(points.astype(header.dtype, copy=False).tobytes())
+        return
+    columns = []
+    for name, tp, count in zip(header.fields, header.types, header.counts):
+        column = points[name].reshape(len(points), count)
+        columns.append(column.astype(float) if tp == "F" else column.astype(np.int64))
+    fmt = " ".join(("%.9g" if tp == "F" else "%d") for tp, count in zip(header.types, header.counts)
+                   for _ in range(count))
+    np.savetxt(f, np.hstack(columns), fmt=fmt)
+
+
+def read_pcd(path) -> Tuple[PcdHeader, np.ndarray]:
+    """Whole point cloud as one structured array (use :func:`iter_pcd_chunks` for large files)."""
+    with open(path, "rb") as f:
+        header = read_pcd_header(f)
+        chunks = list(iter_pcd_chunks(f, header))
+    points = np.concatenate(chunks) if chunks else np.zeros(0, dtype=header.dtype)
+    return header, points
+
+
+def transform_pcd(
+    src, dst: BinaryIO, matrix: np.ndarray, chunk_points: int = DEFAULT_CHUNK_POINTS,
+) -> int:
+    """
+    Stream a PCD file into ``dst`` with ``x, y, z`` mapped by a rigid
+    (4, 4) transform, ``chunk_points`` points at a time (transformed in
+    place, see :func:`transform_columns`). Header and other fields are kept.
+
+    Returns:
+        Number of points written.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    written = 0
+    with open(src, "rb") as f:
+        header = read_pcd_header(f)
+        missing = [axis for axis in ("x", "y", "z") if axis not in header.fields]
+        if missing:
+            raise ValueError(f"PCD {src} has no field(s) {', '.join(missing)}")
+        dst.write(header.text)
+        for points in iter_pcd_chunks(f, header, chunk_points):
+            transform_columns(points["x"], points["y"], points["z"], matrix)
+            write_pcd_chunk(dst, header, points)
+            written += len(points)
+    return written
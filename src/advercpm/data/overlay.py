@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+_MISSING = object()
+
+
+class FrameOverlay(MutableMapping):
+    """
+    Copy-on-write view of a parsed CPM (or any nested dict/list structure).
+
+    Attacks use it like the plain dict: reads fall through to ``base``,
+    writes and deletions are recorded in the overlay and ``base`` is never
+    modified. Nested dicts are wrapped in child overlays on access; nested
+    lists (3-element location/angle vectors) are copied on access, since
+    attacks edit them in place.
+
+    Several attacks can run on overlays of the same parsed frame, and the
+    original stays available for evaluation, without ``deepcopy``.
+    :meth:`materialize` returns a plain dict sharing every unchanged subtree
+    with ``base``, so memory grows with the change only.
+    """
+
+    __slots__ = ("_base", "_changes", "_deleted", "_views")
+
+    def __init__(self, base: Mapping):
+        self._base = base
+        self._changes: Dict[Any, Any] = {}     # assigned keys
+        self._deleted = set()                  # base keys removed
+        self._views: Dict[Any, Any] = {}       # accessed base values (child overlays / list copies)
+
+    @property
+    def base(self) -> Mapping:
+        return self._base
+
+    # ----------------------
+    # Mapping protocol
+    # ----------------------
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            return self._changes[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        view = self._views.get(key, _MISSING)
+        if view is not _MISSING:
+            return view
+        value = self._base[key]
+        if isinstance(value, Mapping):
+            view = FrameOverlay(value)
+        elif isinstance(value, list):
+            view = list(value)
+        else:
+            return value
+        self._views[key] = view
+        return view
+
+    def __setitem__(self, key, value) -> None:
+        self._deleted.discard(key)
+        if isinstance(value, FrameOverlay) and key in self._base and value._base is self._base[key]:
+            # re-assigning a child view (e.g. ``cpm["vehicles"] = vehicles``) is not a change
+            self._changes.pop(key, None)
+            self._views[key] = value
+            return
+        self._views.pop(key, None)
+        self._changes[key] = value
+
+    def __delitem__(self, key) -> None:
+        in_base = key in self._base and key not in self._deleted
+        if key not in self._changes and not in_base:
+            raise KeyError(key)
+        self._changes.pop(key, None)
+        self._views.pop(key, None)
+        if key in self._base:
+            self._deleted.add(key)
+
+    def __iter__(self) -> Iterator:
+        for key in self._base:
+            if key not in self._deleted:
+                yield key
+        for key in self._changes:
+            if key not in self._base or key in self._deleted:
+                yield key
+
+    def __len__(self) -> int:
+        added = sum(1 for key in self._changes if key not in self._base or key in self._deleted)
+        return len(self._base) - len(self._deleted) + added
+
+    def __contains__(self, key) -> bool:
+        if key in self._changes:
+            return True
+        return key in self._base and key not in self._deleted
+
+    def __repr__(self):
+        return f"FrameOverlay(keys={len(self)}, modified={self.modified})"
+
+    # ----------------------
+    # Change tracking
+    # ----------------------
+
+    def _view_modified(self, key) -> bool:
+        view = self._views[key]
+        if isinstance(view, FrameOverlay):
+            return view.modified
+        return view != self._base[key]
+
+    @property
+    def modified(self) -> bool:
+        if self._changes or self._deleted:
+            return True
+        return any(self._view_modified(key) for key in self._views)
+
+    def compact(self) -> None:
+        """Drop views that were read but not changed (frees their copies)."""
+        for key in list(self._views):
+            view = self._views[key]
+            if isinstance(view, FrameOverlay):
+                view.compact()
+            if not self._view_modified(key):
+                del self._views[key]
+
+    def materialize(self) -> Any:
+        """
+        Plain-dict result of the recorded changes.
+
+        Unchanged subtrees are the ``base`` objects themselves (shared, not
+        copied); an unmodified overlay returns ``base`` as is.
+        """
+        if not self.modified:
+            return self._base
+        out = {}
+        for key in self:
+            if key in self._changes:
+                value = self._changes[key]
+            elif key in self._views:
+                value = self._views[key] if self._view_modified(key) else self._base[key]
+            else:
+                value = self._base[key]
+            out[key] = value.materialize() if isinstance(value, FrameOverlay) else value
+        return out
+
+    def diff(self, prefix: Tuple = ()) -> List[Tuple[Tuple, Any, Any]]:
+        """
+        Recorded changes as ``(path, old, new)`` tuples.
+
+        ``old`` is ``None`` for added keys and ``new`` is ``None`` for
+        deleted ones; ``path`` is the tuple of keys from the frame root.
+        """
+        changes: List[Tuple[Tuple, Any, Any]] = []
+        for key in self._deleted:
+            if key not in self._changes:
+                changes.append((prefix + (key,), self._base[key], None))
+        for key, value in self._changes.items():
+            new = value.materialize() if isinstance(value, FrameOverlay) else value
+            changes.append((prefix + (key,), self._base.get(key) if key in self._base else None, new))
+        for key, view in self._views.items():
+            if isinstance(view, FrameOverlay):
+                changes.extend(view.diff(prefix + (key,)))
+            elif view != self._base[key]:
+                changes.append((prefix + (key,), self._base[key], view))
+        return changes
+
+
+def materialize(cpm: Any) -> Any:
+    """Plain form of ``cpm`` (overlays are materialized, anything else returned as is)."""
+    return cpm.materialize() if isinstance(cpm, FrameOverlay) else cpm
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger("advercpm.scenario_index")
+
+INDEX_FILE = ".scenario_index.json"
+INDEX_VERSION = 2
+
+_TOP_LEVEL = re.compile(rb"^([^\s#-][^:]*):")
+_ACTOR = re.compile(rb"^  \S")
+_STATE_KEYS = (b"lidar_pose", b"ego_speed")
+
+# In-process cache: {scenario path: index}, revalidated on every lookup.
+_CACHE: Dict[str, "ScenarioIndex"] = {}
+
+
+def count_actors(yaml_path) -> int:
+    """Objects in the ``vehicles`` mapping of a CPM YAML, without parsing it."""
+    with open(yaml_path, "rb") as f:
+        return count_actor_lines(f)
+
+
+def count_actor_lines(lines: Iterable[bytes]) -> int:
+    """:func:`count_actors` over the lines of a CPM YAML already in memory (e.g. an archive member)."""
+    count, key = 0, None
+    for line in lines:
+        match = _TOP_LEVEL.match(line)
+        if match:
+            key = match.group(1)
+        elif key == b"vehicles" and _ACTOR.match(line):
+            count += 1
+    return count
+
+
+def scan_frame(yaml_path) -> Tuple[int, Optional[List[float]], Optional[float]]:
+    """
+    Object count, sender position (``lidar_pose`` x, y, z) and ``ego_speed``
+    of a CPM YAML, without parsing the object list.
+
+    Expects the block layout ``yaml.dump`` writes (one ``  <id>:`` line per
+    object under a top-level ``vehicles:``), as in OPV2V; only the two state
+    entries are handed to the YAML parser. Missing entries are None.
+    """
+    count, key, fragments = 0, None, {}
+    with open(yaml_path, "rb") as f:
+        for line in f:
+            match = _TOP_LEVEL.match(line)
+            if match:
+                key = match.group(1)
+                if key in _STATE_KEYS:
+                    fragments[key] = [line]
+            elif key == b"vehicles":
+                if _ACTOR.match(line):
+                    count += 1
+            elif key in fragments:
+                fragments[key].append(line)
+    state = yaml.safe_load(b"".join(b"".join(lines) for lines in fragments.values())) if fragments else {}
+    pose, speed = state.get("lidar_pose"), state.get("ego_speed")
+    position = [float(v) for v in pose[:3]] if pose is not None and len(pose) >= 3 else None
+    return count, position, float(speed) if speed is not None else None
+
+
+@dataclass
+class VehicleIndex:
+    """Listing of one vehicle folder (files sorted by name)."""
+    dir_mtime: int                                        # ns, when listed
+    files: List[str] = field(default_factory=list)
+    sizes: List[int] = field(default_factory=list)        # bytes, per file
+    mtimes: List[int] = field(default_factory=list)       # ns, per file
+    frames: List[str] = field(default_factory=list)       # YAML stems, in time order
+    actors: List[int] = field(default_factory=list)       # reported objects, per frame
+    positions: List[Optional[List[float]]] = field(default_factory=list)  # lidar_pose x, y, z, per frame
+    speeds: List[Optional[float]] = field(default_factory=list)           # ego_speed, per frame
+
+    @classmethod
+    def build(cls, path: Path) -> "VehicleIndex":
+        index = cls(dir_mtime=os.stat(path).st_mtime_ns)
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            index.files.append(entry.name)
+            index.sizes.append(st.st_size)
+            index.mtimes.append(st.st_mtime_ns)
+            stem, ext = os.path.splitext(entry.name)
+            if ext == ".yaml":
+                actors, position, speed = scan_frame(entry.path)
+                index.frames.append(stem)
+                index.actors.append(actors)
+                index.positions.append(position)
+                index.speeds.append(speed)
+        return index
+
+    def frame_files(self, max_frames: Optional[int] = None) -> List[str]:
+        """File names of the first ``max_frames`` frames (all files if None)."""
+        if max_frames is None:
+            return list(self.files)
+        keep = set(self.frames[:max_frames])
+        return [name for name in self.files if os.path.splitext(name)[0] in keep]
+
+
+@dataclass
+class ScenarioIndex:
+    """
+    Persistent listing of a scenario folder: vehicle ids and, per vehicle,
+    files (size, mtime), frame stems, object counts, positions and speeds.
+
+    Stored as ``INDEX_FILE`` in the scenario folder. It is fresh while the
+    mtimes of the scenario and vehicle folders are unchanged, i.e. no file
+    was added, removed or renamed; a file rewritten in place is not noticed
+    (``load_index(path, rebuild=True)`` relists).
+    """
+    path: Path
+    dir_mtime: int
+    vehicles: Dict[int, VehicleIndex]
+
+    @property
+    def vehicle_ids(self) -> List[int]:
+        return sorted(self.vehicles)
+
+    def frames(self, vid: int, max_frames: Optional[int] = None) -> List[str]:
+        return self.vehicles[vid].frames[:max_frames]
+
+    def files(self, vid: int, max_frames: Optional[int] = None) -> List[Path]:
+        """Paths of the files of vehicle ``vid``, limited to its first ``max_frames`` frames."""
+        v_dir = self.path / str(vid)
+        return [v_dir / name for name in self.vehicles[vid].frame_files(max_frames)]
+
+    def is_fresh(self) -> bool:
+        """Cheap check: one ``stat`` per folder, no listing."""
+        try:
+            if os.stat(self.path).st_mtime_ns != self.dir_mtime:
+                return False
+            return all(os.stat(self.path / str(vid)).st_mtime_ns == v.dir_mtime
+                       for vid, v in self.vehicles.items())
+        except FileNotFoundError:
+            return False
+
+    @classmethod
+    def build(cls, path) -> "ScenarioIndex":
+        path = Path(path)
+        dir_mtime = os.stat(path).st_mtime_ns
+        vehicles = {
+            int(entry.name): VehicleIndex.build(Path(entry.path))
+            for entry in os.scandir(path) if entry.is_dir() and entry.name.isdigit()
+        }
+        return cls(path, dir_mtime, dict(sorted(vehicles.items())))
+
+    def save(self) -> None:
+        """
+        Write the sidecar. The file is created first and then filled in
+        place: creating it changes the folder mtime, rewriting it does not,
+        so the mtime recorded in between stays valid.
+        """
+        target = self.path / INDEX_FILE
+        if not target.exists():
+            target.touch()
+        self.dir_mtime = os.stat(self.path).st_mtime_ns
+        payload = {
+            "version": INDEX_VERSION,
+            "dir_mtime": self.dir_mtime,
+            "vehicles": {str(vid): asdict(v) for vid, v in self.vehicles.items()},
+        }
+        with open(target, "w") as f:
+            json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def read(cls, path) -> Optional["ScenarioIndex"]:
+        """The stored index, or None if missing, unreadable or of another version."""
+        path = Path(path)
+        try:
+            with open(path / INDEX_FILE) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get("version") != INDEX_VERSION:
+            return None
+        vehicles = {int(vid): VehicleIndex(**v) for vid, v in payload["vehicles"].items()}
+        return cls(path, payload["dir_mtime"], vehicles)
+
+
+def load_index(scenario_path, rebuild: bool = False, save: bool = True) -> ScenarioIndex:
+    """
+    Index of a scenario folder: cached, else the sidecar if still fresh,
+    else a new listing (written back when ``save`` and the folder is
+    writable; read-only datasets just list every time).
+    """
+    scenario_path = Path(scenario_path)
+    key = str(scenario_path.resolve())
+    index = None if rebuild else _CACHE.get(key)
+    if index is None and not rebuild:
+        index = ScenarioIndex.read(scenario_path)
+    if index is None or not index.is_fresh():
+        index = ScenarioIndex.build(scenario_path)
+        logger.info("Indexed %s: %d vehicles, %d files", scenario_path, len(index.vehicles),
+                    sum(len(v.files) for v in index.vehicles.values()))
+        if save:
+            try:
+                index.save()
+            except OSError as e:
+                logger.debug("Scenario index not saved (%s)", e)
+    _CACHE[key] = index
+    return index
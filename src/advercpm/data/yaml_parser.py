@@ -0,0 +1,48 @@
+from pathlib import Path
+from typing import Dict, List
+
+from advercpm.data.archive import INDEX_NAME, ShardReader
+from advercpm.utils.file_ops import parse_yaml
+
+
+def list_vehicle_ids(scenario_path) -> List[int]:
+    """
+    Return the sorted CAV ids of a scenario (its numeric sub-folders).
+    """
+    scenario_path = Path(scenario_path)
+    return sorted(
+        int(p.name) for p in scenario_path.iterdir() if p.is_dir() and p.name.isdigit()
+    )
+
+
+def list_frames(vehicle_path) -> List[str]:
+    """
+    Return the sorted frame stems (e.g. ``"000068"``) of one vehicle folder.
+    """
+    return sorted(p.stem for p in Path(vehicle_path).glob("*.yaml"))
+
+
+def load_scenario(scenario_path) -> Dict[str, Dict[int, dict]]:
+    """
+    Parse every CPM of a scenario, grouped by frame.
+
+    Reads plain scenario folders as well as sharded runner output.
+
+    Returns:
+        ``{frame_stem: {cav_id: cpm_dict}}`` ordered by frame stem. A CAV
+        missing a frame is simply absent from that frame's mapping.
+    """
+    scenario_path = Path(scenario_path)
+    frames: Dict[str, Dict[int, dict]] = {}
+    if (scenario_path / INDEX_NAME).exists():
+        with ShardReader(scenario_path) as reader:
+            for key in reader.keys():
+                vid, name = key.split("/", 1)
+                if vid.isdigit() and name.endswith(".yaml"):
+                    frames.setdefault(Path(name).stem, {})[int(vid)] = reader.read_yaml(key)
+        return {stem: frames[stem] for stem in sorted(frames)}
+    for vid in list_vehicle_ids(scenario_path):
+        v_dir = scenario_path / str(vid)
+        for stem in list_frames(v_dir):
+            frames.setdefault(stem, {})[vid] = parse_yaml(v_dir / f"{stem}.yaml")
+    return {stem: frames[stem] for stem in sorted(frames)}
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from advercpm.data.archive import INDEX_NAME, ShardReader
+from advercpm.data.cpm_codec import size_summary, sizes_for_counts
+from advercpm.data.scenario_index import count_actor_lines, load_index
+from advercpm.utils.profiling import Profiler
+
+
+logger = logging.getLogger("advercpm.channel_load")
+
+
+def scenario_message_sizes(scenario_path) -> Dict[int, np.ndarray]:
+    """
+    Binary CPM size of every frame of a scenario, per sender.
+
+    Reads plain scenario folders as well as sharded runner output. Only the
+    object counts are needed: folders take them from the scenario index,
+    archive members are scanned line by line; no YAML is parsed.
+
+    Returns:
+        ``{vehicle_id: (F,) bytes}`` in frame order.
+    """
+    scenario_path = Path(scenario_path)
+    sizes: Dict[int, np.ndarray] = {}
+    if (scenario_path / INDEX_NAME).exists():
+        with ShardReader(scenario_path) as reader:
+            vids = sorted({int(k.split("/", 1)[0]) for k in reader.keys() if k.endswith(".yaml")})
+            for vid in vids:
+                sizes[vid] = sizes_for_counts([
+                    count_actor_lines(reader.read_bytes(k).splitlines(keepends=True))
+                    for k in reader.vehicle_frames(vid)
+                ])
+        return sizes
+    index = load_index(scenario_path)
+    for vid in index.vehicle_ids:
+        sizes[vid] = sizes_for_counts(index.vehicles[vid].actors)
+    return sizes
+
+
+def compare_channel_load(raw_scenario, adv_scenario, frame_period: float = 0.1) -> Dict[str, Any]:
+    """
+    Per-sender message size and channel load of raw vs. attacked data.
+    """
+    raw = scenario_message_sizes(raw_scenario)
+    adv = scenario_message_sizes(adv_scenario)
+    report: Dict[str, Any] = {}
+    for vid in sorted(set(raw) | set(adv)):
+        r = size_summary(raw.get(vid, np.zeros(0)), frame_period)
+        a = size_summary(adv.get(vid, np.zeros(0)), frame_period)
+        report[str(vid)] = {
+            "raw": r,
+            "attacked": a,
+            "overhead_bytes": a["total_bytes"] - r["total_bytes"],
+            "overhead_ratio": a["total_bytes"] / r["total_bytes"] if r["total_bytes"] else None,
+        }
+    return report
+
+
+def main():
+    from advercpm.simulation.runner import load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+
+    sim_root = Path(cfg.data.simulation_path)
+    adv_root = Path(cfg.data.adversarial_simulation_path)
+    scenarios = sorted(p for p in adv_root.iterdir() if p.is_dir())
+    if not scenarios:
+        raise RuntimeError(f"No simulation folders found under {adv_root}")
+
+    frame_period = float(cfg.cpm_generation.frame_period)
+    results = {}
+    with Profiler(cfg.profiling, log_dir, name="channel_load"):
+        for adv_scenario in scenarios:
+            report = compare_channel_load(sim_root / adv_scenario.name, adv_scenario, frame_period)
+            results[adv_scenario.name] = report
+            for vid, entry in report.items():
+                logger.info(
+                    "%s CAV %s: %.0f -> %.0f B/msg, %.1f -> %.1f kbit/s",
+                    adv_scenario.name, vid, entry["raw"]["mean_bytes"], entry["attacked"]["mean_bytes"],
+                    entry["raw"]["bitrate_bps"] / 1e3, entry["attacked"]["bitrate_bps"] / 1e3,
+                )
+
+    out_dir = Path(cfg.evaluation.results_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / f"channel_load_{cfg.experiment.name}.json"
+    with open(out_file, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info("Channel load report saved to: %s", out_file)
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # python -m advercpm.simulation.channel_load --config attack_drift.yaml
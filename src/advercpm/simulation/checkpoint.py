@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import random
+import signal
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+from omegaconf import DictConfig, OmegaConf
+
+
+logger = logging.getLogger("advercpm.checkpoint")
+
+CHECKPOINT_NAME = ".checkpoint.pkl"
+
+# Sections that do not change the produced output.
+_VOLATILE_SECTIONS = ("checkpoint", "logging", "profiling", "queue")
+
+
+def config_fingerprint(cfg: DictConfig) -> str:
+    """Hash of the parts of ``cfg`` that determine a run's output."""
+    container = OmegaConf.to_container(cfg, resolve=True)
+    for section in _VOLATILE_SECTIONS:
+        container.pop(section, None)
+    return hashlib.sha1(OmegaConf.to_yaml(OmegaConf.create(container)).encode()).hexdigest()
+
+
+# ----------------------------
+# Random state
+# ----------------------------
+
+def seed_everything(seed: Optional[int]) -> None:
+    """Seed the global generators the attacks draw from (``None``: leave as is)."""
+    if seed is None:
+        return
+    random.seed(int(seed))
+    np.random.seed(int(seed))
+
+
+def rng_state() -> Dict[str, Any]:
+    return {"random": random.getstate(), "numpy": np.random.get_state()}
+
+
+def restore_rng(state: Dict[str, Any]) -> None:
+    random.setstate(state["random"])
+    np.random.set_state(state["numpy"])
+
+
+# ----------------------------
+# Checkpointer
+# ----------------------------
+
+class Checkpointer:
+    """
+    Periodic, atomic snapshots of a run's state.
+
+    The state is whatever the caller builds (attack objects, progress,
+    partial results, random state); it is pickled to ``path`` every
+    ``every_frames`` frames, through a temporary file so a crash mid-write
+    keeps the previous checkpoint. ``fingerprint`` identifies the config:
+    resuming with a different one is refused.
+
+    Inside :meth:`catch_interrupts`, Ctrl+C stops the run at the next frame
+    boundary with a fresh checkpoint; a second Ctrl+C interrupts at once.
+    """
+
+    def __init__(self, path, every_frames: int = 500, fingerprint: str = ""):
+        self.path = Path(path)
+        self.every_frames = max(1, int(every_frames))
+        self.fingerprint = fingerprint
+        self.frames = 0
+        self.stop_requested = False
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """The saved state, or ``None`` when there is no checkpoint."""
+        if not self.path.exists():
+            return None
+        with open(self.path, "rb") as f:
+            saved = pickle.load(f)
+        if saved["fingerprint"] != self.fingerprint:
+            raise ValueError(
+                f"Checkpoint {self.path} was written with a different configuration; "
+                f"delete it or run without --resume"
+            )
+        return saved["state"]
+
+    def save(self, state: Dict[str, Any]) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"fingerprint": self.fingerprint, "state": state}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        logger.debug("Checkpoint written to %s", self.path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint (the run completed)."""
+        if self.path.exists():
+            self.path.unlink()
+
+    def tick(self, make_state: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Call after every completed frame; saves ``make_state()`` when due.
+
+        Raises:
+            KeyboardInterrupt: after saving, if a stop was requested.
+        """
+        self.frames += 1
+        if self.stop_requested or self.frames % self.every_frames == 0:
+            self.save(make_state())
+        if self.stop_requested:
+            logger.warning("Stopped at a frame boundary; continue with --resume")
+            raise KeyboardInterrupt
+
+    @contextmanager
+    def catch_interrupts(self) -> Iterator["Checkpointer"]:
+        if threading.current_thread() is not threading.main_thread():
+            yield self
+            return
+
+        def handler(signum, frame):
+            if self.stop_requested:
+                raise KeyboardInterrupt
+            self.stop_requested = True
+            logger.warning("Interrupt received: checkpointing at the next frame boundary "
+                           "(Ctrl+C again to stop now)")
+
+        previous = signal.signal(signal.SIGINT, handler)
+        try:
+            yield self
+        finally:
+            signal.signal(signal.SIGINT, previous)
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from advercpm.utils.math_utils import wrap_angle
+
+
+logger = logging.getLogger("advercpm.cpm_generation")
+
+
+# ----------------------------
+# Inclusion rule (ETSI TS 103 324 object inclusion)
+# ----------------------------
+
+def _inclusion(
+    present: np.ndarray,
+    position: np.ndarray,
+    speed: np.ndarray,
+    heading: np.ndarray,
+    now: float,
+    last_position: np.ndarray,
+    last_speed: np.ndarray,
+    last_heading: np.ndarray,
+    last_time: np.ndarray,
+    params: "GenerationParams",
+) -> np.ndarray:
+    """
+    Objects of one frame that go into the CPM, for K objects at once.
+
+    An object is included when it is perceived and either was never sent,
+    or moved / changed speed / turned past the thresholds since it was last
+    sent, or was last sent ``max_interval`` seconds ago or more.
+    """
+    never = np.isnan(last_time)
+    with np.errstate(invalid="ignore"):
+        moved = np.linalg.norm(position - last_position, axis=-1) > params.position_threshold
+        sped = np.abs(speed - last_speed) > params.speed_threshold
+        turned = np.abs(wrap_angle(heading - last_heading)) > params.heading_threshold
+        stale = now - last_time >= params.max_interval - 1e-9
+    return present & (never | moved | sped | turned | stale)
+
+
+class GenerationParams:
+    """
+    Thresholds of the CPM object inclusion rules.
+
+    Parameters:
+        position_threshold (float): position change that triggers inclusion (m). (default: 4.0)
+        speed_threshold (float): speed change that triggers inclusion, in the
+            dataset's speed unit (OPV2V: km/h; 1.8 km/h = 0.5 m/s). (default: 1.8)
+        heading_threshold (float): heading change that triggers inclusion (deg). (default: 4.0)
+        max_interval (float): time after which an object is always re-sent (s). (default: 1.0)
+        frame_period (float): time between consecutive frames (s). (default: 0.1)
+    """
+
+    __slots__ = ("position_threshold", "speed_threshold", "heading_threshold",
+                 "max_interval", "frame_period")
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        params = params or {}
+        self.position_threshold = float(params.get("position_threshold", 4.0))
+        self.speed_threshold = float(params.get("speed_threshold", 1.8))
+        self.heading_threshold = float(params.get("heading_threshold", 4.0))
+        self.max_interval = float(params.get("max_interval", 1.0))
+        self.frame_period = float(params.get("frame_period", 0.1))
+
+
+# ----------------------------
+# Whole-scenario form
+# ----------------------------
+
+def pack_objects(frames: Sequence[Dict[str, Any]]):
+    """
+    Stack the perceived objects of a frame sequence into (F, K) arrays.
+
+    Returns:
+        ids (K list), present (F, K) bool, position (F, K, 3),
+        speed (F, K), heading (F, K) in degrees. Absent entries are NaN.
+    """
+    slots: Dict[Any, int] = {}
+    for cpm in frames:
+        for vid in cpm.get("vehicles") or {}:
+            slots.setdefault(vid, len(slots))
+    n_frames, n_objects = len(frames), len(slots)
+
+    present = np.zeros((n_frames, n_objects), dtype=bool)
+    position = np.full((n_frames, n_objects, 3), np.nan)
+    speed = np.full((n_frames, n_objects), np.nan)
+    heading = np.full((n_frames, n_objects), np.nan)
+    for f, cpm in enumerate(frames):
+        vehicles = cpm.get("vehicles") or {}
+        if not vehicles:
+            continue
+        cols = np.fromiter((slots[vid] for vid in vehicles), dtype=np.int64, count=len(vehicles))
+        present[f, cols] = True
+        position[f, cols] = [v["location"][:3] for v in vehicles.values()]
+        speed[f, cols] = [v.get("speed", 0.0) for v in vehicles.values()]
+        heading[f, cols] = [v["angle"][1] if "angle" in v else 0.0 for v in vehicles.values()]
+    return list(slots), present, position, speed, heading
+
+
+def generation_mask(
+    present: np.ndarray,
+    position: np.ndarray,
+    speed: np.ndarray,
+    heading: np.ndarray,
+    params: GenerationParams,
+    times: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Inclusion decisions for a whole frame sequence of one sender.
+
+    Args:
+        present, position, speed, heading: arrays from :func:`pack_objects`.
+        params: inclusion thresholds.
+        times: (F,) frame timestamps in seconds (default: ``frame_period`` spacing).
+
+    Returns:
+        (F, K) bool, True where the object is part of that frame's CPM.
+    """
+    n_frames, n_objects = present.shape
+    if times is None:
+        times = np.arange(n_frames) * params.frame_period
+
+    last_position = np.full((n_objects, 3), np.nan)
+    last_speed = np.full(n_objects, np.nan)
+    last_heading = np.full(n_objects, np.nan)
+    last_time = np.full(n_objects, np.nan)
+
+    include = np.zeros_like(present)
+    for f in range(n_frames):
+        sent = _inclusion(present[f], position[f], speed[f], heading[f], times[f],
+                          last_position, last_speed, last_heading, last_time, params)
+        include[f] = sent
+        last_position[sent] = position[f, sent]
+        last_speed[sent] = speed[f, sent]
+        last_heading[sent] = heading[f, sent]
+        last_time[sent] = times[f]
+    return include
+
+
+# ----------------------------
+# Pipeline stage
+# ----------------------------
+
+class CpmGenerationFilter:
+    """
+    Drops perceived objects that the CPM generation rules would not send.
+
+    Keeps one state row per object (last sent position, speed, heading and
+    time), so it can run frame by frame (:meth:`apply`, as in the runner) or
+    over a whole sequence (:meth:`apply_frames`). Use one instance per
+    sending vehicle.
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        self.params = GenerationParams(params)
+        self.reset()
+
+    def reset(self) -> None:
+        self._slots: Dict[Any, int] = {}
+        self._last_position = np.zeros((0, 3))
+        self._last_speed = np.zeros(0)
+        self._last_heading = np.zeros(0)
+        self._last_time = np.zeros(0)
+        self._frame_index = 0
+        self.objects_seen = 0
+        self.objects_sent = 0
+
+    def _grow(self, n: int) -> None:
+        extra = n - len(self._last_time)
+        if extra <= 0:
+            return
+        self._last_position = np.concatenate([self._last_position, np.full((extra, 3), np.nan)])
+        self._last_speed = np.concatenate([self._last_speed, np.full(extra, np.nan)])
+        self._last_heading = np.concatenate([self._last_heading, np.full(extra, np.nan)])
+        self._last_time = np.concatenate([self._last_time, np.full(extra, np.nan)])
+
+    def apply(self, cpm: Dict[str, Any], time: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Filter the next frame of the sequence.
+
+        Args:
+            cpm: parsed CPM dict (not modified).
+            time: frame timestamp in seconds (default: ``frame_period`` spacing).
+
+        Returns:
+            Shallow copy of ``cpm`` whose ``vehicles`` holds only the sent objects.
+        """
+        if time is None:
+            time = self._frame_index * self.params.frame_period
+        self._frame_index += 1
+
+        vehicles = cpm.get("vehicles")
+        if not isinstance(vehicles, dict) or not vehicles:
+            return cpm
+        ids = list(vehicles)
+        cols = np.array([self._slots.setdefault(vid, len(self._slots)) for vid in ids])
+        self._grow(len(self._slots))
+
+        position = np.array([v["location"][:3] for v in vehicles.values()], dtype=float)
+        speed = np.array([v.get("speed", 0.0) for v in vehicles.values()], dtype=float)
+        heading = np.array([v["angle"][1] if "angle" in v else 0.0
+                            for v in vehicles.values()], dtype=float)
+        sent = _inclusion(
+            np.ones(len(ids), dtype=bool), position, speed, heading, time,
+            self._last_position[cols], self._last_speed[cols],
+            self._last_heading[cols], self._last_time[cols], self.params,
+        )
+        rows = cols[sent]
+        self._last_position[rows] = position[sent]
+        self._last_speed[rows] = speed[sent]
+        self._last_heading[rows] = heading[sent]
+        self._last_time[rows] = time
+
+        self.objects_seen += len(ids)
+        self.objects_sent += int(sent.sum())
+        out = dict(cpm)
+        out["vehicles"] = {vid: vehicles[vid] for vid, keep in zip(ids, sent) if keep}
+        return out
+
+    def apply_frames(
+        self,
+        frames: Sequence[Dict[str, Any]],
+        times: Optional[Sequence[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Filter a complete frame sequence in one pass (starts from a fresh state)."""
+        self.reset()
+        ids, present, position, speed, heading = pack_objects(frames)
+        include = generation_mask(present, position, speed, heading, self.params,
+                                  None if times is None else np.asarray(times, dtype=float))
+        self.objects_seen = int(present.sum())
+        self.objects_sent = int(include.sum())
+
+        out = []
+        for f, cpm in enumerate(frames):
+            vehicles = cpm.get("vehicles")
+            if not isinstance(vehicles, dict) or not vehicles:
+                out.append(cpm)
+                continue
+            kept = {ids[k] for k in np.flatnonzero(include[f])}
+            filtered = dict(cpm)
+            filtered["vehicles"] = {vid: v for vid, v in vehicles.items() if vid in kept}
+            out.append(filtered)
+        return out
+
+    def stats(self) -> Tuple[int, int]:
+        """(objects perceived, objects sent) so far."""
+        return self.objects_seen, self.objects_sent
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import logging
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from advercpm.data.yaml_parser import load_scenario
+from advercpm.utils.association import gated_nearest_neighbour, pairwise_distances
+from advercpm.utils.profiling import Profiler
+
+
+logger = logging.getLogger("advercpm.detector")
+
+
+# ----------------------------
+# Frame packing
+# ----------------------------
+
+@dataclass
+class FrameBatch:
+    """
+    Padded array view of a sequence of multi-CAV frames.
+
+    F frames, C CAVs, M = largest object count of any (frame, CAV) report.
+    """
+    cav_ids: List[int]
+    positions: np.ndarray      # (F, C, M, 2) reported object positions (x, y)
+    valid: np.ndarray          # (F, C, M) False for padding
+    object_ids: np.ndarray     # (F, C, M) reported ids (-1 for padding/non-int)
+    cav_positions: np.ndarray  # (F, C, 2) reporting CAV position
+    cav_valid: np.ndarray      # (F, C) False if the CAV has no CPM that frame
+
+
+def _object_id(key: Any) -> int:
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _cav_position(cpm: Mapping[str, Any]) -> Optional[List[float]]:
+    for key in ("lidar_pose", "true_ego_pos"):
+        pose = cpm.get(key)
+        if pose is not None and len(pose) >= 2:
+            return [float(pose[0]), float(pose[1])]
+    return None
+
+
+def pack_frames(
+    frames: Sequence[Mapping[int, Mapping[str, Any]]],
+    cav_ids: Optional[Sequence[int]] = None,
+) -> FrameBatch:
+    """
+    Pack ``[{cav_id: cpm_dict}, ...]`` into padded arrays.
+
+    Args:
+        frames: one mapping per frame from CAV id to that CAV's parsed CPM.
+        cav_ids: CAV order of the C axis (default: sorted union of all ids).
+    """
+    if cav_ids is None:
+        cav_ids = sorted({cid for frame in frames for cid in frame})
+    cav_ids = list(cav_ids)
+    col = {cid: c for c, cid in enumerate(cav_ids)}
+
+    n_frames, n_cavs = len(frames), len(cav_ids)
+    n_max = max(
+        (len(cpm.get("vehicles") or {}) for frame in frames for cpm in frame.values()),
+        default=0,
+    )
+
+    positions = np.zeros((n_frames, n_cavs, n_max, 2))
+    valid = np.zeros((n_frames, n_cavs, n_max), dtype=bool)
+    object_ids = np.full((n_frames, n_cavs, n_max), -1, dtype=np.int64)
+    cav_positions = np.zeros((n_frames, n_cavs, 2))
+    cav_valid = np.zeros((n_frames, n_cavs), dtype=bool)
+
+    for f, frame in enumerate(frames):
+        for cid, cpm in frame.items():
+            c = col.get(cid)
+            if c is None:
+                continue
+            pose = _cav_position(cpm)
+            if pose is not None:
+                cav_positions[f, c] = pose
+                cav_valid[f, c] = True
+            vehicles = cpm.get("vehicles") or {}
+            if not vehicles:
+                continue
+            n = len(vehicles)
+            positions[f, c, :n] = [v["location"][:2] for v in vehicles.values()]
+            object_ids[f, c, :n] = [_object_id(k) for k in vehicles]
+            valid[f, c, :n] = True
+
+    return FrameBatch(cav_ids, positions, valid, object_ids, cav_positions, cav_valid)
+
+
+# ----------------------------
+# Detection
+# ----------------------------
+
+@dataclass
+class DetectionResult:
+    """
+    Per-frame misbehavior flags.
+
+    ``ghost``/``drifted``/``residual`` are indexed like the packed reports
+    (F, C, M); ``missing`` counts, per (F, C), objects the CAV should have
+    reported but did not.
+    """
+    cav_ids: List[int]
+    frames: Optional[List[str]]
+    object_ids: np.ndarray
+    valid: np.ndarray
+    ghost: np.ndarray
+    drifted: np.ndarray
+    residual: np.ndarray
+    missing: np.ndarray
+
+    def scores(self) -> np.ndarray:
+        """(F, C) fraction of inconsistent reports per CAV and frame."""
+        flagged = (self.ghost | self.drifted).sum(axis=2) + self.missing
+        reported = self.valid.sum(axis=2) + self.missing
+        return flagged / np.maximum(reported, 1)
+
+    def summary(self) -> Dict[int, Dict[str, int]]:
+        """Totals per CAV over all frames."""
+        return {
+            cid: {
+                "objects": int(self.valid[:, c].sum()),
+                "ghost": int(self.ghost[:, c].sum()),
+                "drifted": int(self.drifted[:, c].sum()),
+                "missing": int(self.missing[:, c].sum()),
+            }
+            for c, cid in enumerate(self.cav_ids)
+        }
+
+
+class MisbehaviorDetector:
+    """
+    Cross-checks the CPMs of all CAVs of a frame against each other.
+
+    Every reported object is associated (gated nearest neighbour on x/y) with
+    the reports of the other CAVs that are close enough to perceive it:
+
+        - ghost: witnessed by at least ``min_witnesses`` CAVs, confirmed by none.
+        - drifted: confirmed, but further than ``drift_threshold`` from the
+          per-axis median of its own and the confirming positions.
+        - missing: inside this CAV's range, reported by another CAV and
+          confirmed by ``min_support`` more, but absent from its own report.
+
+    All frames of a chunk are processed with one set of batched distance
+    matrices of shape (F, C, C, M, M).
+
+    Parameters:
+        gate (float): association gate in meters. (default: 3.0)
+        drift_threshold (float): residual above which a match is drifted. (default: 1.0)
+        sensing_range (float): radius in which a CAV is expected to perceive objects. (default: 70.0)
+        self_radius (float): objects this close to a CAV are the CAV itself. (default: 2.5)
+        min_witnesses (int): witnesses required to call an object a ghost. (default: 1)
+        min_support (int): confirming CAVs required for drifted/missing. (default: 1)
+        chunk_size (int): frames per vectorized chunk. (default: 64)
+    """
+
+    def __init__(self, params: Optional[Dict[str, Any]] = None):
+        params = params or {}
+        self.gate = float(params.get("gate", 3.0))
+        self.drift_threshold = float(params.get("drift_threshold", 1.0))
+        self.sensing_range = float(params.get("sensing_range", 70.0))
+        self.self_radius = float(params.get("self_radius", 2.5))
+        self.min_witnesses = int(params.get("min_witnesses", 1))
+        self.min_support = int(params.get("min_support", 1))
+        self.chunk_size = max(1, int(params.get("chunk_size", 64)))
+
+    def detect(
+        self,
+        frames: Sequence[Mapping[int, Mapping[str, Any]]],
+        cav_ids: Optional[Sequence[int]] = None,
+        frame_names: Optional[List[str]] = None,
+    ) -> DetectionResult:
+        """Run detection on ``[{cav_id: cpm_dict}, ...]``."""
+        batch = pack_frames(frames, cav_ids)
+        result = self.detect_batch(batch)
+        result.frames = frame_names
+        return result
+
+    def detect_scenario(self, scenario_path) -> DetectionResult:
+        """Run detection on every frame of a scenario folder."""
+        scenario = load_scenario(scenario_path)
+        return self.detect(list(scenario.values()), frame_names=list(scenario))
+
+    def detect_batch(self, batch: FrameBatch) -> DetectionResult:
+        n_frames, n_cavs, n_max = batch.valid.shape
+        ghost = np.zeros((n_frames, n_cavs, n_max), dtype=bool)
+        drifted = np.zeros_like(ghost)
+        residual = np.zeros((n_frames, n_cavs, n_max))
+        missing = np.zeros((n_frames, n_cavs), dtype=np.int64)
+
+        for start in range(0, n_frames, self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            g, d, r, m = self._detect_chunk(
+                batch.positions[sl], batch.valid[sl],
+                batch.cav_positions[sl], batch.cav_valid[sl],
+            )
+            ghost[sl], drifted[sl], residual[sl], missing[sl] = g, d, r, m
+
+        return DetectionResult(
+            cav_ids=batch.cav_ids,
+            frames=None,
+            object_ids=batch.object_ids,
+            valid=batch.valid,
+            ghost=ghost,
+            drifted=drifted,
+            residual=residual,
+            missing=missing,
+        )
+
+    def _detect_chunk(self, pos, valid, cav_pos, cav_valid):
+        n_frames, n_cavs, n_max, _ = pos.shape
+        other = ~np.eye(n_cavs, dtype=bool)[None, :, :, None]
+
+        # [f, a, b, i, ...]: object i reported by CAV a, seen from CAV b
+        dist = pairwise_distances(pos[:, :, None], pos[:, None])
+        nn_idx, _, matched = gated_nearest_neighbour(
+            dist, valid[:, :, None], valid[:, None], self.gate
+        )
+
+        cav_dist = np.linalg.norm(pos[:, :, None] - cav_pos[:, None, :, None], axis=-1)
+        witness = (
+            valid[:, :, None]
+            & cav_valid[:, None, :, None]
+            & other
+            & (cav_dist <= self.sensing_range)
+            & (cav_dist > self.self_radius)
+        )
+        confirm = witness & matched
+        n_witness = witness.sum(axis=2)
+        n_confirm = confirm.sum(axis=2)
+
+        ghost = valid & (n_witness >= self.min_witnesses) & (n_confirm == 0)
+
+        # robust consensus: per-axis median of own + confirming positions
+        neighbours = np.take_along_axis(
+            np.broadcast_to(pos[:, None], (n_frames, n_cavs) + pos.shape[1:]),
+            nn_idx[..., None],
+            axis=3,
+        )
+        candidates = np.concatenate(
+            [np.where(confirm[..., None], neighbours, np.nan), pos[:, :, None]], axis=2
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            consensus = np.nanmedian(candidates, axis=2)
+        residual = np.where(
+            n_confirm > 0, np.linalg.norm(pos - consensus, axis=-1), 0.0
+        )
+        drifted = (
+            valid & (n_confirm >= self.min_support) & (residual > self.drift_threshold)
+        )
+
+        # [f, b, a, j]: object j of CAV b should be in CAV a's report but is not.
+        # Count each object once, from the lowest-index CAV that reported it.
+        support = n_confirm[:, :, None] - confirm
+        lower = np.tril(np.ones((n_cavs, n_cavs), dtype=bool), -1)[None, :, :, None]
+        reported_before = (matched & lower).any(axis=2)
+        miss = (
+            witness
+            & ~matched
+            & (support >= self.min_support)
+            & ~reported_before[:, :, None]
+        )
+        missing = miss.sum(axis=(1, 3))
+
+        return ghost, drifted, residual, missing
+
+
+def main():
+    from advercpm.simulation.runner import load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+
+    detector = MisbehaviorDetector(cfg.detection)
+    adv_root = Path(cfg.data.adversarial_simulation_path)
+    scenarios = sorted(p for p in adv_root.iterdir() if p.is_dir())
+    if not scenarios:
+        raise RuntimeError(f"No simulation folders found under {adv_root}")
+
+    with Profiler(cfg.profiling, log_dir, name="detector"):
+        for scenario in scenarios:
+            frames = load_scenario(scenario)
+            start = time.perf_counter()
+            result = detector.detect(list(frames.values()), frame_names=list(frames))
+            elapsed = time.perf_counter() - start
+            logger.info(
+                "%s: %d frames in %.3fs (%.0f frames/s)",
+                scenario.name, len(frames), elapsed, len(frames) / max(elapsed, 1e-9),
+            )
+            for cid, counts in result.summary().items():
+                logger.info("  CAV %d: %s", cid, counts)
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # python -m advercpm.simulation.detector --config attack_drift.yaml -- detection.gate=2.0
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from advercpm.utils import bev
+
+logger = logging.getLogger("advercpm.evaluator")
+
+
+# ----------------------------
+# Per-frame metrics
+# ----------------------------
+
+def _common_locations(raw: Dict[str, Any], attacked: Dict[str, Any]):
+    raw_v = raw.get("vehicles") or {}
+    adv_v = attacked.get("vehicles") or {}
+    common = [vid for vid in raw_v if vid in adv_v]
+    if not common:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+    a = np.array([raw_v[vid]["location"][:3] for vid in common], dtype=float)
+    b = np.array([adv_v[vid]["location"][:3] for vid in common], dtype=float)
+    return a, b
+
+
+def mse_position(raw: Dict[str, Any], attacked: Dict[str, Any]) -> float:
+    """Mean squared 3D position error over objects present in both frames."""
+    a, b = _common_locations(raw, attacked)
+    if not len(a):
+        return 0.0
+    return float(np.mean(np.sum((a - b) ** 2, axis=1)))
+
+
+def object_count_diff(raw: Dict[str, Any], attacked: Dict[str, Any]) -> float:
+    """Number of objects added (positive) or removed (negative) by the attack."""
+    return float(len(attacked.get("vehicles") or {}) - len(raw.get("vehicles") or {}))
+
+
+def trajectory_divergence(raw: Dict[str, Any], attacked: Dict[str, Any]) -> float:
+    """Mean horizontal displacement of objects present in both frames."""
+    a, b = _common_locations(raw, attacked)
+    if not len(a):
+        return 0.0
+    return float(np.mean(np.linalg.norm(a[:, :2] - b[:, :2], axis=1)))
+
+
+def occupancy_iou(raw: Dict[str, Any], attacked: Dict[str, Any]) -> float:
+    """IoU of the BEV occupancy grids of both frames (1 = same occupied cells)."""
+    return float(bev.compare_frames([raw], [attacked])["iou"][0])
+
+
+METRICS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], float]] = {
+    "MSE_position": mse_position,
+    "object_count_diff": object_count_diff,
+    "trajectory_divergence": trajectory_divergence,
+    "occupancy_iou": occupancy_iou,
+}
+
+# Metrics with a whole-sequence implementation (used by ``evaluate_frames``).
+BATCH_METRICS: Dict[str, Callable[[Sequence[Dict[str, Any]], Sequence[Dict[str, Any]]], np.ndarray]] = {
+    "occupancy_iou": lambda raw, attacked: bev.compare_frames(raw, attacked)["iou"],
+}
+
+# How a per-frame series is reduced to one number per run.
+SUMMARIES: Dict[str, Callable[[np.ndarray], float]] = {
+    "MSE_position": np.mean,
+    "object_count_diff": np.mean,
+    "trajectory_divergence": np.max,
+    "occupancy_iou": np.mean,
+}
+
+
+def evaluate_frames(
+    raw_frames: Sequence[Dict[str, Any]],
+    attacked_frames: Sequence[Dict[str, Any]],
+    metrics: Sequence[str],
+) -> Dict[str, np.ndarray]:
+    """
+    Compute per-frame metrics for aligned raw/attacked frame sequences.
+
+    Returns:
+        ``{metric: (F,) array}``.
+    """
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(
+            f"Unknown metric(s): {', '.join(unknown)}.\n"
+            f"Available metrics: {', '.join(METRICS)}"
+        )
+    return {
+        m: BATCH_METRICS[m](raw_frames, attacked_frames) if m in BATCH_METRICS
+        else np.array([METRICS[m](r, a) for r, a in zip(raw_frames, attacked_frames)])
+        for m in metrics
+    }
+
+
+def summarize(metric: str, values: np.ndarray) -> float:
+    """Reduce a per-frame series of ``metric`` to one run-level value."""
+    if len(values) == 0:
+        return 0.0
+    return float(SUMMARIES[metric](values))
+
+
+def summarize_all(per_frame: Dict[str, np.ndarray]) -> Dict[str, float]:
+    return {m: summarize(m, v) for m, v in per_frame.items()}
+
+
+def available_metrics() -> List[str]:
+    return list(METRICS)
+
+
+def save_results(
+    out_dir,
+    name: str,
+    frame_names: Sequence[str],
+    per_frame: Dict[str, np.ndarray],
+    per_frame_csv: bool = True,
+) -> Path:
+    """
+    Write ``summary_<name>.json`` (and ``per_frame_<name>.csv``) under ``out_dir``.
+
+    Returns:
+        Path of the summary file.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if per_frame_csv:
+        with open(out_dir / f"per_frame_{name}.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + list(per_frame))
+            for i, frame in enumerate(frame_names):
+                writer.writerow([frame] + [float(v[i]) for v in per_frame.values()])
+    summary_path = out_dir / f"summary_{name}.json"
+    with open(summary_path, "w") as f:
+        json.dump({"frames": len(frame_names), "metrics": summarize_all(per_frame)}, f, indent=2)
+    return summary_path
+
+
+# ----------------------------
+# Run results
+# ----------------------------
+
+def resolve_metrics(cfg) -> List[str]:
+    """Per-frame metrics requested by ``cfg.evaluation`` (empty when disabled)."""
+    metrics = list(cfg.evaluation.metrics) if cfg.evaluation.enabled else []
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(
+            f"Unknown metric(s): {', '.join(unknown)}.\n"
+            f"Available metrics: {', '.join(METRICS)}"
+        )
+    return metrics
+
+
+def report_metrics(cfg, name: str, vid: int, frame_names, per_frame) -> None:
+    """Log the metric summary of an attacked vehicle and save it if ``evaluation.save_results``."""
+    per_frame = {m: np.asarray(v, dtype=float) for m, v in per_frame.items()}
+    logger.info("Attack metrics on vehicle %d: %s", vid, summarize_all(per_frame))
+    if cfg.evaluation.save_results:
+        out = save_results(cfg.evaluation.results_path, name,
+                           frame_names, per_frame, cfg.evaluation.per_frame_csv)
+        logger.info("Evaluation results saved to: %s", out)
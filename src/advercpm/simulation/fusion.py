@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from advercpm.data.yaml_parser import load_scenario
+from advercpm.utils.association import greedy_assignment, pairwise_distances
+from advercpm.utils.geometry import box_iou_3d, boxes_from_vehicles
+from advercpm.utils.math_utils import world_to_local, wrap_angle
+from advercpm.utils.profiling import Profiler
+
+
+logger = logging.getLogger("advercpm.fusion")
+
+# Box layout of the packed arrays: x, y, z (box centre, world), yaw (rad),
+# then half-extents along the box axes.
+BOX_DIM = 7
+
+
+# ----------------------------
+# Frame packing
+# ----------------------------
+
+@dataclass
+class BoxBatch:
+    """
+    Padded boxes of a sequence of multi-CAV frames.
+
+    F frames, C CAVs, M = largest object count of any (frame, CAV) report.
+    """
+    cav_ids: List[int]
+    boxes: np.ndarray          # (F, C, M, 7)
+    valid: np.ndarray          # (F, C, M) False for padding
+    cav_poses: np.ndarray      # (F, C, 6) lidar_pose of the reporting CAV
+    cav_valid: np.ndarray      # (F, C) False if the CAV has no CPM that frame
+
+
+def vehicle_boxes(vehicles: Mapping[Any, Mapping[str, Any]]) -> np.ndarray:
+    """(N, 7) boxes of a CPM ``vehicles`` mapping, see :func:`boxes_from_vehicles`."""
+    _, centers, half, yaw = boxes_from_vehicles(vehicles, with_height=True)
+    return np.concatenate([centers, yaw[:, None], half], axis=1)
+
+
+def pack_boxes(
+    frames: Sequence[Mapping[int, Mapping[str, Any]]],
+    cav_ids: Optional[Sequence[int]] = None,
+) -> BoxBatch:
+    """Pack ``[{cav_id: cpm_dict}, ...]`` into padded box arrays."""
+    if cav_ids is None:
+        cav_ids = sorted({cid for frame in frames for cid in frame})
+    cav_ids = list(cav_ids)
+    col = {cid: c for c, cid in enumerate(cav_ids)}
+    n_max = max(
+        (len(cpm.get("vehicles") or {}) for frame in frames for cpm in frame.values()),
+        default=0,
+    )
+
+    boxes = np.zeros((len(frames), len(cav_ids), n_max, BOX_DIM))
+    valid = np.zeros(boxes.shape[:3], dtype=bool)
+    cav_poses = np.zeros((len(frames), len(cav_ids), 6))
+    cav_valid = np.zeros((len(frames), len(cav_ids)), dtype=bool)
+    for f, frame in enumerate(frames):
+        for cid, cpm in frame.items():
+            c = col.get(cid)
+            if c is None:
+                continue
+            pose = cpm.get("lidar_pose")
+            if pose is not None:
+                cav_poses[f, c, : min(6, len(pose))] = list(pose)[:6]
+            cav_valid[f, c] = True
+            b = vehicle_boxes(cpm.get("vehicles") or {})
+            boxes[f, c, : len(b)] = b
+            valid[f, c, : len(b)] = True
+    return BoxBatch(cav_ids, boxes, valid, cav_poses, cav_valid)
+
+
+def ground_truth(frames: Sequence[Mapping[int, Mapping[str, Any]]]):
+    """
+    Union of the objects of all CAVs per frame (by object id), as padded
+    ``(F, G, 7)`` boxes and ``(F, G)`` validity mask.
+    """
+    merged = []
+    for frame in frames:
+        objects: Dict[Any, Mapping[str, Any]] = {}
+        for cid in sorted(frame):
+            for oid, v in (frame[cid].get("vehicles") or {}).items():
+                objects.setdefault(oid, v)
+        merged.append(vehicle_boxes(objects))
+    n_max = max((len(b) for b in merged), default=0)
+    boxes = np.zeros((len(merged), n_max, BOX_DIM))
+    valid = np.zeros((len(merged), n_max), dtype=bool)
+    for f, b in enumerate(merged):
+        boxes[f, : len(b)] = b
+        valid[f, : len(b)] = True
+    return boxes, valid
+
+
+# ----------------------------
+# Fusion
+# ----------------------------
+
+@dataclass
+class FusedFrames:
+    """
+    Fused objects per frame (K = clusters of the busiest frame).
+
+    ``members[f, k, c]`` is the index of CAV c's object in cluster k
+    (-1 if that CAV did not report it).
+    """
+    cav_ids: List[int]
+    boxes: np.ndarray          # (F, K, 7)
+    valid: np.ndarray          # (F, K)
+    support: np.ndarray        # (F, K) number of CAVs reporting the object
+    members: np.ndarray        # (F, K, C)
+    cav_poses: np.ndarray      # (F, C, 6)
+
+    def in_frame_of(self, cav_id: int) -> np.ndarray:
+        """(F, K, 7) boxes in the lidar frame of ``cav_id`` (e.g. the ego)."""
+        c = self.cav_ids.index(cav_id)
+        pose = self.cav_poses[:, c]
+        local = self.boxes.copy()
+        local[..., 0:3] = world_to_local(self.boxes[..., 0:3], pose)
+        local[..., 3] = wrap_angle(self.boxes[..., 3] - np.radians(pose[:, 4])[:, None],
+                                   degrees=False)
+        return local
+
+
+@dataclass
+class FusionErrors:
+    """Per-frame errors of the fused objects against ground truth."""
+    frames: Optional[List[str]]
+    true_positives: np.ndarray     # (F,) fused objects matched to a true object
+    false_positives: np.ndarray    # (F,) fused objects with no true counterpart
+    false_negatives: np.ndarray    # (F,) true objects missing from the fusion
+    position_error: np.ndarray     # (F,) mean centre distance of the matches (m)
+    yaw_error: np.ndarray          # (F,) mean absolute heading error of the matches (deg)
+    iou: np.ndarray                # (F,) mean 3D IoU of the matches
+
+    def summary(self) -> Dict[str, float]:
+        tp = int(self.true_positives.sum())
+        fp = int(self.false_positives.sum())
+        fn = int(self.false_negatives.sum())
+        weights = self.true_positives
+        total = max(tp, 1)
+        return {
+            "frames": int(len(self.true_positives)),
+            "true_positives": tp,
+            "false_positives": fp,
+            "false_negatives": fn,
+            "precision": tp / max(tp + fp, 1),
+            "recall": tp / max(tp + fn, 1),
+            "position_error": float((self.position_error * weights).sum() / total),
+            "max_position_error": float(self.position_error.max(initial=0.0)),
+            "yaw_error": float((self.yaw_error * weights).sum() / total),
+            "iou": float((self.iou * weights).sum() / total),
+        }
+
+    def per_frame(self) -> Dict[str, np.ndarray]:
+        return {
+            "true_positives": self.true_positives,
+            "false_positives": self.false_positives,
+            "false_negatives": self.false_negatives,
+            "position_error": self.position_error,
+            "yaw_error": self.yaw_error,
+            "iou": self.iou,
+        }
+
+
+class LateFusion:
+    """
+    Object-level late fusion of the CPMs of all CAVs of a frame.
+
+    Object positions are world coordinates in the dataset CPMs, so the
+    common frame is the world frame (:meth:`FusedFrames.in_frame_of` gives
+    the ego's view). CAVs are merged one after the other: each CAV's objects
+    are assigned one-to-one (greedy, within ``gate`` of the running cluster
+    centre) to the clusters built so far, and the rest open new clusters.
+    A fused box is the mean of its members (circular mean for the heading).
+    Every step is batched over the frames of a chunk.
+
+    Parameters:
+        gate (float): association gate between a cluster and a report (m). (default: 2.0)
+        min_support (int): CAVs that must report an object for it to be kept. (default: 1)
+        eval_gate (float): gate when matching fused to true objects (m). (default: 2.0)
+        eval_min_iou (float): 3D IoU a fused/true match also needs (0: centre distance only). (default: 0.0)
+        chunk_size (int): frames per vectorized chunk. (default: 64)
+    """
+
+    def __init__(self, params: Optional[Mapping[str, Any]] = None):
+        params = params or {}
+        self.gate = float(params.get("gate", 2.0))
+        self.min_support = int(params.get("min_support", 1))
+        self.eval_gate = float(params.get("eval_gate", 2.0))
+        self.eval_min_iou = float(params.get("eval_min_iou", 0.0))
+        self.chunk_size = max(1, int(params.get("chunk_size", 64)))
+
+    def fuse(
+        self,
+        frames: Sequence[Mapping[int, Mapping[str, Any]]],
+        cav_ids: Optional[Sequence[int]] = None,
+    ) -> FusedFrames:
+        """Fuse ``[{cav_id: cpm_dict}, ...]``."""
+        return self.fuse_batch(pack_boxes(frames, cav_ids))
+
+    def fuse_batch(self, batch: BoxBatch) -> FusedFrames:
+        n_frames, n_cavs, n_max = batch.valid.shape
+        chunks = [self._fuse_chunk(batch.boxes[s: s + self.chunk_size],
+                                   batch.valid[s: s + self.chunk_size])
+                  for s in range(0, n_frames, self.chunk_size)]
+        n_clusters = max((c[0].shape[1] for c in chunks), default=0)
+        boxes = np.zeros((n_frames, n_clusters, BOX_DIM))
+        valid = np.zeros((n_frames, n_clusters), dtype=bool)
+        support = np.zeros((n_frames, n_clusters), dtype=np.int64)
+        members = np.full((n_frames, n_clusters, n_cavs), -1, dtype=np.int64)
+        for i, (b, v, s, m) in enumerate(chunks):
+            sl = slice(i * self.chunk_size, i * self.chunk_size + len(b))
+            k = b.shape[1]
+            boxes[sl, :k], valid[sl, :k], support[sl, :k], members[sl, :k] = b, v, s, m
+        return FusedFrames(batch.cav_ids, boxes, valid, support, members, batch.cav_poses)
+
+    def _fuse_chunk(self, boxes, valid):
+        n_frames, n_cavs, n_max, _ = boxes.shape
+        n_slots = n_cavs * n_max
+        # running sums per cluster: centre (3), cos/sin of yaw (2), half-extent (3)
+        sums = np.zeros((n_frames, n_slots, 8))
+        count = np.zeros((n_frames, n_slots))
+        members = np.full((n_frames, n_slots, n_cavs), -1, dtype=np.int64)
+        n_used = np.zeros(n_frames, dtype=np.int64)
+
+        obj = np.concatenate([boxes[..., 0:3], np.cos(boxes[..., 3:4]), np.sin(boxes[..., 3:4]),
+                              boxes[..., 4:7]], axis=-1)       # (F, C, M, 8)
+        for c in range(n_cavs):
+            k_used = int(n_used.max(initial=0))     # slots fill up front to back
+            live = count[:, :k_used] > 0
+            centres = sums[:, :k_used, 0:2] / np.maximum(count[:, :k_used], 1)[..., None]
+            dist = pairwise_distances(centres, obj[:, c, :, 0:2])
+            match, _ = greedy_assignment(dist, live, valid[:, c], self.gate)
+
+            f, k = np.nonzero(match >= 0)
+            m = match[f, k]
+            sums[f, k] += obj[f, c, m]
+            count[f, k] += 1
+            members[f, k, c] = m
+
+            assigned = np.zeros((n_frames, n_max), dtype=bool)
+            assigned[f, m] = True
+            new = valid[:, c] & ~assigned
+            slot = n_used[:, None] + np.cumsum(new, axis=1) - 1
+            f, m = np.nonzero(new)
+            k = slot[f, m]
+            sums[f, k] = obj[f, c, m]
+            count[f, k] = 1
+            members[f, k, c] = m
+            n_used += new.sum(axis=1)
+
+        k_max = int(n_used.max(initial=0))
+        sums, count, members = sums[:, :k_max], count[:, :k_max], members[:, :k_max]
+        support = (members >= 0).sum(axis=2)
+        fused = np.zeros((n_frames, k_max, BOX_DIM))
+        n = np.maximum(count, 1)[..., None]
+        fused[..., 0:3] = sums[..., 0:3] / n
+        fused[..., 3] = np.arctan2(sums[..., 4], sums[..., 3])
+        fused[..., 4:7] = sums[..., 5:8] / n
+        keep = (count > 0) & (support >= self.min_support)
+        return fused, keep, support, members
+
+    def evaluate(
+        self,
+        fused: FusedFrames,
+        truth_boxes: np.ndarray,
+        truth_valid: np.ndarray,
+        frame_names: Optional[List[str]] = None,
+    ) -> FusionErrors:
+        """Match fused objects to ``(F, G, 7)`` true boxes and count errors."""
+        dist = pairwise_distances(fused.boxes[..., 0:2], truth_boxes[..., 0:2])
+        iou = box_iou_3d(fused.boxes, truth_boxes)
+        if self.eval_min_iou > 0:
+            dist = np.where(iou >= self.eval_min_iou, dist, np.inf)
+        match, cost = greedy_assignment(dist, fused.valid, truth_valid, self.eval_gate)
+        hit = match >= 0
+        match_iou = np.take_along_axis(iou, np.maximum(match, 0)[..., None], axis=2)[..., 0]
+        tp = hit.sum(axis=1)
+        true_yaw = np.take_along_axis(truth_boxes[..., 3], np.maximum(match, 0), axis=1)
+        yaw_err = np.abs(np.degrees(wrap_angle(fused.boxes[..., 3] - true_yaw, degrees=False)))
+        denom = np.maximum(tp, 1)
+        return FusionErrors(
+            frames=frame_names,
+            true_positives=tp,
+            false_positives=(fused.valid & ~hit).sum(axis=1),
+            false_negatives=truth_valid.sum(axis=1) - tp,
+            position_error=np.where(hit, cost, 0.0).sum(axis=1) / denom,
+            yaw_error=np.where(hit, yaw_err, 0.0).sum(axis=1) / denom,
+            iou=np.where(hit, match_iou, 0.0).sum(axis=1) / denom,
+        )
+
+    def evaluate_scenario(self, raw_scenario, fused_scenario=None) -> FusionErrors:
+        """
+        Fuse the CPMs of ``fused_scenario`` (default: the raw ones) and score
+        them against the objects of ``raw_scenario``. Only frames present in
+        ``fused_scenario`` are scored: raw frames a run never produced (e.g.
+        past ``simulation.max_frames``) are not counted as misses.
+        """
+        raw = load_scenario(raw_scenario)
+        sent = raw if fused_scenario is None else load_scenario(fused_scenario)
+        stems = sorted(sent)
+        truth_boxes, truth_valid = ground_truth([raw.get(s, {}) for s in stems])
+        fused = self.fuse([sent.get(s, {}) for s in stems])
+        return self.evaluate(fused, truth_boxes, truth_valid, stems)
+
+
+def save_fusion_results(out_dir, name: str, errors: FusionErrors) -> Path:
+    """Write ``fusion_<name>.json`` (summary and per-frame series)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / f"fusion_{name}.json"
+    report = {
+        "summary": errors.summary(),
+        "frames": errors.frames,
+        "per_frame": {k: v.tolist() for k, v in errors.per_frame().items()},
+    }
+    with open(out_file, "w") as f:
+        json.dump(report, f, indent=2)
+    return out_file
+
+
+def main():
+    from advercpm.simulation.runner import load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+
+    fusion = LateFusion(cfg.fusion)
+    sim_root = Path(cfg.data.simulation_path)
+    adv_root = Path(cfg.data.adversarial_simulation_path)
+    scenarios = sorted(p for p in adv_root.iterdir() if p.is_dir())
+    if not scenarios:
+        raise RuntimeError(f"No simulation folders found under {adv_root}")
+
+    with Profiler(cfg.profiling, log_dir, name="fusion"):
+        for scenario in scenarios:
+            start = time.perf_counter()
+            errors = fusion.evaluate_scenario(sim_root / scenario.name, scenario)
+            elapsed = time.perf_counter() - start
+            logger.info("%s: fused %d frames in %.3fs: %s",
+                        scenario.name, len(errors.true_positives), elapsed, errors.summary())
+            out = save_fusion_results(cfg.evaluation.results_path,
+                                      f"{cfg.experiment.name}_{scenario.name}", errors)
+            logger.info("Fusion results saved to: %s", out)
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # python -m advercpm.simulation.fusion --config attack_drift.yaml
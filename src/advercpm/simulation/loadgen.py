@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from advercpm.simulation.service import LatencyHistogram, _json_default, _set_nodelay
+from advercpm.utils.file_ops import parse_yaml
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AdverCPM attack-service load generator")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", type=str, default=None)
+    parser.add_argument("--cavs", type=int, default=32, help="Concurrent senders")
+    parser.add_argument("--rate", type=float, default=10.0, help="Frames per second per CAV")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--objects", type=int, default=30,
+                        help="Vehicles per synthetic frame (ignored with --frame)")
+    parser.add_argument("--frame", type=str, default=None,
+                        help="CPM YAML used as the payload instead of a synthetic frame")
+    parser.add_argument("--max-late", type=float, default=0.01,
+                        help="Fail if more than this fraction of sends miss their slot")
+    return parser.parse_args(argv)
+
+
+def synthetic_frame(n_objects: int, rng: random.Random) -> Dict[str, Any]:
+    """A frame shaped like an OPV2V CPM with ``n_objects`` vehicles."""
+    pose = [rng.uniform(-100, 100), rng.uniform(-100, 100), 1.9, 0.0, rng.uniform(-180, 180), 0.0]
+    vehicles = {
+        str(1000 + i): {
+            "angle": [0.0, rng.uniform(-180, 180), 0.0],
+            "center": [0.0, 0.0, 0.8],
+            "extent": [2.4, 1.0, 0.8],
+            "location": [pose[0] + rng.uniform(-50, 50), pose[1] + rng.uniform(-50, 50), 0.0],
+            "speed": rng.uniform(0, 30),
+        }
+        for i in range(n_objects)
+    }
+    return {"ego_speed": rng.uniform(0, 30), "lidar_pose": pose, "vehicles": vehicles}
+
+
+async def _connect(args):
+    if args.unix_socket:
+        return await asyncio.open_unix_connection(args.unix_socket, limit=2 ** 24)
+    reader, writer = await asyncio.open_connection(args.host, args.port, limit=2 ** 24)
+    _set_nodelay(writer)
+    return reader, writer
+
+
+async def run_sender(sender: int, payload: bytes, args, histogram: LatencyHistogram,
+                     counters: Dict[str, int]) -> None:
+    """Send one frame every ``1 / rate`` seconds on a fixed schedule."""
+    reader, writer = await _connect(args)
+    period = 1.0 / args.rate
+    loop = asyncio.get_event_loop()
+    # spread senders over the period so the service sees a steady stream
+    start = loop.time() + period * sender / max(args.cavs, 1)
+    n_frames = int(args.duration * args.rate)
+    try:
+        for k in range(n_frames):
+            slot = start + k * period
+            delay = slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif -delay > period:
+                counters["late"] += 1
+            t0 = time.perf_counter()
+            writer.write(payload)
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            histogram.record(time.perf_counter() - t0)
+            counters["sent"] += 1
+            if "error" in response:
+                counters["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def fetch_stats(args) -> Dict[str, Any]:
+    reader, writer = await _connect(args)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run(args) -> int:
+    rng = random.Random(0)
+    frame = parse_yaml(args.frame) if args.frame else synthetic_frame(args.objects, rng)
+    payloads = [
+        json.dumps({"sender": sender, "frame": frame}, default=_json_default).encode() + b"\n"
+        for sender in range(args.cavs)
+    ]
+
+    histogram = LatencyHistogram()
+    counters = {"sent": 0, "late": 0, "errors": 0}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        run_sender(sender, payloads[sender], args, histogram, counters)
+        for sender in range(args.cavs)
+    ))
+    elapsed = time.perf_counter() - t0
+    server = await fetch_stats(args)
+
+    target = args.cavs * args.rate
+    achieved = counters["sent"] / elapsed
+    late_fraction = counters["late"] / max(counters["sent"], 1)
+    print(f"[RESULT] {args.cavs} CAVs x {args.rate:g} Hz: target {target:.0f} msg/s, "
+          f"achieved {achieved:.0f} msg/s over {elapsed:.1f}s")
+    print(f"[RESULT] client round-trip: {histogram.snapshot()}")
+    print(f"[RESULT] server processing: {server.get('stats')}")
+    print(f"[RESULT] late sends: {counters['late']} ({100 * late_fraction:.2f}%), "
+          f"errors: {counters['errors']}")
+
+    ok = counters["errors"] == 0 and late_fraction <= args.max_late
+    print("[RESULT] PASS" if ok else "[RESULT] FAIL: service did not keep up")
+    return 0 if ok else 1
+
+
+def main(argv: Optional[List[str]] = None):
+    sys.exit(asyncio.run(run(parse_args(argv))))
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script (service must be running)
+    # python -m advercpm.simulation.loadgen --cavs 64 --rate 10 --duration 30
@@ -1,14 +1,32 @@
 import argparse
-import shutil
+import dataclasses
 import logging
+import random
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
-from omegaconf import DictConfig
+from typing import Callable, Container, Dict, List, Optional, Sequence, Tuple
+from omegaconf import DictConfig, OmegaConf
 
 
-from advercpm.attacks import build_attack
+from advercpm.attacks import build_attack, get_attack_class
 from src.advercpm.config.loader import load_config
 from advercpm.utils.logger import LoggerSetup
-from advercpm.utils.file_ops import parse_yaml, save_yaml
+from advercpm.utils.file_ops import parse_yaml
+from advercpm.data.archive import open_output
+from advercpm.data.lidar_reader import DEFAULT_CHUNK_POINTS, transform_pcd
+from advercpm.data.overlay import FrameOverlay, materialize
+from advercpm.data.scenario_index import ScenarioIndex, load_index
+from advercpm.simulation.evaluator import METRICS, report_metrics, resolve_metrics
+from advercpm.simulation.cpm_generation import CpmGenerationFilter
+from advercpm.simulation.fusion import LateFusion, save_fusion_results
+from advercpm.simulation.schedule import active_frames, compile_schedule
+from advercpm.simulation.warehouse import new_run_uid, record_run
+from advercpm.simulation.checkpoint import (
+    CHECKPOINT_NAME, Checkpointer, config_fingerprint, restore_rng, rng_state, seed_everything,
+)
+from advercpm.utils.profiling import Profiler
 # ---------------------
 # CLI entry-point helper
 # ---------------------
@@ -20,6 +38,15 @@ def parse_args() -> argparse.Namespace:
                    help="Scenario YAML (e.g. attack_drift.yaml)")
     parser.add_argument("--default", type=str, default="src/advercpm/config/default.yaml",
                    help="Default YAML (always loaded first)")
+    # Profiling switches (same as profiling.* overrides; output goes to the log dir)
+    parser.add_argument("--profile", action="store_true",
+                   help="cProfile every process (.prof files)")
+    parser.add_argument("--trace-malloc", action="store_true",
+                   help="tracemalloc snapshots at stage boundaries")
+    parser.add_argument("--sample", action="store_true",
+                   help="periodic stack sampler (collapsed stacks)")
+    parser.add_argument("--resume", action="store_true",
+                   help="continue an interrupted run from its checkpoint")
     # Everything after -- are OmegaConf dotlist overrides, example:
     #   python -m advercpm.simulation.runner --config config/experiments/attack_drift.yaml -- attack.parameters.drift_rate=0.8 logging.level=DEBUG
     parser.add_argument("overrides", nargs=argparse.REMAINDER)
@@ -30,16 +57,258 @@ def load_from_cli() -> DictConfig:
     args = parse_args()
     # strip leading "--" that argparse keeps in REMAINDER sometimes
     overrides = [o for o in args.overrides if o != "--"]
+    switches = {"cprofile": args.profile, "tracemalloc": args.trace_malloc, "sampler": args.sample}
+    overrides = [f"profiling.{k}=true" for k, on in switches.items() if on] + overrides
+    if args.resume:
+        overrides = ["checkpoint.resume=true"] + overrides
     return load_config(default_path=args.default, scenario_path=args.config, cli_overrides=overrides)
 
 
 def main():
     cfg = load_from_cli()
     log_dir = LoggerSetup(cfg).setup()
+    with Profiler(cfg.profiling, log_dir, name="runner") as profiler:
+        run(cfg, log_dir, profiler)
+
+
+def select_vehicles(sim_path: Path, index: Optional[ScenarioIndex] = None):
+    """
+    Vehicle ids of one simulation folder, with the ego and malicious picks.
+
+    Returns:
+        (vehicle_ids, ego_id, malicious_id): the ego is the smallest id, the
+        malicious vehicle the largest one.
+    """
+    # Vehicle folders are inside sim_path (e.g., 649, 650, 659)
+    if index is not None:
+        vehicle_ids = index.vehicle_ids
+    else:
+        vehicle_ids = sorted(int(p.name) for p in sim_path.iterdir() if p.is_dir() and p.name.isdigit())
+    if len(vehicle_ids) < 2:
+        raise RuntimeError(
+            f"Expected at least 2 vehicle folders in {sim_path}, found {len(vehicle_ids)}"
+        )
+
+    ego_id = vehicle_ids[0]
+    malicious_id = vehicle_ids[-1] if vehicle_ids[-1] != ego_id else vehicle_ids[1]
+    return vehicle_ids, ego_id, malicious_id
+
+
+ATTACKER_SELECTIONS = ("last", "ids", "fraction", "all")
+
+
+def select_attackers(cfg: DictConfig, vehicle_ids: Sequence[int], ego_id: int) -> List[int]:
+    """
+    Malicious vehicle ids picked by ``attackers`` (sorted; never the ego).
+
+    ``fraction`` draws ``round(fraction * n)`` (at least one) of the n
+    non-ego CAVs, seeded by ``experiment.seed``.
+    """
+    sel = cfg.attackers
+    candidates = [vid for vid in vehicle_ids if vid != ego_id]
+    if sel.select == "last":
+        return [candidates[-1]]
+    if sel.select == "all":
+        return candidates
+    if sel.select == "ids":
+        ids = sorted(set(int(vid) for vid in sel.ids))
+        unknown = [vid for vid in ids if vid not in candidates]
+        if not ids or unknown:
+            raise ValueError(
+                f"attackers.ids must name non-ego vehicles of the scenario, got {list(sel.ids)}.\n"
+                f"Candidates: {candidates} (ego: {ego_id})"
+            )
+        return ids
+    if sel.select == "fraction":
+        if not 0.0 < sel.fraction <= 1.0:
+            raise ValueError(f"attackers.fraction must be in (0, 1], got {sel.fraction}")
+        k = max(1, int(round(sel.fraction * len(candidates))))
+        return sorted(random.Random(cfg.experiment.seed).sample(candidates, k))
+    raise ValueError(
+        f"Unknown attackers.select '{sel.select}'.\n"
+        f"Available selections: {', '.join(ATTACKER_SELECTIONS)}"
+    )
+
+
+def attack_config(cfg: DictConfig, vid: int, ego_id: int) -> DictConfig:
+    """
+    Attack config of attacker ``vid``: its ``attackers.attacks`` entry, else
+    ``attack``. ``ego_id`` / ``malicious_id`` parameters the attack declares
+    but the config leaves unset are filled in.
+    """
+    spec = cfg.attackers.attacks.get(vid)
+    if spec is not None and cfg.attackers.coordinated:
+        raise ValueError("attackers.coordinated runs `attack` on every attacker; "
+                         "drop the per-CAV attackers.attacks")
+    spec = OmegaConf.merge({"type": cfg.attack.type, "parameters": {}},
+                           spec if spec is not None else cfg.attack)
+    schema = getattr(get_attack_class(spec.type), "Params", None)
+    fields = {f.name for f in dataclasses.fields(schema)} if schema is not None else set()
+    for name, value in (("ego_id", ego_id), ("malicious_id", vid)):
+        if name in fields and spec.parameters.get(name) is None:
+            spec.parameters[name] = value
+    return spec
+
+
+def attacker_seed(cfg: DictConfig, attackers: Sequence[int], vid: int) -> Optional[int]:
+    """
+    Seed of attacker ``vid``: ``experiment.seed`` for the first attacker and
+    for every coordinated one (identical random draws), offset per attacker
+    otherwise.
+    """
+    seed = cfg.experiment.seed
+    if seed is None or cfg.attackers.coordinated:
+        return seed
+    return int(seed) + list(attackers).index(vid)
+
+
+def vehicle_files(
+    sim_path: Path, vid: int, max_frames: Optional[int] = None, index: Optional[ScenarioIndex] = None,
+) -> List[Path]:
+    """Files of one vehicle folder in name order, limited to its first ``max_frames`` frames."""
+    if index is not None:
+        return index.files(vid, max_frames)
+    files = sorted((sim_path / str(vid)).iterdir())
+    if max_frames is None:
+        return files
+    keep = set(sorted(f.stem for f in files if f.suffix.lower() == ".yaml")[:max_frames])
+    return [f for f in files if f.stem in keep]
+
+
+@dataclass
+class VehicleProgress:
+    """Position of :func:`process_vehicle` in one vehicle folder (checkpointed)."""
+    next_file: int = 0
+    generation: Optional[CpmGenerationFilter] = None
+    evaluated_frames: List[str] = field(default_factory=list)
+    per_frame: Dict[str, List[float]] = field(default_factory=dict)
+    last_yaml: Optional[str] = None             # stem of the last attacked YAML
+
+
+def process_vehicle(
+    cfg: DictConfig,
+    sim_path: Path,
+    vid: int,
+    sink,
+    attack=None,
+    metrics: Sequence[str] = (),
+    progress: Optional[VehicleProgress] = None,
+    on_frame: Optional[Callable[[VehicleProgress], None]] = None,
+    files: Optional[Sequence[Path]] = None,
+    active: Optional[Container[str]] = None,
+) -> Tuple[List[str], Dict[str, List[float]]]:
+    """
+    Copy (or attack, when ``attack`` is given) every file of one vehicle
+    folder into ``sink``.
+
+    ``progress`` continues an earlier, interrupted call; ``on_frame`` is
+    called with it after every completed frame (the last file of a stem,
+    YAML and PCD alike). ``files`` (e.g. from the
+    scenario index) replaces listing the folder. ``active`` (frame stems,
+    see :mod:`advercpm.simulation.schedule`) limits the attack to those
+    frames; the others are copied and not evaluated.
+
+    Attacks exposing a ``point_cloud_transform`` (e.g. pose spoofing) see
+    each YAML before its PCD, which is then streamed through that transform.
+
+    Returns:
+        (frame_names, per_frame): the evaluated frame stems and, per metric,
+        the values of the attacked frames (raw vs. attacked).
+    """
+    logger = logging.getLogger("advercpm.runner")
+    v_in = sim_path / str(vid)
+    progress = progress or VehicleProgress()
+    per_frame = progress.per_frame
+    for m in metrics:
+        per_frame.setdefault(m, [])
+    evaluated_frames = progress.evaluated_frames
+
+    if attack is not None:
+        logger.info("Applying attack to vehicle %d", vid)
+    else:
+        logger.info("Copying data for vehicle %d (no attack)", vid)
+    if progress.next_file:
+        logger.info("Vehicle %d: resuming at file %d", vid, progress.next_file)
+
+    # CPM generation rules: one filter state per sending vehicle
+    if progress.generation is None and cfg.cpm_generation.enabled:
+        progress.generation = CpmGenerationFilter(cfg.cpm_generation)
+    generation = progress.generation
+
+    # Gather files
+    if files is None:
+        files = sorted(v_in.iterdir())
+    transforms_pcd = attack is not None and hasattr(attack, "point_cloud_transform")
+    if transforms_pcd:
+        # the PCD of a frame needs the transform computed from its YAML
+        files = sorted(files, key=lambda p: (p.stem, p.suffix.lower() != ".yaml", p.name))
+    logger.debug("Vehicle %d: %d files found", vid, len(files))
+
+    for i in range(progress.next_file, len(files)):
+        f = files[i]
+        key = f"{vid}/{f.name}"
+        if f.suffix.lower() == ".pcd":
+            transform = attack.point_cloud_transform \
+                if transforms_pcd and progress.last_yaml == f.stem else None
+            if transform is not None:
+                with sink.open_file(key) as out:
+                    n = transform_pcd(f, out, transform,
+                                      getattr(attack, "chunk_points", DEFAULT_CHUNK_POINTS))
+                logger.debug("PCD transformed: %s -> %s (%d points)", f, key, n)
+            else:
+                # Copy PCD unchanged
+                sink.copy_file(key, f)
+                logger.debug("PCD copied: %s -> %s", f, key)
+
+        elif f.suffix.lower() == ".yaml":
+            cpm = parse_yaml(f)
+            if generation is not None:
+                cpm = generation.apply(cpm)
+            if attack is not None and (active is None or f.stem in active):
+                progress.last_yaml = f.stem
+                # attack a copy-on-write view: ``cpm`` stays the original
+                cpm_attacked = materialize(attack.apply(FrameOverlay(cpm)))
+                sink.write_yaml(key, cpm_attacked)
+                for m in metrics:
+                    per_frame[m].append(METRICS[m](cpm, cpm_attacked))
+                if metrics:
+                    evaluated_frames.append(f.stem)
+
+                # Best-effort detailed logging from attack metadata (if provided)
+                meta = getattr(attack, "last_meta", None)
+                if meta:
+                    logger.debug(
+                        "YAML attacked: %s -> %s | meta=%s",
+                        f.name, key, meta
+                    )
+                else:
+                    logger.debug("YAML attacked: %s -> %s", f.name, key)
+            else:
+                # Copy YAML unchanged
+                sink.write_yaml(key, cpm)
+                logger.debug("YAML copied: %s -> %s", f.name, key)
+
+        else:
+            logger.debug("Skipping non-data file: %s", f.name)
+
+        progress.next_file = i + 1
+        if on_frame is not None and (i + 1 == len(files) or files[i + 1].stem != f.stem):
+            on_frame(progress)
+
+    if generation is not None:
+        seen, sent = generation.stats()
+        logger.info("Vehicle %d: CPM generation rules kept %d/%d objects (%.1f%%)",
+                    vid, sent, seen, 100.0 * sent / max(1, seen))
+    return evaluated_frames, per_frame
+
+
+def run(cfg: DictConfig, log_dir: Path, profiler: Profiler = None):
     logger = logging.getLogger("advercpm.runner")
+    profiler = profiler or Profiler()
 
     logger.info("Logs saved to: %s", log_dir)
     logger.debug("Full config loaded: %s", cfg)
+    run_start = time.perf_counter()
 
     # --- Resolve roots ---
     sim_root = Path(cfg.data.simulation_path)
@@ -61,74 +330,120 @@ def main():
 
     logger.info("Selected simulation: %s", sim_path)
 
-    # --- Vehicle folders are inside sim_path (e.g., 649, 650, 659) ---
-    vehicle_dirs = [p for p in sim_path.iterdir() if p.is_dir() and p.name.isdigit()]
-    if len(vehicle_dirs) < 2:
-        raise RuntimeError(
-            f"Expected at least 2 vehicle folders in {sim_path}, found {len(vehicle_dirs)}"
-        )
-
-    vehicle_ids = sorted(int(p.name) for p in vehicle_dirs)
-    ego_id = vehicle_ids[0]
-    malicious_id = vehicle_ids[-1] if vehicle_ids[-1] != ego_id else vehicle_ids[1]
+    scenario_index = load_index(sim_path) if cfg.data.scenario_index else None
+    vehicle_ids, ego_id, _ = select_vehicles(sim_path, scenario_index)
+    attackers = select_attackers(cfg, vehicle_ids, ego_id)
 
     logger.info("Discovered %d vehicles: %s", len(vehicle_ids), vehicle_ids)
     logger.info("Ego vehicle ID: %d", ego_id)
-    logger.info("Malicious vehicle ID: %d", malicious_id)
+    logger.info("Malicious vehicle IDs: %s%s", attackers,
+                " (coordinated)" if cfg.attackers.coordinated and len(attackers) > 1 else "")
 
-    # --- Build attack instance ---
-    attack = build_attack(cfg.attack)
-    logger.info("Initialized attack '%s' with params: %s", cfg.attack.type, dict(cfg.attack.parameters))
+    # --- Per-frame metrics of the attacked vehicles (raw vs. attacked) ---
+    metrics = resolve_metrics(cfg)
+    # fail on a bad per-CAV attack before any output is written
+    specs = {vid: attack_config(cfg, vid, ego_id) for vid in attackers}
+    schedules = {vid: compile_schedule(specs[vid].get("schedule")) for vid in attackers}
+    if scenario_index is None and any(s is not None for s in schedules.values()):
+        scenario_index = ScenarioIndex.build(sim_path)      # frame arrays for the schedules
 
-    # --- Process each vehicle folder ---
-    for vid in vehicle_ids:
-        v_in = sim_path / str(vid)
-        v_out = adv_path / str(vid)
-        v_out.mkdir(parents=True, exist_ok=True)
+    # --- Checkpoint: attack states + last completed frame per vehicle ---
+    checkpointer = None
+    if cfg.checkpoint.enabled or cfg.checkpoint.resume:
+        checkpointer = Checkpointer(adv_path / CHECKPOINT_NAME, cfg.checkpoint.every_frames,
+                                    config_fingerprint(cfg))
+    state = checkpointer.load() if cfg.checkpoint.resume else None
+    if cfg.checkpoint.resume and state is None:
+        logger.warning("No checkpoint found in %s; starting from the beginning", adv_path)
 
-        if vid == malicious_id:
-            logger.info("Applying attack to vehicle %d", vid)
-        else:
-            logger.info("Copying data for vehicle %d (no attack)", vid)
+    resumed = state is not None
+    if state is None:
+        seed_everything(cfg.experiment.seed)
+        state = {"vehicle_index": 0, "progress": None, "attacks": {}, "results": {}, "sink": None,
+                 "timings": {}, "elapsed": 0.0}
+    else:
+        restore_rng(state["rng"])
+        logger.info("Resuming from checkpoint at vehicle %d", vehicle_ids[state["vehicle_index"]])
+    # attack instances are built when their vehicle starts (seeded per attacker)
+    attacks, results = state["attacks"], state["results"]
+    # timings cover the whole run, interrupted sessions included
+    timings: Dict[int, Dict[str, float]] = state.get("timings", {})
+    elapsed = state.get("elapsed", 0.0)
 
-        # Gather files
-        files = sorted(v_in.iterdir())
-        logger.debug("Vehicle %d: %d files found", vid, len(files))
+    # --- Process each vehicle folder (the scenario is read once, all attackers included) ---
+    profiler.stage("setup")
+    sink = open_output(cfg.data, adv_path)
+    if state["sink"] is not None:
+        sink.restore(state["sink"])
 
-        for f in files:
-            if f.suffix.lower() == ".pcd":
-                # Copy PCD unchanged
-                dst = v_out / f.name
-                shutil.copy2(f, dst)
-                logger.debug("PCD copied: %s -> %s", f, dst)
-
-            elif f.suffix.lower() == ".yaml":
-                cpm = parse_yaml(f)
-                if vid == malicious_id:
-                    cpm_attacked = attack.apply(cpm)
-                    dst = v_out / f.name
-                    save_yaml(cpm_attacked, dst)
-
-                    # Best-effort detailed logging from attack metadata (if provided)
-                    meta = getattr(attack, "last_meta", None)
-                    if meta:
-                        logger.debug(
-                            "YAML attacked: %s -> %s | meta=%s",
-                            f.name, dst, meta
-                        )
-                    else:
-                        logger.debug("YAML attacked: %s -> %s", f.name, dst)
-                else:
-                    # Copy YAML unchanged
-                    dst = v_out / f.name
-                    save_yaml(cpm, dst)
-                    logger.debug("YAML copied: %s -> %s", f.name, dst)
+    def snapshot(index: int, progress: VehicleProgress, timing: Dict[int, Dict[str, float]]):
+        return {"vehicle_index": index, "progress": progress, "attacks": attacks,
+                "results": results, "sink": sink.state(), "rng": rng_state(),
+                "timings": {**timings, **timing}, "elapsed": elapsed + time.perf_counter() - run_start}
+
+    with sink, (checkpointer.catch_interrupts() if checkpointer else nullcontext()):
+        for index, vid in enumerate(vehicle_ids):
+            if index < state["vehicle_index"]:
+                continue
+            profiler.stage(f"vehicle {vid}")
+            progress = state["progress"] if index == state["vehicle_index"] else None
+            files = vehicle_files(sim_path, vid, cfg.simulation.max_frames, scenario_index)
+            spent, vehicle_start = timings.get(vid, {}).get("vehicle_s", 0.0), time.perf_counter()
+
+            def timing(vid=vid, spent=spent, start=vehicle_start, n_files=len(files)):
+                """Time spent on an attacked vehicle so far (earlier sessions included)."""
+                if vid not in specs:
+                    return {}
+                return {vid: {"vehicle_s": spent + time.perf_counter() - start, "files": n_files}}
 
+            on_frame = None
+            if checkpointer is not None:
+                on_frame = lambda p, index=index, timing=timing: \
+                    checkpointer.tick(lambda: snapshot(index, p, timing()))
+            if vid in specs:
+                if vid not in attacks:
+                    seed_everything(attacker_seed(cfg, attackers, vid))
+                    attacks[vid] = build_attack(specs[vid])
+                    logger.info("Initialized attack '%s' on vehicle %d with params: %s",
+                                specs[vid].type, vid, dict(specs[vid].parameters))
+                active = active_frames(schedules[vid], scenario_index, vid, ego_id,
+                                       cfg.simulation.max_frames)
+                results[vid] = process_vehicle(cfg, sim_path, vid, sink, attacks[vid], metrics,
+                                               progress, on_frame, files, active)
+                timings.update(timing())
             else:
-                logger.debug("Skipping non-data file: %s", f.name)
+                process_vehicle(cfg, sim_path, vid, sink, progress=progress, on_frame=on_frame,
+                                files=files)
 
+    if checkpointer is not None:
+        checkpointer.clear()
     logger.info("Adversarial simulation saved to: %s", adv_path)
 
+    # one attacker keeps the plain experiment name
+    names = {vid: cfg.experiment.name if len(attackers) == 1 else f"{cfg.experiment.name}_{vid}"
+             for vid in attackers}
+    if metrics:
+        for vid in attackers:
+            report_metrics(cfg, names[vid], vid, *results[vid])
+
+    # --- Effect on what the CAVs believe: late fusion of all CPMs vs. raw objects ---
+    fusion_summary = None
+    if cfg.evaluation.enabled and cfg.fusion.enabled:
+        errors = LateFusion(cfg.fusion).evaluate_scenario(sim_path, adv_path)
+        fusion_summary = errors.summary()
+        logger.info("Late fusion vs. ground truth: %s", fusion_summary)
+        if cfg.evaluation.save_results:
+            out = save_fusion_results(cfg.evaluation.results_path, cfg.experiment.name, errors)
+            logger.info("Fusion results saved to: %s", out)
+
+    # --- Results warehouse: one row per attacker, shared by all runs ---
+    if cfg.evaluation.enabled:
+        run_uid, total = new_run_uid(), elapsed + time.perf_counter() - run_start
+        for vid in attackers:
+            perf = dict(timings.get(vid, {}), total_s=total, resumed=resumed)
+            record_run(cfg, names[vid], specs[vid], sim_path.name, vid, *results[vid], run_uid=run_uid,
+                       seed=attacker_seed(cfg, attackers, vid), perf=perf, fusion=fusion_summary)
+
 
 if __name__ == "__main__":
     try:
@@ -136,6 +451,7 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         log = logging.getLogger("advercpm.runner")
         log.warning("Execution interrupted by user (Ctrl+C). Shutting down gracefully...")
+        log.warning("With checkpoint.enabled, continue the run with --resume.")
         # optional: clean up resources here
         exit(0)
 
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from advercpm.attacks.base_attack import compile_params
+from advercpm.data.scenario_index import ScenarioIndex, VehicleIndex
+
+
+logger = logging.getLogger("advercpm.schedule")
+
+
+# ----------------------------
+# Schedule rules
+# ----------------------------
+
+@dataclass(frozen=True)
+class ScheduleParams:
+    """
+    When an attack runs. Rules are combined with AND; frame numbers count
+    the attacker's frames from 0. Ego conditions compare the ego's frame of
+    the same timestamp and are false when it has none.
+    """
+    windows: Tuple[Tuple[Optional[int], ...], ...] = ()   # [start, end) frame ranges (end null = open)
+    period: int = 0                                       # duty cycle length in frames (0 = off)
+    on_frames: int = 0                                    # active frames at the start of every period
+    phase: int = 0                                        # frame at which the first period starts
+    max_ego_distance: Optional[float] = None              # ego within this many metres (x/y)
+    min_ego_distance: Optional[float] = None
+    min_ego_speed: Optional[float] = None                 # ego_speed as in the CPM (km/h in OPV2V)
+    max_ego_speed: Optional[float] = None
+
+    def __post_init__(self):
+        for window in self.windows:
+            if len(window) != 2 or window[0] is None:
+                raise ValueError(f"schedule: windows are [start, end] frame ranges, got {list(window)}")
+        if self.period < 0 or not 0 <= self.on_frames <= self.period:
+            raise ValueError("schedule: need period >= 0 and 0 <= on_frames <= period")
+
+    @property
+    def uses_ego(self) -> bool:
+        return any(v is not None for v in (self.max_ego_distance, self.min_ego_distance,
+                                            self.min_ego_speed, self.max_ego_speed))
+
+
+def compile_schedule(raw: Optional[Mapping[str, Any]]) -> Optional[ScheduleParams]:
+    """Validated schedule of an attack config entry; None when it has no rules (always active)."""
+    if not raw:
+        return None
+    return compile_params(ScheduleParams, raw, "schedule")
+
+
+# ----------------------------
+# Activation mask
+# ----------------------------
+
+def _ego_rows(ego: VehicleIndex, frames) -> Tuple[np.ndarray, np.ndarray]:
+    """Row of every frame stem in the ego's frames, and whether it exists."""
+    ego_frames = np.asarray(ego.frames)
+    if len(ego_frames) == 0:
+        return np.zeros(len(frames), dtype=int), np.zeros(len(frames), dtype=bool)
+    rows = np.minimum(np.searchsorted(ego_frames, frames), len(ego_frames) - 1)
+    return rows, ego_frames[rows] == np.asarray(frames)
+
+
+def _per_frame(values, rows: np.ndarray, found: np.ndarray, width: Optional[int] = None) -> np.ndarray:
+    """Float array of per-frame index values at ``rows`` (NaN where missing or not found)."""
+    shape = (len(rows),) if width is None else (len(rows), width)
+    out = np.full(shape, np.nan)
+    if len(values):
+        filled = [v if v is not None else ([np.nan] * width if width else np.nan) for v in values]
+        out[found] = np.asarray(filled, dtype=float)[rows[found]]
+    return out
+
+
+def activation_mask(
+    schedule: ScheduleParams,
+    attacker: VehicleIndex,
+    ego: Optional[VehicleIndex] = None,
+    max_frames: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Which of the attacker's frames (first ``max_frames``) the attack runs
+    on, for the whole run at once from the index arrays.
+
+    Returns:
+        (F,) bool, in frame order.
+    """
+    frames = attacker.frames[:max_frames]
+    k = np.arange(len(frames))
+    mask = np.ones(len(frames), dtype=bool)
+    if schedule.windows:
+        inside = np.zeros(len(frames), dtype=bool)
+        for start, end in schedule.windows:
+            inside |= (k >= start) & (k < (end if end is not None else len(frames)))
+        mask &= inside
+    if schedule.period:
+        mask &= (k >= schedule.phase) & ((k - schedule.phase) % schedule.period < schedule.on_frames)
+    if not schedule.uses_ego:
+        return mask
+    if ego is None:
+        raise ValueError("schedule: ego conditions need the ego's frames")
+
+    rows, found = _ego_rows(ego, frames)
+    own = np.arange(len(frames))
+    with np.errstate(invalid="ignore"):        # NaN (unknown) never satisfies a condition
+        if schedule.max_ego_distance is not None or schedule.min_ego_distance is not None:
+            ego_xy = _per_frame(ego.positions, rows, found, width=3)[:, :2]
+            own_xy = _per_frame(attacker.positions, own, np.ones(len(frames), dtype=bool), width=3)[:, :2]
+            distance = np.hypot(*(ego_xy - own_xy).T)
+            if schedule.max_ego_distance is not None:
+                mask &= distance <= schedule.max_ego_distance
+            if schedule.min_ego_distance is not None:
+                mask &= distance >= schedule.min_ego_distance
+        if schedule.min_ego_speed is not None or schedule.max_ego_speed is not None:
+            speed = _per_frame(ego.speeds, rows, found)
+            if schedule.min_ego_speed is not None:
+                mask &= speed >= schedule.min_ego_speed
+            if schedule.max_ego_speed is not None:
+                mask &= speed <= schedule.max_ego_speed
+    return mask
+
+
+def active_frames(
+    schedule: Optional[ScheduleParams],
+    index: ScenarioIndex,
+    vid: int,
+    ego_id: int,
+    max_frames: Optional[int] = None,
+) -> Optional[Set[str]]:
+    """Frame stems attacker ``vid`` attacks (None: every frame, no schedule)."""
+    if schedule is None:
+        return None
+    attacker = index.vehicles[vid]
+    mask = activation_mask(schedule, attacker, index.vehicles.get(ego_id), max_frames)
+    logger.info("Vehicle %d: attack scheduled on %d/%d frames", vid, int(mask.sum()), len(mask))
+    return {stem for stem, on in zip(attacker.frames, mask) if on}
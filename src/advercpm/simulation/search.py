@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from advercpm.attacks import build_attack
+from advercpm.data.overlay import FrameOverlay, materialize
+from advercpm.data.scenario_index import load_index
+from advercpm.simulation.cpm_generation import CpmGenerationFilter
+from advercpm.simulation.evaluator import evaluate_frames, summarize
+from advercpm.simulation.schedule import activation_mask, compile_schedule
+from advercpm.utils.file_ops import parse_yaml
+from advercpm.utils.profiling import Profiler, start_worker_profiler
+
+
+logger = logging.getLogger("advercpm.search")
+
+
+# ----------------------------
+# Candidate evaluation (runs in worker processes)
+# ----------------------------
+
+_FRAME_CACHE: Dict[Tuple[str, int, Optional[int], str], List[dict]] = {}
+
+
+def _raw_frames(scenario: str, vehicle_id: int, n_frames: Optional[int],
+                generation: Optional[Dict[str, Any]] = None) -> List[dict]:
+    """A vehicle's frames as the runner hands them to the attack (after the CPM generation rules)."""
+    key = (scenario, vehicle_id, n_frames, json.dumps(generation, sort_keys=True))
+    frames = _FRAME_CACHE.get(key)
+    if frames is None:
+        v_dir = Path(scenario) / str(vehicle_id)
+        stems = load_index(scenario).frames(vehicle_id, n_frames)
+        frames = [parse_yaml(v_dir / f"{stem}.yaml") for stem in stems]
+        if generation is not None:
+            frames = CpmGenerationFilter(generation).apply_frames(frames)
+        _FRAME_CACHE[key] = frames
+    return frames
+
+
+def _scheduled(job: Dict[str, Any], n: int) -> np.ndarray:
+    """Which of the job's ``n`` frames its schedule attacks (the ego is the smallest id)."""
+    schedule = compile_schedule(job["schedule"])
+    if schedule is None:
+        return np.ones(n, dtype=bool)
+    index = load_index(job["scenario"])
+    ego = index.vehicles.get(index.vehicle_ids[0])
+    return activation_mask(schedule, index.vehicles[job["vehicle_id"]], ego, job["n_frames"])
+
+
+def evaluate_candidate(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply one attack configuration to a vehicle's frames and score it.
+
+    ``job`` holds plain values only (it is pickled to the worker and hashed
+    for the on-disk cache): attack type/parameters/schedule, CPM generation
+    rules, scenario path, vehicle id, frame budget, metric, seed and a
+    scenario fingerprint. Frames off the schedule are left unattacked, as in
+    the runner output.
+    """
+    frames = _raw_frames(job["scenario"], job["vehicle_id"], job["n_frames"], job["generation"])
+    active = _scheduled(job, len(frames))
+    np.random.seed(job["seed"])
+    random.seed(job["seed"])
+    attack = build_attack(OmegaConf.create({"type": job["attack_type"], "parameters": job["params"]}))
+    attacked = [materialize(attack.apply(FrameOverlay(f))) if on else f for f, on in zip(frames, active)]
+    per_frame = evaluate_frames(frames, attacked, [job["metric"]])
+    return {"value": summarize(job["metric"], per_frame[job["metric"]]), "frames": len(frames)}
+
+
+# ----------------------------
+# Search driver
+# ----------------------------
+
+class AttackSearch:
+    """
+    Finds the weakest attack configuration whose ``metric`` reaches ``target``.
+
+    - One searched parameter: parallel k-section bisection (the effect is
+      assumed monotone in the parameter); stops once the bracket is narrower
+      than ``tolerance``.
+    - Several parameters: successive halving over random candidates in the
+      box, with the number of frames as the fidelity. Effective candidates
+      rank by normalized magnitude, the others by how far they fall short.
+      When ``max_evals`` runs out before the last round, the current leader
+      is re-evaluated on all frames, so the reported value is always full
+      fidelity.
+
+    ``attack_cfg`` is the attack as the runner would build it for
+    ``vehicle_id`` (see :func:`advercpm.simulation.runner.attack_config`,
+    which fills in ``ego_id`` / ``malicious_id``); with ``generation_cfg``
+    (``cpm_generation``) enabled, candidates attack the filtered frames,
+    as in the runner.
+
+    Every (attack config, scenario, vehicle, frame budget, metric, seed)
+    result is memoized as JSON under ``cache_dir``, so re-runs and
+    overlapping searches reuse earlier evaluations.
+    """
+
+    def __init__(self, attack_cfg, search_cfg, scenario, vehicle_id: int, generation_cfg=None):
+        self.attack_type = str(attack_cfg.type)
+        self.base_params = OmegaConf.to_container(attack_cfg.parameters, resolve=True) \
+            if OmegaConf.is_config(attack_cfg.parameters) else dict(attack_cfg.parameters)
+        schedule = attack_cfg.get("schedule") or {}
+        self.schedule = OmegaConf.to_container(schedule, resolve=True) \
+            if OmegaConf.is_config(schedule) else dict(schedule)
+        compile_schedule(self.schedule)         # fail before any worker starts
+        self.generation = None
+        if generation_cfg is not None and generation_cfg.get("enabled", True):
+            generation = OmegaConf.to_container(generation_cfg, resolve=True) \
+                if OmegaConf.is_config(generation_cfg) else dict(generation_cfg)
+            generation.pop("enabled", None)
+            self.generation = generation
+        self.bounds: Dict[str, Tuple[float, float]] = {
+            name: (float(lo), float(hi)) for name, (lo, hi) in search_cfg.parameters.items()
+        }
+        if not self.bounds:
+            raise ValueError("search.parameters must define at least one [low, high] range")
+        self.metric = str(search_cfg.metric)
+        self.target = float(search_cfg.target)
+        self.method = str(search_cfg.get("method", "auto"))
+        self.tolerance = float(search_cfg.get("tolerance", 0.01))
+        self.max_evals = int(search_cfg.get("max_evals", 64))
+        self.n_workers = max(1, int(search_cfg.get("n_workers", os.cpu_count() or 1)))
+        self.n_candidates = int(search_cfg.get("candidates", 16))
+        self.eta = max(2, int(search_cfg.get("halving_rate", 2)))
+        self.seed = int(search_cfg.get("seed", 0))
+        cache_dir = search_cfg.get("cache_dir", None)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.scenario = str(Path(scenario).resolve())
+        self.vehicle_id = int(vehicle_id)
+        v_dir = Path(self.scenario) / str(self.vehicle_id)
+        self.n_frames_total = len(load_index(self.scenario).frames(self.vehicle_id))
+        # invalidates cached results when the vehicle's frames change
+        self.fingerprint = os.stat(v_dir).st_mtime_ns
+        self.evaluations = 0
+        self.cache_hits = 0
+        self.history: List[Dict[str, Any]] = []
+
+    # ----------------------
+    # Evaluation with memoization
+    # ----------------------
+
+    def _job(self, point: Dict[str, float], n_frames: Optional[int]) -> Dict[str, Any]:
+        params = dict(self.base_params)
+        params.update(point)
+        return {
+            "attack_type": self.attack_type,
+            "params": params,
+            "schedule": self.schedule,
+            "generation": self.generation,
+            "scenario": self.scenario,
+            "vehicle_id": self.vehicle_id,
+            "n_frames": n_frames,
+            "metric": self.metric,
+            "seed": self.seed,
+            "fingerprint": self.fingerprint,
+        }
+
+    def _cache_path(self, job: Dict[str, Any]) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        digest = hashlib.sha256(json.dumps(job, sort_keys=True, default=str).encode()).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def evaluate(self, points: Sequence[Dict[str, float]], n_frames: Optional[int] = None,
+                 pool: Optional[ProcessPoolExecutor] = None) -> List[float]:
+        jobs = [self._job(p, n_frames) for p in points]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        todo = []
+        for i, job in enumerate(jobs):
+            path = self._cache_path(job)
+            if path is not None and path.exists():
+                with open(path) as f:
+                    results[i] = json.load(f)
+                self.cache_hits += 1
+            else:
+                todo.append(i)
+
+        if todo:
+            mapper = pool.map if pool is not None else map
+            for i, result in zip(todo, mapper(evaluate_candidate, [jobs[i] for i in todo])):
+                results[i] = result
+                path = self._cache_path(jobs[i])
+                if path is not None:
+                    tmp = path.with_suffix(".tmp")
+                    with open(tmp, "w") as f:
+                        json.dump(result, f)
+                    os.replace(tmp, path)
+            self.evaluations += len(todo)
+
+        for point, result in zip(points, results):
+            self.history.append({"params": dict(point), "frames": result["frames"],
+                                 "value": result["value"]})
+            logger.debug("Evaluated %s on %d frames -> %s=%.4f",
+                         point, result["frames"], self.metric, result["value"])
+        return [r["value"] for r in results]
+
+    # ----------------------
+    # Strategies
+    # ----------------------
+
+    def run(self) -> Dict[str, Any]:
+        method = self.method
+        if method == "auto":
+            method = "bisection" if len(self.bounds) == 1 else "successive_halving"
+        pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=start_worker_profiler, initargs=("search",),
+        ) if self.n_workers > 1 else None
+        try:
+            if method == "bisection":
+                best, value = self._bisection(pool)
+            elif method == "successive_halving":
+                best, value = self._successive_halving(pool)
+            else:
+                raise ValueError(
+                    f"Unknown search method '{method}' "
+                    "(expected 'auto', 'bisection' or 'successive_halving')"
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        result = {
+            "method": method,
+            "metric": self.metric,
+            "target": self.target,
+            "found": best is not None,
+            "best": best,
+            "value": value,
+            "evaluations": self.evaluations,
+            "cache_hits": self.cache_hits,
+            "history": self.history,
+        }
+        logger.info("Search (%s) finished: best=%s %s=%s after %d evaluations (%d cached)",
+                    method, best, self.metric, value, self.evaluations, self.cache_hits)
+        return result
+
+    def _bisection(self, pool) -> Tuple[Optional[Dict[str, float]], Optional[float]]:
+        if len(self.bounds) != 1:
+            raise ValueError("Bisection searches exactly one parameter")
+        (name, (lo, hi)), = self.bounds.items()
+
+        v_lo, v_hi = self.evaluate([{name: lo}, {name: hi}], pool=pool)
+        if v_lo >= self.target:
+            return {name: lo}, v_lo
+        if v_hi < self.target:
+            logger.warning("Even %s=%g does not reach %s >= %g", name, hi, self.metric, self.target)
+            return None, None
+
+        k = self.n_workers
+        while hi - lo > self.tolerance and self.evaluations + k <= self.max_evals:
+            points = [lo + (hi - lo) * i / (k + 1) for i in range(1, k + 1)]
+            values = self.evaluate([{name: p} for p in points], pool=pool)
+            effective = [(p, v) for p, v in zip(points, values) if v >= self.target]
+            if effective:
+                hi, v_hi = effective[0]
+            lo = max([lo] + [p for p, v in zip(points, values) if p < hi and v < self.target])
+        return {name: hi}, v_hi
+
+    def _magnitude(self, point: Dict[str, float]) -> float:
+        return math.sqrt(sum(
+            ((point[n] - lo) / (hi - lo)) ** 2 if hi > lo else 0.0
+            for n, (lo, hi) in self.bounds.items()
+        ))
+
+    def _rank_key(self, point: Dict[str, float], value: float):
+        if value >= self.target:
+            return (0, self._magnitude(point))
+        return (1, self.target - value)
+
+    def _successive_halving(self, pool) -> Tuple[Optional[Dict[str, float]], Optional[float]]:
+        rng = np.random.RandomState(self.seed)
+        candidates = [
+            {n: float(rng.uniform(lo, hi)) for n, (lo, hi) in self.bounds.items()}
+            for _ in range(self.n_candidates)
+        ]
+        rounds = max(1, int(math.ceil(math.log(len(candidates), self.eta))) + 1)
+        total = max(1, self.n_frames_total)
+
+        for r in range(rounds):
+            budget = max(1, int(round(total / self.eta ** (rounds - 1 - r))))
+            n_frames = None if budget >= total else budget
+            values = self.evaluate(candidates, n_frames=n_frames, pool=pool)
+            ranked = sorted(zip(candidates, values), key=lambda cv: self._rank_key(*cv))
+            logger.info("Halving round %d: %d candidates on %d frames, best %s=%.4f",
+                        r, len(candidates), budget, self.metric, ranked[0][1])
+            if n_frames is None or len(candidates) == 1 or self.evaluations >= self.max_evals:
+                best, value = ranked[0]
+                if n_frames is not None:
+                    logger.info("Out of evaluations after round %d: re-evaluating %s on all frames", r, best)
+                    value, = self.evaluate([best], pool=pool)
+                if value < self.target:
+                    return None, None
+                return best, value
+            candidates = [c for c, _ in ranked[: max(1, len(candidates) // self.eta)]]
+        return None, None
+
+
+def main():
+    from advercpm.simulation.runner import attack_config, load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+
+    sim_root = Path(cfg.data.simulation_path)
+    scenarios = sorted(p for p in sim_root.iterdir() if p.is_dir())
+    if not scenarios:
+        raise RuntimeError(f"No simulation folders found under {sim_root}")
+    scenario = scenarios[0]
+    vehicle_ids = load_index(scenario).vehicle_ids
+    vehicle_id = cfg.search.vehicle_id
+    if vehicle_id is None:
+        vehicle_id = vehicle_ids[-1]
+
+    # the attack and frames the runner would use for this vehicle (the ego is the smallest id)
+    spec = attack_config(cfg, vehicle_id, vehicle_ids[0])
+    search = AttackSearch(spec, cfg.search, scenario, vehicle_id, cfg.cpm_generation)
+    with Profiler(cfg.profiling, log_dir, name="search"):
+        result = search.run()
+
+    out_dir = Path(cfg.evaluation.results_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_file = out_dir / f"search_{cfg.experiment.name}.json"
+    with open(out_file, "w") as f:
+        json.dump(result, f, indent=2)
+    logger.info("Search result saved to: %s", out_file)
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # python -m advercpm.simulation.search --config attack_drift.yaml -- \
+    #     search.parameters.drift_rate=[0.0,2.0] search.target=5.0
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import socket
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from advercpm.attacks import build_attack
+from advercpm.utils.file_ops import dump_yaml, loads_yaml
+from advercpm.utils.profiling import Profiler
+
+
+logger = logging.getLogger("advercpm.service")
+
+
+# ----------------------------
+# Latency histogram
+# ----------------------------
+
+class LatencyHistogram:
+    """
+    Fixed-size log-bucketed latency histogram (1 µs .. 100 s).
+
+    Recording is O(1) and memory is constant, so it can stay enabled for the
+    whole lifetime of the service.
+    """
+
+    def __init__(self, buckets_per_decade: int = 20, low: float = 1e-6, high: float = 100.0):
+        n_decades = np.log10(high / low)
+        self._edges = np.logspace(
+            np.log10(low), np.log10(high), int(n_decades * buckets_per_decade) + 1
+        )
+        self._counts = np.zeros(len(self._edges) + 1, dtype=np.int64)
+        self._total = 0.0
+        self._max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self._counts[np.searchsorted(self._edges, seconds)] += 1
+        self._total += seconds
+        self._max = max(self._max, seconds)
+
+    @property
+    def count(self) -> int:
+        return int(self._counts.sum())
+
+    def percentile(self, q: float) -> float:
+        """Upper bucket edge below which a fraction ``q`` of samples fall."""
+        n = self.count
+        if n == 0:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self._counts), q * n))
+        if bucket >= len(self._edges):
+            return self._max
+        return float(min(self._edges[bucket], self._max))
+
+    def snapshot(self) -> Dict[str, float]:
+        n = self.count
+        return {
+            "count": n,
+            "mean_ms": 1e3 * self._total / n if n else 0.0,
+            "p50_ms": 1e3 * self.percentile(0.50),
+            "p99_ms": 1e3 * self.percentile(0.99),
+            "max_ms": 1e3 * self._max,
+        }
+
+    def reset(self) -> None:
+        self._counts[:] = 0
+        self._total = 0.0
+        self._max = 0.0
+
+
+# ----------------------------
+# Message handling
+# ----------------------------
+
+def _int_keys(vehicles: Dict[Any, Any]) -> Dict[Any, Any]:
+    """JSON object keys are strings; restore the integer ids the YAML form uses."""
+    return {
+        int(k) if isinstance(k, str) and k.lstrip("-").isdigit() else k: v
+        for k, v in vehicles.items()
+    }
+
+
+def _to_builtin(obj):
+    """Recursively replace numpy scalars/arrays so the YAML dump holds plain values."""
+    if isinstance(obj, dict):
+        return {k: _to_builtin(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_builtin(v) for v in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return obj.tolist()
+    return obj
+
+
+def _set_nodelay(writer: asyncio.StreamWriter) -> None:
+    """Disable Nagle: small request/response lines must not wait for ACKs."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class AttackService:
+    """
+    Applies the configured attack to streamed CPM frames.
+
+    One attack instance is built per sender, so stateful attacks (e.g. drift
+    counters) evolve independently for every CAV.
+
+    Protocol: one JSON object per line.
+
+        {"sender": 650, "frame": {...}}          -> {"sender": 650, "frame": {...}}
+        {"sender": 650, "frame_yaml": "..."}     -> {"sender": 650, "frame_yaml": "..."}
+        {"op": "stats"}                          -> {"stats": {...}}
+        {"op": "reset", "sender": 650}           -> {"reset": 650}
+
+    Requests may carry an ``"id"`` which is echoed back. Every frame is
+    attacked: ``attack.schedule`` needs whole-scenario frame indices, which
+    a stream does not have, and is refused.
+    """
+
+    def __init__(self, attack_cfg, histogram: Optional[LatencyHistogram] = None):
+        if attack_cfg.get("schedule"):
+            raise ValueError("The attack service attacks every frame; remove attack.schedule")
+        self.attack_cfg = attack_cfg
+        self.histogram = histogram or LatencyHistogram()
+        self._attacks: Dict[Any, Any] = {}
+
+    def attack_for(self, sender):
+        attack = self._attacks.get(sender)
+        if attack is None:
+            attack = build_attack(self.attack_cfg)
+            self._attacks[sender] = attack
+            logger.info("New sender %s: built '%s' attack", sender, self.attack_cfg.type)
+        return attack
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Process one decoded request and return the response object."""
+        op = message.get("op", "apply")
+        if op == "stats":
+            response = {"stats": self.histogram.snapshot(), "senders": len(self._attacks)}
+        elif op == "reset":
+            self._attacks.pop(message.get("sender"), None)
+            response = {"reset": message.get("sender")}
+        elif op == "apply":
+            response = self._apply(message)
+        else:
+            raise ValueError(f"Unknown op '{op}'")
+        if "id" in message:
+            response["id"] = message["id"]
+        return response
+
+    def _apply(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        sender = message.get("sender")
+        if "frame_yaml" in message:
+            frame = loads_yaml(message["frame_yaml"]) or {}
+        elif "frame" in message:
+            frame = message["frame"]
+            if isinstance(frame.get("vehicles"), dict):
+                frame["vehicles"] = _int_keys(frame["vehicles"])
+        else:
+            raise ValueError("Request has neither 'frame' nor 'frame_yaml'")
+
+        attacked = self.attack_for(sender).apply(frame)
+
+        if "frame_yaml" in message:
+            return {"sender": sender, "frame_yaml": dump_yaml(_to_builtin(attacked))}
+        return {"sender": sender, "frame": attacked}
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Decode, process and encode one request line, recording its latency."""
+        start = time.perf_counter()
+        try:
+            response = self.handle(json.loads(line))
+        except Exception as exc:  # report, keep the connection alive
+            logger.warning("Request failed: %s", exc)
+            response = {"error": str(exc)}
+        out = json.dumps(response, default=_json_default).encode() + b"\n"
+        if "frame" in response or "frame_yaml" in response:
+            self.histogram.record(time.perf_counter() - start)
+        return out
+
+    # ----------------------
+    # asyncio server
+    # ----------------------
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername") or writer.get_extra_info("sockname")
+        _set_nodelay(writer)
+        logger.debug("Client connected: %s", peer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as exc:
+                    # Line longer than the stream limit: the rest of it may still be in
+                    # flight, so there is no way back to a line boundary. Report and close.
+                    logger.warning("Request from %s too long: %s", peer, exc)
+                    writer.write(json.dumps({"error": f"Request too long: {exc}"}).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                writer.write(self.handle_line(line))
+                await writer.drain()
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            logger.debug("Client disconnected: %s", peer)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765,
+                    unix_socket: Optional[str] = None, limit: int = 2 ** 24):
+        """Start listening; returns the ``asyncio`` server object."""
+        if unix_socket:
+            server = await asyncio.start_unix_server(
+                self._serve_client, path=unix_socket, limit=limit
+            )
+        else:
+            server = await asyncio.start_server(
+                self._serve_client, host=host, port=port, limit=limit
+            )
+        for sock in server.sockets:
+            logger.info("Attack service listening on %s", sock.getsockname())
+        return server
+
+
+async def _log_stats(service: AttackService, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        logger.info("Latency: %s", service.histogram.snapshot())
+
+
+async def serve(cfg) -> None:
+    service = AttackService(cfg.attack)
+    server = await service.start(
+        host=cfg.service.host,
+        port=cfg.service.port,
+        unix_socket=cfg.service.unix_socket,
+        limit=int(cfg.service.max_message_bytes),
+    )
+    stats_task = None
+    if cfg.service.stats_interval:
+        stats_task = asyncio.ensure_future(_log_stats(service, float(cfg.service.stats_interval)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if stats_task is not None:
+            stats_task.cancel()
+        logger.info("Final latency: %s", service.histogram.snapshot())
+
+
+def main():
+    from advercpm.simulation.runner import load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+    logger.info("Serving attack '%s' with params: %s", cfg.attack.type, dict(cfg.attack.parameters))
+    with Profiler(cfg.profiling, log_dir, name="service"):
+        try:
+            asyncio.run(serve(cfg))
+        except KeyboardInterrupt:
+            logger.warning("Service interrupted by user (Ctrl+C). Shutting down...")
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # python -m advercpm.simulation.service --config attack_drift.yaml -- service.port=9000
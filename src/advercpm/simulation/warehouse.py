@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+from omegaconf import DictConfig, OmegaConf
+
+from advercpm.simulation.checkpoint import config_fingerprint
+from advercpm.simulation.evaluator import summarize_all
+
+
+logger = logging.getLogger("advercpm.warehouse")
+
+WAREHOUSE_FILE = "warehouse.sqlite"
+
+# SQLite journal modes: WAL needs shared memory between processes and is
+# unsafe on network file systems; the rollback journals work everywhere.
+JOURNAL_MODES = ("delete", "truncate", "persist", "wal")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY,
+    run_uid       TEXT NOT NULL,       -- one runner / worker invocation
+    run_key       TEXT,                -- e.g. queue item + attempt; unique, a repeat is not stored
+    created       REAL NOT NULL,       -- unix time
+    name          TEXT NOT NULL,
+    config_hash   TEXT NOT NULL,
+    scenario      TEXT,
+    attacker      INTEGER,             -- malicious vehicle id
+    attack_type   TEXT,
+    attack_params TEXT,                -- JSON
+    seed          INTEGER,
+    frames        INTEGER NOT NULL,
+    summary       TEXT,                -- JSON, metric summaries
+    perf          TEXT,                -- JSON, timings
+    fusion        TEXT,                -- JSON, late fusion summary
+    config        TEXT                 -- JSON, resolved config
+);
+CREATE INDEX IF NOT EXISTS runs_config_hash ON runs (config_hash);
+CREATE INDEX IF NOT EXISTS runs_scenario ON runs (scenario, attacker);
+CREATE INDEX IF NOT EXISTS runs_attack ON runs (attack_type, name);
+
+CREATE TABLE IF NOT EXISTS frame_metrics (
+    run_id  INTEGER NOT NULL REFERENCES runs (id),
+    frame   TEXT NOT NULL,
+    metric  TEXT NOT NULL,
+    value   REAL
+);
+CREATE INDEX IF NOT EXISTS frame_metrics_run ON frame_metrics (run_id, metric);
+CREATE INDEX IF NOT EXISTS frame_metrics_metric ON frame_metrics (metric);
+"""
+
+# Columns ``runs`` / ``compare`` filter on; JSON columns are decoded on read.
+FILTER_COLUMNS = ("run_uid", "name", "config_hash", "scenario", "attacker", "attack_type", "seed")
+_JSON_COLUMNS = ("attack_params", "summary", "perf", "fusion", "config")
+
+
+def new_run_uid() -> str:
+    return uuid.uuid4().hex
+
+
+def _journal_mode(cfg: DictConfig) -> str:
+    return str(cfg.evaluation.get("warehouse_journal", "delete"))
+
+
+def warehouse_path(cfg: DictConfig) -> Optional[Path]:
+    """Store of a config's runs (``<results_path>/warehouse.sqlite``), None when disabled."""
+    if not cfg.evaluation.get("warehouse", False):
+        return None
+    return Path(cfg.evaluation.results_path) / WAREHOUSE_FILE
+
+
+def _where(filters: Mapping[str, Any], prefix: str = "") -> tuple:
+    unknown = [k for k in filters if k not in FILTER_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown run filter(s) {', '.join(unknown)}. Filters: {', '.join(FILTER_COLUMNS)}")
+    clauses = [f"{prefix}{k} IS ?" if v is None else f"{prefix}{k} = ?" for k, v in filters.items()]
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", list(filters.values())
+
+
+class Warehouse:
+    """
+    Append-only SQLite store of attacked-vehicle results across runs.
+
+    One ``runs`` row per attacker and run (config hash, scenario, attack
+    parameters, summaries, timings) and its per-frame values in
+    ``frame_metrics`` (long format, indexed by run and metric). Several
+    processes may append to the same file (busy timeout). The default
+    rollback journal also works on shared storage (NFS and the like);
+    ``journal_mode="wal"`` lets readers run alongside a writer, on local
+    disks only.
+    """
+
+    def __init__(self, path, timeout: float = 60.0, journal_mode: str = "delete"):
+        journal_mode = str(journal_mode).lower()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode '{journal_mode}'. Modes: {', '.join(JOURNAL_MODES)}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=timeout)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode.upper()}")
+        self.conn.executescript(_SCHEMA)
+        if "run_key" not in {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN run_key TEXT")     # store from before run keys
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS runs_run_key ON runs (run_key)")
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+
+    def append(
+        self,
+        name: str,
+        config_hash: str,
+        frame_names: Sequence[str],
+        per_frame: Mapping[str, Sequence[float]],
+        *,
+        run_uid: Optional[str] = None,
+        run_key: Optional[str] = None,
+        scenario: Optional[str] = None,
+        attacker: Optional[int] = None,
+        attack_type: Optional[str] = None,
+        attack_params: Optional[Mapping[str, Any]] = None,
+        seed: Optional[int] = None,
+        perf: Optional[Mapping[str, Any]] = None,
+        fusion: Optional[Mapping[str, Any]] = None,
+        config: Optional[Mapping[str, Any]] = None,
+    ) -> Optional[int]:
+        """
+        Add one run (a single transaction). Returns its ``runs.id``, or None
+        when a run with the same ``run_key`` is already stored.
+        """
+        per_frame = {m: np.asarray(v, dtype=float) for m, v in per_frame.items()}
+        row = {
+            "run_uid": run_uid or new_run_uid(), "run_key": run_key, "created": time.time(), "name": name,
+            "config_hash": config_hash, "scenario": scenario, "attacker": attacker,
+            "attack_type": attack_type, "seed": seed, "frames": len(frame_names),
+            "attack_params": attack_params, "summary": summarize_all(per_frame) if per_frame else None,
+            "perf": perf, "fusion": fusion, "config": config,
+        }
+        for key in _JSON_COLUMNS:
+            if row[key] is not None:
+                row[key] = json.dumps(row[key], default=float)
+        with self.conn:
+            cur = self.conn.execute(
+                f"INSERT OR IGNORE INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+            if not cur.rowcount:
+                logger.info("Run %s already stored; skipped", run_key)
+                return None
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO frame_metrics (run_id, frame, metric, value) VALUES (?, ?, ?, ?)",
+                ((run_id, frame, m, float(v[i])) for m, v in per_frame.items()
+                 for i, frame in enumerate(frame_names)),
+            )
+        return run_id
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def runs(self, **filters) -> List[Dict[str, Any]]:
+        """Run rows matching ``filters`` (column = value), oldest first."""
+        where, args = _where(filters)
+        rows = self.conn.execute(f"SELECT * FROM runs{where} ORDER BY id", args).fetchall()
+        return [_decode(row) for row in rows]
+
+    def frame_metrics(self, run_id: int, metrics: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Per-frame series of one run: ``{"frame": names, metric: values, ...}``."""
+        rows = self.conn.execute(
+            "SELECT frame, metric, value FROM frame_metrics WHERE run_id = ? ORDER BY rowid", (run_id,),
+        ).fetchall()
+        wanted = set(metrics) if metrics is not None else None
+        frames: List[str] = []
+        series: Dict[str, List[float]] = {}
+        for frame, metric, value in rows:          # stored metric by metric, frames in order
+            if wanted is not None and metric not in wanted:
+                continue
+            if not series or metric == next(iter(series)):
+                frames.append(frame)
+            series.setdefault(metric, []).append(value)
+        out: Dict[str, np.ndarray] = {"frame": np.asarray(frames)}
+        out.update({m: np.asarray(v, dtype=float) for m, v in series.items()})
+        return out
+
+    def compare(self, metric: str, **filters) -> List[Dict[str, Any]]:
+        """
+        One row per matching run with the mean / max / count of ``metric``
+        over its frames (computed in SQL), strongest attack first.
+        """
+        where, args = _where(filters, prefix="r.")
+        where = (where + " AND" if where else " WHERE") + " m.metric = ?"
+        rows = self.conn.execute(
+            "SELECT r.id, r.run_uid, r.name, r.scenario, r.attacker, r.attack_type, r.attack_params, "
+            "r.config_hash, AVG(m.value) AS mean, MAX(m.value) AS max, COUNT(m.value) AS frames "
+            f"FROM runs r JOIN frame_metrics m ON m.run_id = r.id{where} "
+            "GROUP BY r.id ORDER BY mean DESC, r.id",
+            args + [metric],
+        ).fetchall()
+        return [_decode(row) for row in rows]
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    out = dict(row)
+    for key in _JSON_COLUMNS:
+        if out.get(key) is not None:
+            out[key] = json.loads(out[key])
+    return out
+
+
+def record_run(
+    cfg: DictConfig,
+    name: str,
+    spec: DictConfig,
+    scenario: str,
+    vid: int,
+    frame_names: Sequence[str],
+    per_frame: Mapping[str, Sequence[float]],
+    run_uid: str,
+    seed: Optional[int] = None,
+    run_key: Optional[str] = None,
+    perf: Optional[Mapping[str, Any]] = None,
+    fusion: Optional[Mapping[str, Any]] = None,
+) -> Optional[int]:
+    """
+    Append one attacker's results to the config's warehouse (if enabled).
+    ``seed`` is the seed its attack actually ran with.
+    """
+    path = warehouse_path(cfg)
+    if path is None:
+        return None
+    with Warehouse(path, journal_mode=_journal_mode(cfg)) as store:
+        run_id = store.append(
+            name, config_fingerprint(cfg), frame_names, per_frame, run_uid=run_uid, run_key=run_key,
+            scenario=scenario, attacker=int(vid), attack_type=spec.type,
+            attack_params=OmegaConf.to_container(spec.parameters, resolve=True),
+            seed=seed, perf=perf, fusion=fusion,
+            config=OmegaConf.to_container(cfg, resolve=True),
+        )
+    if run_id is not None:
+        logger.info("Run %d (%s) added to %s", run_id, name, path)
+    return run_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare runs stored in a results warehouse.")
+    parser.add_argument("path", help=f"warehouse file (<results_path>/{WAREHOUSE_FILE})")
+    parser.add_argument("--metric", default="MSE_position")
+    for column in FILTER_COLUMNS:
+        parser.add_argument(f"--{column.replace('_', '-')}", dest=column)
+    args = parser.parse_args()
+    filters = {c: getattr(args, c) for c in FILTER_COLUMNS if getattr(args, c) is not None}
+    if not Path(args.path).is_file():
+        parser.error(f"no warehouse at {args.path}")
+
+    with Warehouse(args.path) as store:
+        for row in store.compare(args.metric, **filters):
+            print(f"{row['id']:>6}  {row['name']:<32} {row['scenario'] or '-':<20} {row['attacker']!s:>6}  "
+                  f"{row['attack_type']:<12} mean={row['mean']:.4g} max={row['max']:.4g} "
+                  f"frames={row['frames']}  {json.dumps(row['attack_params'], sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
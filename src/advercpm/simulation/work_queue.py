@@ -0,0 +1,487 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from omegaconf import DictConfig, OmegaConf
+
+from advercpm.attacks import build_attack
+from advercpm.data.archive import open_output
+from advercpm.data.scenario_index import ScenarioIndex, load_index
+from advercpm.simulation.checkpoint import seed_everything
+from advercpm.simulation.evaluator import report_metrics, resolve_metrics
+from advercpm.simulation.runner import (
+    attack_config, attacker_seed, process_vehicle, select_attackers, select_vehicles, vehicle_files,
+)
+from advercpm.simulation.schedule import active_frames, compile_schedule
+from advercpm.simulation.warehouse import record_run
+from advercpm.utils.profiling import Profiler
+
+
+logger = logging.getLogger("advercpm.queue")
+
+# Queue directory layout (every state change is a single rename):
+#
+#   pending/<id>@<attempt>.json           waiting items
+#   leased/<id>@<attempt>.<token>.json    items being processed; the lease
+#                                         clock is the file's mtime/ctime,
+#                                         renewed by the holder's heartbeat
+#   done/<id>.json, failed/<id>.json      finished / given up
+#   configs/<name>.yaml                   resolved configs the items refer to
+#   errors/<id>@<attempt>.txt             traceback of every failed attempt
+#
+# A rename either succeeds for exactly one process or raises
+# FileNotFoundError, so claiming, completing and reclaiming an expired lease
+# need no lock and no broker. A worker whose lease expired finds its leased
+# file gone and drops the item; only the current lease holder can move it to
+# done/, so each item completes exactly once.
+
+_STATES = ("pending", "leased", "done", "failed")
+_COMMANDS = ("enqueue", "work", "status")
+
+# private generator: the global ones are seeded per item for the attacks
+_shuffle_rng = random.Random()
+
+
+def item_id(*parts) -> str:
+    """File-name-safe item id from its parts (e.g. config, scenario, vehicle)."""
+    return "__".join(re.sub(r"[^A-Za-z0-9_-]", "-", str(p)) for p in parts)
+
+
+class LeaseLost(RuntimeError):
+    """The lease expired and the item was handed back to the queue."""
+
+
+class Lease:
+    """
+    A claimed work item.
+
+    Parameters:
+        path (Path): leased file, ``leased/<id>@<attempt>.<token>.json``.
+        item (dict): item payload.
+    """
+
+    def __init__(self, path: Path, item: Dict[str, Any]):
+        self.path = path
+        self.item = item
+        self.id, rest = path.name[: -len(".json")].rsplit("@", 1)
+        attempt, self.token = rest.split(".")
+        self.attempt = int(attempt)
+        self.lost = False
+
+    def renew(self) -> bool:
+        """Restart the lease clock; ``False`` once the lease was lost."""
+        if not self.lost:
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                self.lost = True
+        return not self.lost
+
+    @contextmanager
+    def keepalive(self, interval: float) -> Iterator["Lease"]:
+        """Renew the lease every ``interval`` seconds from a daemon thread."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                if not self.renew():
+                    logger.warning("Lease on %s lost", self.id)
+                    return
+
+        thread = threading.Thread(target=beat, name="advercpm-lease", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    def __repr__(self):
+        return f"Lease({self.id!r}, attempt={self.attempt}, token={self.token!r})"
+
+
+class WorkQueue:
+    """
+    Work queue in a directory on storage shared by all nodes.
+
+    Workers may join or die at any time: an item whose lease is not renewed
+    for ``lease_seconds`` goes back to ``pending/`` and is picked up by
+    another worker. After ``max_attempts`` failed or expired runs it is moved
+    to ``failed/``. Lease ages are measured against the local clock, so
+    ``lease_seconds`` must be well above the clock skew between nodes.
+    """
+
+    def __init__(self, root, lease_seconds: float = 600.0, max_attempts: int = 3):
+        self.root = Path(root)
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        for name in _STATES + ("configs", "errors", "tmp"):
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+
+    def _entries(self, state: str):
+        return [name for name in os.listdir(self.root / state) if name.endswith(".json")]
+
+    def _write_atomic(self, path: Path, text: str) -> None:
+        tmp = self.root / "tmp" / f"{path.name}.{uuid.uuid4().hex}"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    # ----------------------
+    # Producers
+    # ----------------------
+
+    def put_config(self, name: str, cfg: DictConfig) -> None:
+        """Store the resolved config items named ``name`` run with."""
+        path = self.root / "configs" / f"{name}.yaml"
+        text = OmegaConf.to_yaml(cfg, resolve=True)
+        if path.exists():
+            if path.read_text() != text:
+                raise ValueError(
+                    f"Queue {self.root} already holds a different config '{name}'; "
+                    f"use another experiment.name"
+                )
+            return
+        self._write_atomic(path, text)
+
+    def load_config(self, name: str) -> DictConfig:
+        return OmegaConf.load(self.root / "configs" / f"{name}.yaml")
+
+    def put_many(self, items: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Add items (id -> payload); ids already in any state are skipped, so
+        enqueueing the same sweep twice is harmless.
+
+        Returns:
+            Number of items added.
+        """
+        known = set()
+        for state in _STATES:
+            known.update(name[: -len(".json")].split("@")[0] for name in self._entries(state))
+        added = 0
+        for key, item in items.items():
+            if key in known:
+                continue
+            self._write_atomic(self.root / "pending" / f"{key}@0.json", json.dumps(item))
+            added += 1
+        return added
+
+    def put(self, key: str, item: Dict[str, Any]) -> bool:
+        return self.put_many({key: item}) == 1
+
+    # ----------------------
+    # Consumers
+    # ----------------------
+
+    def _age(self, path: Path) -> float:
+        st = os.stat(path)
+        # rename updates ctime but not mtime, so a fresh claim counts as renewed
+        return time.time() - max(st.st_mtime, st.st_ctime)
+
+    def claim(self) -> Optional[Lease]:
+        """
+        Lease one pending item (after reclaiming expired leases).
+
+        Returns:
+            The lease, or ``None`` when nothing is pending.
+        """
+        self.requeue_expired()
+        names = self._entries("pending")
+        _shuffle_rng.shuffle(names)    # spread concurrent workers over the queue
+        for name in names:
+            key = name[: -len(".json")]
+            target = self.root / "leased" / f"{key}.{uuid.uuid4().hex}.json"
+            try:
+                os.rename(self.root / "pending" / name, target)
+            except FileNotFoundError:
+                continue    # another worker won this one
+            try:
+                os.utime(target)
+                with open(target) as f:
+                    lease = Lease(target, json.load(f))
+            except FileNotFoundError:
+                continue    # reclaimed already (lease_seconds too short)
+            logger.debug("Claimed %s", lease)
+            return lease
+        return None
+
+    def _release(self, path: Path, key: str, attempt: int) -> Optional[str]:
+        if attempt >= self.max_attempts:
+            state, target = "failed", self.root / "failed" / f"{key}.json"
+        else:
+            state, target = "pending", self.root / "pending" / f"{key}@{attempt}.json"
+        try:
+            os.rename(path, target)
+        except FileNotFoundError:
+            return None
+        return state
+
+    def requeue_expired(self) -> int:
+        """Hand leases older than ``lease_seconds`` back to the queue."""
+        released = 0
+        for name in self._entries("leased"):
+            path = self.root / "leased" / name
+            try:
+                if self._age(path) <= self.lease_seconds:
+                    continue
+            except FileNotFoundError:
+                continue
+            lease = Lease(path, {})
+            state = self._release(path, lease.id, lease.attempt + 1)
+            if state is not None:
+                released += 1
+                logger.warning("Lease on %s expired (attempt %d) -> %s",
+                               lease.id, lease.attempt + 1, state)
+        return released
+
+    def complete(self, lease: Lease) -> None:
+        """Mark the item done; raises :class:`LeaseLost` if the lease expired."""
+        try:
+            os.rename(lease.path, self.root / "done" / f"{lease.id}.json")
+        except FileNotFoundError:
+            lease.lost = True
+            raise LeaseLost(f"Lease on {lease.id} expired before completion")
+
+    def fail(self, lease: Lease, error: str = "") -> Optional[str]:
+        """
+        Record a failed attempt and requeue the item (or give it up).
+
+        Returns:
+            The item's new state ("pending" / "failed"), ``None`` if the
+            lease was already lost.
+        """
+        self._write_atomic(self.root / "errors" / f"{lease.id}@{lease.attempt}.txt", error)
+        return self._release(lease.path, lease.id, lease.attempt + 1)
+
+    def abandon(self, lease: Lease) -> None:
+        """Give the item back without counting an attempt (worker shutdown)."""
+        self._release(lease.path, lease.id, lease.attempt)
+
+    def counts(self) -> Dict[str, int]:
+        return {state: len(self._entries(state)) for state in _STATES}
+
+
+# ----------------------------
+# Runner integration
+# ----------------------------
+
+def enqueue(cfg: DictConfig, queue: WorkQueue) -> int:
+    """
+    Queue one item per (scenario, vehicle) of ``data.simulation_path``.
+
+    The resolved config is stored in the queue under ``experiment.name``;
+    enqueue several configs (with distinct names) for a sweep.
+
+    Returns:
+        Number of items added.
+    """
+    name = item_id(cfg.experiment.name)
+    queue.put_config(name, cfg)
+    sim_root = Path(cfg.data.simulation_path)
+    if not sim_root.exists():
+        raise FileNotFoundError(f"Simulation path not found: {sim_root}")
+    scenarios = sorted(p for p in sim_root.iterdir() if p.is_dir())
+    if not scenarios:
+        raise RuntimeError(f"No simulation folders found under {sim_root}")
+
+    items = {}
+    for scenario in scenarios:
+        index = load_index(scenario) if cfg.data.scenario_index else None
+        vehicle_ids, ego_id, _ = select_vehicles(scenario, index)
+        attackers = select_attackers(cfg, vehicle_ids, ego_id)
+        for vid in vehicle_ids:
+            items[item_id(name, scenario.name, vid)] = {
+                "config": name,
+                "scenario": scenario.name,
+                "vehicle": vid,
+                "malicious": vid in attackers,
+                "ego": ego_id,
+                "seed": attacker_seed(cfg, attackers, vid) if vid in attackers else cfg.experiment.seed,
+            }
+    added = queue.put_many(items)
+    logger.info("Queued %d/%d items of '%s' (%d scenarios) in %s",
+                added, len(items), name, len(scenarios), queue.root)
+    return added
+
+
+def _publish(src: Path, dst: Path) -> None:
+    """
+    Move ``src`` to ``dst``. Output of an earlier attempt is renamed aside
+    first and deleted afterwards, so ``dst`` is never a half-deleted tree:
+    readers see the old output, nothing, or the new output.
+    """
+    src.mkdir(parents=True, exist_ok=True)
+    old = dst.parent / f".old-{dst.name}-{uuid.uuid4().hex}"
+    try:
+        os.rename(dst, old)
+    except FileNotFoundError:
+        old = None
+    os.rename(src, dst)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def process_item(
+    cfg: DictConfig, item: Dict[str, Any], lease: Optional[Lease] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Run one (scenario, vehicle) item.
+
+    The output is written to a private staging directory and renamed to
+    ``<adversarial_simulation_path>/<scenario>/<vehicle>`` at the end, so a
+    worker dying mid-item never leaves partial output behind. In sharded
+    mode every vehicle gets its own shard set (and index) in that folder.
+
+    Returns:
+        The attacked vehicle's metrics for :func:`report_item` (None when
+        nothing was evaluated). They are saved only once the item is
+        completed, so an attempt that loses its lease records nothing.
+    """
+    scenario, vid = item["scenario"], int(item["vehicle"])
+    sim_path = Path(cfg.data.simulation_path) / scenario
+    adv_path = Path(cfg.data.adversarial_simulation_path) / scenario
+    staging = adv_path / f".staging-{vid}-{uuid.uuid4().hex}"
+    sharded = str(cfg.data.get("output_mode", "files")).lower() == "sharded"
+
+    seed_everything(item.get("seed", cfg.experiment.seed))
+    attack, active = None, None
+    index = load_index(sim_path) if cfg.data.scenario_index else None
+    if item["malicious"]:
+        ego_id = item.get("ego")
+        if ego_id is None:      # queued before the ego was recorded
+            ego_id = select_vehicles(sim_path, index)[1]
+        spec = attack_config(cfg, vid, int(ego_id))
+        schedule = compile_schedule(spec.get("schedule"))
+        if schedule is not None:
+            index = index or ScenarioIndex.build(sim_path)
+            active = active_frames(schedule, index, vid, int(ego_id), cfg.simulation.max_frames)
+        attack = build_attack(spec)
+    metrics = resolve_metrics(cfg) if attack is not None else []
+    start = time.perf_counter()
+    try:
+        with open_output(cfg.data, staging) as sink:
+            files = vehicle_files(sim_path, vid, cfg.simulation.max_frames, index)
+            frame_names, per_frame = process_vehicle(cfg, sim_path, vid, sink, attack, metrics,
+                                                     files=files, active=active)
+        if lease is not None and not lease.renew():
+            raise LeaseLost(f"Lease on {lease.id} expired during processing")
+        _publish(staging if sharded else staging / str(vid), adv_path / str(vid))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+
+    if not metrics:
+        return None
+    return {"name": f"{cfg.experiment.name}_{scenario}_{vid}", "spec": spec, "frame_names": frame_names,
+            "per_frame": per_frame, "perf": {"vehicle_s": elapsed, "files": len(files)}}
+
+
+def report_item(
+    cfg: DictConfig, item: Dict[str, Any], result: Optional[Dict[str, Any]], run_key: Optional[str] = None,
+) -> None:
+    """Save the metrics of a completed item: result files and a warehouse row keyed by ``run_key``."""
+    if result is None:
+        return
+    vid = int(item["vehicle"])
+    report_metrics(cfg, result["name"], vid, result["frame_names"], result["per_frame"])
+    record_run(cfg, result["name"], result["spec"], item["scenario"], vid, result["frame_names"],
+               result["per_frame"], run_uid=item["config"], seed=item.get("seed", cfg.experiment.seed),
+               run_key=run_key, perf=result["perf"])
+
+
+def run_worker(
+    queue: WorkQueue,
+    poll_interval: float = 10.0,
+    heartbeat: Optional[float] = None,
+    profiler: Optional[Profiler] = None,
+) -> int:
+    """
+    Process items until the queue is drained (nothing pending or leased).
+
+    Returns:
+        Number of items this worker completed.
+    """
+    profiler = profiler or Profiler()
+    interval = heartbeat or queue.lease_seconds / 4.0
+    configs: Dict[str, DictConfig] = {}
+    completed = 0
+
+    while True:
+        lease = queue.claim()
+        if lease is None:
+            counts = queue.counts()
+            if not counts["pending"] and not counts["leased"]:
+                break
+            logger.debug("Waiting on %d leased item(s)", counts["leased"])
+            time.sleep(poll_interval)
+            continue
+
+        item = lease.item
+        if item["config"] not in configs:
+            configs[item["config"]] = queue.load_config(item["config"])
+        profiler.stage(lease.id)
+        logger.info("Processing %s (attempt %d)", lease.id, lease.attempt + 1)
+        try:
+            with lease.keepalive(interval):
+                result = process_item(configs[item["config"]], item, lease)
+            queue.complete(lease)
+            completed += 1
+        except LeaseLost as e:
+            logger.warning("%s; another worker redoes the item", e)
+        except KeyboardInterrupt:
+            queue.abandon(lease)
+            raise
+        except Exception:
+            logger.exception("Item %s failed", lease.id)
+            state = queue.fail(lease, traceback.format_exc())
+            logger.info("Item %s -> %s", lease.id, state)
+        else:
+            try:
+                report_item(configs[item["config"]], item, result, run_key=f"{lease.id}@{lease.attempt}")
+            except Exception:
+                logger.exception("Results of item %s not saved", lease.id)
+
+    logger.info("Queue drained; this worker completed %d item(s): %s", completed, queue.counts())
+    return completed
+
+
+def main():
+    from advercpm.simulation.runner import load_from_cli
+    from advercpm.utils.logger import LoggerSetup
+
+    command = sys.argv.pop(1) if len(sys.argv) > 1 and sys.argv[1] in _COMMANDS else "work"
+    cfg = load_from_cli()
+    log_dir = LoggerSetup(cfg).setup()
+    if cfg.queue.path is None:
+        raise ValueError("queue.path is not set (a directory on storage shared by all nodes)")
+    queue = WorkQueue(cfg.queue.path, cfg.queue.lease_seconds, cfg.queue.max_attempts)
+
+    if command == "enqueue":
+        enqueue(cfg, queue)
+    elif command == "status":
+        logger.info("Queue %s: %s", queue.root, queue.counts())
+    else:
+        name = f"worker-{os.uname().nodename}-{os.getpid()}" if hasattr(os, "uname") else "worker"
+        with Profiler(cfg.profiling, log_dir, name=name) as profiler:
+            run_worker(queue, cfg.queue.poll_interval, cfg.queue.heartbeat_seconds, profiler)
+
+
+if __name__ == "__main__":
+    main()
+
+    # Run script
+    # once:      python -m advercpm.simulation.work_queue enqueue --config attack_drift.yaml -- queue.path=/shared/queue
+    # per node:  python -m advercpm.simulation.work_queue work -- queue.path=/shared/queue
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import numpy as np
+from typing import Tuple
+
+
+def pairwise_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Euclidean distances between two batched point sets.
+
+    Args:
+        a: (..., M, D) points.
+        b: (..., N, D) points (leading dims broadcast against ``a``).
+
+    Returns:
+        (..., M, N) distance matrix.
+    """
+    diff = a[..., :, None, :] - b[..., None, :, :]
+    return np.sqrt(np.einsum("...d,...d->...", diff, diff))
+
+
+def gated_nearest_neighbour(
+    dist: np.ndarray,
+    valid_a: np.ndarray,
+    valid_b: np.ndarray,
+    gate: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gated nearest-neighbour association on a batched distance matrix.
+
+    Padding entries (``valid_* == False``) never match.
+
+    Args:
+        dist: (..., M, N) distances.
+        valid_a: (..., M) validity mask of the rows.
+        valid_b: (..., N) validity mask of the columns.
+        gate: maximum distance for a match.
+
+    Returns:
+        index: (..., M) column index of the nearest neighbour (0 if none).
+        distance: (..., M) distance to it (inf if none).
+        matched: (..., M) True where the neighbour lies within ``gate``.
+    """
+    masked = np.where(valid_a[..., :, None] & valid_b[..., None, :], dist, np.inf)
+    if masked.shape[-1] == 0:
+        shape = masked.shape[:-1]
+        return (np.zeros(shape, dtype=np.int64), np.full(shape, np.inf),
+                np.zeros(shape, dtype=bool))
+    index = np.argmin(masked, axis=-1)
+    distance = np.take_along_axis(masked, index[..., None], axis=-1)[..., 0]
+    return index, distance, distance <= gate
+
+
+def greedy_assignment(
+    cost: np.ndarray,
+    valid_a: np.ndarray,
+    valid_b: np.ndarray,
+    gate: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-to-one greedy assignment on a batched cost matrix.
+
+    Pairs are matched cheapest first, each row and column at most once,
+    and only within ``gate``. Solved in rounds of mutual nearest neighbours
+    (a pair that is the cheapest of both its row and its column is exactly
+    what the greedy picks next), so a frame needs a few array passes rather
+    than one per match.
+
+    Args:
+        cost: (..., M, N) costs (e.g. distances).
+        valid_a: (..., M) validity mask of the rows.
+        valid_b: (..., N) validity mask of the columns.
+        gate: maximum cost of a match.
+
+    Returns:
+        index: (..., M) matched column, -1 if none.
+        cost: (..., M) cost of the match, inf if none.
+    """
+    cost = np.asarray(cost, dtype=float)
+    masked = np.where(valid_a[..., :, None] & valid_b[..., None, :] & (cost <= gate), cost, np.inf)
+    lead, (n_rows, n_cols) = masked.shape[:-2], masked.shape[-2:]
+    masked = masked.reshape((int(np.prod(lead)), n_rows, n_cols))
+    index = np.full(masked.shape[:2], -1, dtype=np.int64)
+    matched_cost = np.full(masked.shape[:2], np.inf)
+    if n_rows == 0 or n_cols == 0:
+        return index.reshape(lead + (n_rows,)), matched_cost.reshape(lead + (n_rows,))
+
+    rows = np.arange(n_rows)
+    while True:
+        best_col = np.argmin(masked, axis=2)                            # (B, M)
+        best_row = np.argmin(masked, axis=1)                            # (B, N)
+        best = np.take_along_axis(masked, best_col[..., None], axis=2)[..., 0]
+        mutual = np.isfinite(best) & (np.take_along_axis(best_row, best_col, axis=1) == rows)
+        if not mutual.any():
+            break
+        b, r = np.nonzero(mutual)
+        c = best_col[b, r]
+        index[b, r] = c
+        matched_cost[b, r] = best[b, r]
+        masked[b, r, :] = np.inf
+        masked[b, :, c] = np.inf
+    return index.reshape(lead + (n_rows,)), matched_cost.reshape(lead + (n_rows,))
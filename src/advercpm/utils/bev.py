@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from advercpm.utils.geometry import boxes_from_vehicles, rotate_2d
+
+
+# ----------------------------
+# Grid
+# ----------------------------
+
+@dataclass(frozen=True)
+class BevGrid:
+    """
+    Bird's-eye-view grid in the frame of a CAV (x forward, y left).
+
+    Row ``i`` / column ``j`` is the cell whose centre is at
+    ``(x_range[0] + (j + 0.5) * resolution, y_range[0] + (i + 0.5) * resolution)``.
+
+    Parameters:
+        x_range (tuple): (min, max) x in meters. (default: (-70.4, 70.4))
+        y_range (tuple): (min, max) y in meters. (default: (-40.0, 40.0))
+        resolution (float): cell size in meters. (default: 0.4)
+    """
+    x_range: Tuple[float, float] = (-70.4, 70.4)
+    y_range: Tuple[float, float] = (-40.0, 40.0)
+    resolution: float = 0.4
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """(H, W) = (rows along y, columns along x)."""
+        return (int(math.ceil((self.y_range[1] - self.y_range[0]) / self.resolution - 1e-9)),
+                int(math.ceil((self.x_range[1] - self.x_range[0]) / self.resolution - 1e-9)))
+
+    def cell_centers(self) -> np.ndarray:
+        """(H, W, 2) x/y of every cell centre."""
+        h, w = self.shape
+        x = self.x_range[0] + (np.arange(w) + 0.5) * self.resolution
+        y = self.y_range[0] + (np.arange(h) + 0.5) * self.resolution
+        return np.stack(np.meshgrid(x, y), axis=-1)
+
+
+DEFAULT_GRID = BevGrid()
+
+# Candidate cells tested per block; bounds the temporaries to a few tens of MB.
+_CELL_BUDGET = 1 << 21
+
+
+# ----------------------------
+# Rasterization
+# ----------------------------
+
+def rasterize_boxes(
+    centers: np.ndarray,
+    half: np.ndarray,
+    yaw: np.ndarray,
+    valid: Optional[np.ndarray] = None,
+    grid: BevGrid = DEFAULT_GRID,
+) -> np.ndarray:
+    """
+    Occupancy grids of batches of oriented BEV boxes.
+
+    A cell is occupied when its centre lies inside a box. Each box only
+    tests the square window of cells around its bounding circle, all boxes
+    of a block at once, and the hits are scattered into the grids.
+
+    Args:
+        centers: (F, M, 2) box centres in the grid frame.
+        half: (F, M, 2) half-extents (length, width).
+        yaw: (F, M) headings in radians.
+        valid: (F, M) mask of real boxes (default: all).
+        grid: grid geometry.
+
+    Returns:
+        (F, H, W) bool array.
+    """
+    centers = np.asarray(centers, dtype=float)
+    half = np.asarray(half, dtype=float)
+    yaw = np.asarray(yaw, dtype=float)
+    n_frames = centers.shape[0]
+    h, w = grid.shape
+    occupancy = np.zeros(n_frames * h * w, dtype=bool)
+    if valid is None:
+        valid = np.ones(centers.shape[:2], dtype=bool)
+
+    frame, box = np.nonzero(valid)
+    if not len(frame):
+        return occupancy.reshape(n_frames, h, w)
+    c, hf, th = centers[frame, box], half[frame, box], yaw[frame, box]
+    res = grid.resolution
+    radius = np.hypot(hf[:, 0], hf[:, 1])
+    k = int(math.ceil(2.0 * radius.max() / res)) + 1
+    steps = np.arange(k)
+    col0 = np.floor((c[:, 0] - radius - grid.x_range[0]) / res).astype(np.int64)
+    row0 = np.floor((c[:, 1] - radius - grid.y_range[0]) / res).astype(np.int64)
+    cos, sin = np.cos(th), np.sin(th)
+
+    block = max(1, _CELL_BUDGET // (k * k))
+    for s in range(0, len(frame), block):
+        sl = slice(s, s + block)
+        cols = col0[sl, None] + steps                                  # (B, K)
+        rows = row0[sl, None] + steps
+        dx = (grid.x_range[0] + (cols + 0.5) * res - c[sl, 0:1])[:, None, :]     # (B, 1, K)
+        dy = (grid.y_range[0] + (rows + 0.5) * res - c[sl, 1:2])[:, :, None]     # (B, K, 1)
+        cs, sn = cos[sl, None, None], sin[sl, None, None]
+        inside = (
+            (np.abs(cs * dx + sn * dy) <= hf[sl, 0, None, None])
+            & (np.abs(cs * dy - sn * dx) <= hf[sl, 1, None, None])
+            & ((cols >= 0) & (cols < w))[:, None, :]
+            & ((rows >= 0) & (rows < h))[:, :, None]
+        )
+        b, i, j = np.nonzero(inside)
+        occupancy[(frame[sl][b] * h + rows[b, i]) * w + cols[b, j]] = True
+    return occupancy.reshape(n_frames, h, w)
+
+
+def frame_boxes(
+    frames: Sequence[Mapping[str, Any]],
+    poses: Optional[Sequence[Sequence[float]]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Padded BEV boxes of CPM frames, in the frame of ``poses`` (default:
+    each frame's own ``lidar_pose``; ``[x, y, z, roll, yaw, pitch]``).
+
+    Returns:
+        centers (F, M, 2), half (F, M, 2), yaw (F, M), valid (F, M).
+    """
+    packed = [boxes_from_vehicles(cpm.get("vehicles") or {})[1:] for cpm in frames]
+    n_max = max((len(p[0]) for p in packed), default=0)
+    centers = np.zeros((len(frames), n_max, 2))
+    half = np.zeros((len(frames), n_max, 2))
+    yaw = np.zeros((len(frames), n_max))
+    valid = np.zeros((len(frames), n_max), dtype=bool)
+    for f, (cpm, (c, hf, th)) in enumerate(zip(frames, packed)):
+        pose = poses[f] if poses is not None else cpm.get("lidar_pose")
+        x, y, heading = (0.0, 0.0, 0.0) if pose is None else (pose[0], pose[1], math.radians(pose[4]))
+        n = len(c)
+        centers[f, :n] = rotate_2d(c - (x, y), -heading)
+        half[f, :n] = hf
+        yaw[f, :n] = th - heading
+        valid[f, :n] = True
+    return centers, half, yaw, valid
+
+
+def rasterize_frames(
+    frames: Sequence[Mapping[str, Any]],
+    grid: BevGrid = DEFAULT_GRID,
+    poses: Optional[Sequence[Sequence[float]]] = None,
+) -> np.ndarray:
+    """(F, H, W) occupancy of CPM frames (see :func:`frame_boxes` for ``poses``)."""
+    return rasterize_boxes(*frame_boxes(frames, poses), grid=grid)
+
+
+# ----------------------------
+# Comparison
+# ----------------------------
+
+def occupancy_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Per-grid IoU of occupied cells of (..., H, W) grids (1 if both empty).
+    """
+    inter = np.count_nonzero(a & b, axis=(-2, -1))
+    union = np.count_nonzero(a | b, axis=(-2, -1))
+    return np.where(union > 0, inter / np.maximum(union, 1), 1.0)
+
+
+def occupancy_changes(raw: np.ndarray, attacked: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cells occupied only in ``attacked`` (added) and only in ``raw`` (removed), per grid."""
+    added = np.count_nonzero(attacked & ~raw, axis=(-2, -1))
+    removed = np.count_nonzero(raw & ~attacked, axis=(-2, -1))
+    return added, removed
+
+
+def diff_image(raw: np.ndarray, attacked: np.ndarray) -> np.ndarray:
+    """
+    RGB uint8 image of an (H, W) raw/attacked pair: grey where both are
+    occupied, red where only raw is (removed), green where only attacked
+    is (added). Row 0 is the lowest y; display with ``origin="lower"``.
+    """
+    image = np.full(raw.shape + (3,), 255, dtype=np.uint8)
+    image[raw & attacked] = (128, 128, 128)
+    image[raw & ~attacked] = (220, 40, 40)
+    image[attacked & ~raw] = (40, 170, 40)
+    return image
+
+
+def compare_frames(
+    raw_frames: Sequence[Mapping[str, Any]],
+    attacked_frames: Sequence[Mapping[str, Any]],
+    grid: BevGrid = DEFAULT_GRID,
+    chunk_size: int = 256,
+) -> Dict[str, np.ndarray]:
+    """
+    Occupancy diff of aligned raw/attacked frames, both rasterized in the
+    raw frame's sender pose (one grid frame for both, whatever the attack
+    does to ``lidar_pose``). Runs in chunks of ``chunk_size`` frames.
+
+    Returns:
+        ``{"iou", "added", "removed"}``, each (F,); added/removed in cells.
+    """
+    out = {"iou": [], "added": [], "removed": []}
+    for s in range(0, len(raw_frames), max(1, chunk_size)):
+        raw = raw_frames[s: s + chunk_size]
+        poses = [cpm.get("lidar_pose") for cpm in raw]
+        a = rasterize_frames(raw, grid, poses)
+        b = rasterize_frames(attacked_frames[s: s + chunk_size], grid, poses)
+        added, removed = occupancy_changes(a, b)
+        out["iou"].append(occupancy_iou(a, b))
+        out["added"].append(added)
+        out["removed"].append(removed)
+    return {k: np.concatenate(v) if v else np.zeros(0) for k, v in out.items()}
@@ -1,3 +1,5 @@
+import re
+
 import yaml
 from omegaconf import OmegaConf
 
@@ -21,7 +23,33 @@ def save_yaml(data, save_name):
         with open(save_name, "w") as f:
             OmegaConf.save(data, f)
 
-import yaml, re
+
+def dump_yaml(data) -> str:
+    """
+    Serialize ``data`` exactly as :func:`save_yaml` would write it.
+    """
+    if isinstance(data, dict):
+        return yaml.dump(data, default_flow_style=False)
+    return OmegaConf.to_yaml(data)
+
+
+class _ScientificLoader(yaml.SafeLoader):
+    """SafeLoader that also reads ``1e-3``-style scalars (no dot) as floats."""
+
+
+# registered once: add_implicit_resolver appends on every call
+_ScientificLoader.add_implicit_resolver(
+    u'tag:yaml.org,2002:float',
+    re.compile(u'''^(?:
+     [-+]?(?:[0-9][0-9_]*)\\.[0-9_]*(?:[eE][-+]?[0-9]+)?
+    |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
+    |\\.[0-9_]+(?:[eE][-+][0-9]+)?
+    |[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+\\.[0-9_]*
+    |[-+]?\\.(?:inf|Inf|INF)
+    |\\.(?:nan|NaN|NAN))$''', re.X),
+    list(u'-+0123456789.')
+)
+
 
 def parse_yaml(file: str) -> dict:
     """
@@ -29,16 +57,11 @@ def parse_yaml(file: str) -> dict:
     Returns dict.
     """
     with open(file, "r") as stream:
-        loader = yaml.SafeLoader
-        loader.add_implicit_resolver(
-            u'tag:yaml.org,2002:float',
-            re.compile(u'''^(?:
-             [-+]?(?:[0-9][0-9_]*)\\.[0-9_]*(?:[eE][-+]?[0-9]+)?
-            |[-+]?(?:[0-9][0-9_]*)(?:[eE][-+]?[0-9]+)
-            |\\.[0-9_]+(?:[eE][-+][0-9]+)?
-            |[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+\\.[0-9_]*
-            |[-+]?\\.(?:inf|Inf|INF)
-            |\\.(?:nan|NaN|NAN))$''', re.X),
-            list(u'-+0123456789.')
-        )
-        return yaml.load(stream, Loader=loader)
+        return loads_yaml(stream)
+
+
+def loads_yaml(stream) -> dict:
+    """
+    Load YAML from a string or stream (scientific-safe), see :func:`parse_yaml`.
+    """
+    return yaml.load(stream, Loader=_ScientificLoader)
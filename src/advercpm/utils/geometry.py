@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+from typing import Any, List, Mapping, Tuple
+
+import numpy as np
+
+from advercpm.utils.kernels import jit_kernel
+
+
+# ----------------------------
+# Box extraction
+# ----------------------------
+
+def boxes_from_vehicles(
+    vehicles: Mapping[Any, Mapping[str, Any]],
+    with_height: bool = False,
+) -> Tuple[List[Any], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    BEV boxes of a CPM ``vehicles`` mapping.
+
+    ``extent`` is taken as half-size (CARLA/OPV2V convention), ``angle`` as
+    ``[roll, yaw, pitch]`` in degrees, and ``center`` as the box offset in the
+    vehicle frame.
+
+    Returns:
+        ids, centers (N, 2), half_extents (N, 2), yaw (N,) in radians.
+        With ``with_height``, centers and half_extents are (N, 3): z is the
+        location plus the center offset, the third extent the half-height.
+    """
+    ids = list(vehicles)
+    dim = 3 if with_height else 2
+    if not ids:
+        return ids, np.zeros((0, dim)), np.zeros((0, dim)), np.zeros(0)
+    loc = np.array([v["location"][:dim] for v in vehicles.values()], dtype=float)
+    half = np.array([v["extent"][:dim] for v in vehicles.values()], dtype=float)
+    yaw = np.radians([v["angle"][1] if "angle" in v else 0.0 for v in vehicles.values()])
+    offset = np.array([(v.get("center") or (0.0, 0.0, 0.0))[:dim]
+                       for v in vehicles.values()], dtype=float)
+    centers = loc + offset
+    centers[:, :2] = loc[:, :2] + rotate_2d(offset[:, :2], yaw)
+    return ids, centers, half, yaw
+
+
+def rotate_2d(points: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    """Rotate (..., 2) points by yaw (broadcast over leading dims)."""
+    c, s = np.cos(yaw), np.sin(yaw)
+    x, y = points[..., 0], points[..., 1]
+    return np.stack([c * x - s * y, s * x + c * y], axis=-1)
+
+
+def box_corners_bev(centers: np.ndarray, half: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    """
+    Corners of oriented BEV boxes, counter-clockwise.
+
+    Returns:
+        (N, 4, 2) array.
+    """
+    signs = np.array([[1.0, 1.0], [-1.0, 1.0], [-1.0, -1.0], [1.0, -1.0]])
+    local = signs[None] * half[:, None, :]
+    return centers[:, None, :] + rotate_2d(local, yaw[:, None])
+
+
+# ----------------------------
+# Batched intersection tests
+# ----------------------------
+
+def segments_hit_boxes(
+    origins: np.ndarray,
+    targets: np.ndarray,
+    centers: np.ndarray,
+    half: np.ndarray,
+    yaw: np.ndarray,
+) -> np.ndarray:
+    """
+    Slab test of R segments against B oriented boxes in one call.
+
+    Args:
+        origins, targets: (R, 2) segment end points.
+        centers, half, yaw: B boxes.
+
+    Returns:
+        (R, B) bool, True where segment r crosses box b.
+    """
+    kernel = jit_kernel("segments_hit_boxes")
+    if kernel is not None:
+        out = np.empty((len(origins), len(centers)), dtype=bool)
+        kernel(np.asarray(origins, dtype=float), np.asarray(targets, dtype=float),
+               np.asarray(centers, dtype=float), np.asarray(half, dtype=float),
+               np.cos(-yaw), np.sin(-yaw), out)
+        return out
+    # segment start and direction in every box's local frame: (R, B, 2)
+    start = rotate_2d(origins[:, None, :] - centers[None], -yaw[None])
+    direction = rotate_2d((targets - origins)[:, None, :], -yaw[None])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / direction
+        t1 = (-half[None] - start) * inv
+        t2 = (half[None] - start) * inv
+    t_near = np.minimum(t1, t2)
+    t_far = np.maximum(t1, t2)
+
+    # a zero direction component only hits if the start lies inside that slab
+    parallel = direction == 0.0
+    inside = np.abs(start) <= half[None]
+    t_near = np.where(parallel, np.where(inside, -np.inf, np.inf), t_near)
+    t_far = np.where(parallel, np.where(inside, np.inf, -np.inf), t_far)
+
+    enter = t_near.max(axis=-1)
+    leave = t_far.min(axis=-1)
+    return (enter <= leave) & (leave >= 0.0) & (enter <= 1.0)
+
+
+# Point-box pairs tested per NumPy block.
+_POINT_BOX_BUDGET = 1 << 18
+
+
+def points_in_boxes(x: np.ndarray, y: np.ndarray, z: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """
+    Crop a point cloud to yaw-oriented 3D boxes: the first box holding
+    every point.
+
+    Args:
+        x, y, z: (N,) point columns.
+        boxes: (B, 7) ``[x, y, z, yaw, half_l, half_w, half_h]``, as in
+            :func:`box_iou_3d`.
+
+    Returns:
+        (N,) int64 box index, -1 for points outside every box.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 7)
+    cos_yaw, sin_yaw = np.cos(boxes[:, 3]), np.sin(boxes[:, 3])
+    out = np.full(len(x), -1, dtype=np.int64)
+    if not len(boxes):
+        return out
+    kernel = jit_kernel("points_in_boxes")
+    if kernel is not None:
+        kernel(x, y, z, boxes, cos_yaw, sin_yaw, out)
+        return out
+
+    block = max(1, _POINT_BOX_BUDGET // len(boxes))          # bounds the (block, B) temporaries
+    for lo in range(0, len(x), block):
+        px = np.asarray(x[lo:lo + block], dtype=float)[:, None]
+        py = np.asarray(y[lo:lo + block], dtype=float)[:, None]
+        pz = np.asarray(z[lo:lo + block], dtype=float)[:, None]
+        dx, dy = px - boxes[:, 0], py - boxes[:, 1]
+        inside = (np.abs(pz - boxes[:, 2]) <= boxes[:, 6]) \
+            & (np.abs(cos_yaw * dx + sin_yaw * dy) <= boxes[:, 4]) \
+            & (np.abs(cos_yaw * dy - sin_yaw * dx) <= boxes[:, 5])
+        first = inside.argmax(axis=1)
+        out[lo:lo + block] = np.where(inside[np.arange(len(first)), first], first, -1)
+    return out
+
+
+def boxes_overlap_bev(
+    centers_a: np.ndarray, half_a: np.ndarray, yaw_a: np.ndarray,
+    centers_b: np.ndarray, half_b: np.ndarray, yaw_b: np.ndarray,
+) -> np.ndarray:
+    """
+    Separating-axis overlap test between two sets of oriented BEV boxes.
+
+    Returns:
+        (M, N) bool, True where box a_m and box b_n intersect.
+    """
+    axes_a = _box_axes(yaw_a)                                            # (M, 2, 2)
+    axes_b = _box_axes(yaw_b)                                            # (N, 2, 2)
+    # |cos| between every axis of a and every axis of b: (M, N, 2, 2)
+    dots = np.abs(np.einsum("mkd,njd->mnkj", axes_a, axes_b))
+    delta = centers_b[None] - centers_a[:, None]                         # (M, N, 2)
+
+    # separating axes of a: a projects to half_a, b to |dots| @ half_b
+    dist_a = np.abs(np.einsum("mkd,mnd->mnk", axes_a, delta))
+    reach_a = half_a[:, None] + np.einsum("mnkj,nj->mnk", dots, half_b)
+    # separating axes of b
+    dist_b = np.abs(np.einsum("njd,mnd->mnj", axes_b, delta))
+    reach_b = half_b[None] + np.einsum("mnkj,mk->mnj", dots, half_a)
+    return np.all(dist_a <= reach_a, axis=-1) & np.all(dist_b <= reach_b, axis=-1)
+
+
+def _box_axes(yaw: np.ndarray) -> np.ndarray:
+    """Unit heading and lateral axes of boxes, (N, 2, 2)."""
+    c, s = np.cos(yaw), np.sin(yaw)
+    return np.stack([np.stack([c, s], axis=-1), np.stack([-s, c], axis=-1)], axis=1)
+
+
+# ----------------------------
+# Batched IoU
+# ----------------------------
+
+# Box pairs clipped per block; small enough for the temporaries to stay in cache.
+_PAIR_BUDGET = 1 << 12
+
+
+def box_iou_bev(
+    centers_a: np.ndarray, half_a: np.ndarray, yaw_a: np.ndarray,
+    centers_b: np.ndarray, half_b: np.ndarray, yaw_b: np.ndarray,
+) -> np.ndarray:
+    """
+    IoU of oriented BEV boxes, every box of ``a`` against every box of ``b``.
+
+    Args:
+        centers_a, half_a: (..., M, 2); yaw_a: (..., M) radians.
+        centers_b, half_b: (..., N, 2); yaw_b: (..., N). Leading dims broadcast.
+
+    Returns:
+        (..., M, N) IoU in [0, 1].
+    """
+    inter = bev_intersection_area(centers_a, half_a, yaw_a, centers_b, half_b, yaw_b)
+    area_a = 4.0 * np.prod(np.asarray(half_a, dtype=float), axis=-1)
+    area_b = 4.0 * np.prod(np.asarray(half_b, dtype=float), axis=-1)
+    return _ratio(inter, area_a[..., :, None] + area_b[..., None, :] - inter)
+
+
+def box_iou_3d(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    3D IoU of yaw-only oriented boxes, every box of ``a`` against every box of ``b``.
+
+    Args:
+        boxes_a: (..., M, 7) boxes ``[x, y, z, yaw, half_l, half_w, half_h]``
+            (``z`` is the box centre, ``yaw`` in radians).
+        boxes_b: (..., N, 7). Leading dims broadcast.
+
+    Returns:
+        (..., M, N) IoU in [0, 1].
+    """
+    a = np.asarray(boxes_a, dtype=float)
+    b = np.asarray(boxes_b, dtype=float)
+    inter = bev_intersection_area(a[..., 0:2], a[..., 4:6], a[..., 3],
+                                  b[..., 0:2], b[..., 4:6], b[..., 3])
+    za, zb = a[..., :, None, 2], b[..., None, :, 2]
+    ha, hb = a[..., :, None, 6], b[..., None, :, 6]
+    height = np.clip(np.minimum(za + ha, zb + hb) - np.maximum(za - ha, zb - hb), 0.0, None)
+    inter = inter * height
+    vol_a = 8.0 * np.prod(a[..., 4:7], axis=-1)
+    vol_b = 8.0 * np.prod(b[..., 4:7], axis=-1)
+    return _ratio(inter, vol_a[..., :, None] + vol_b[..., None, :] - inter)
+
+
+def bev_intersection_area(
+    centers_a: np.ndarray, half_a: np.ndarray, yaw_a: np.ndarray,
+    centers_b: np.ndarray, half_b: np.ndarray, yaw_b: np.ndarray,
+) -> np.ndarray:
+    """
+    Overlap area of oriented BEV boxes (shapes as in :func:`box_iou_bev`).
+
+    Only pairs whose bounding circles touch are clipped; those are gathered
+    and processed in blocks, all pairs of a block in one set of array ops.
+    """
+    centers_a, half_a, yaw_a, centers_b, half_b, yaw_b = (
+        np.asarray(x, dtype=float) for x in (centers_a, half_a, yaw_a, centers_b, half_b, yaw_b))
+    lead = np.broadcast_shapes(yaw_a.shape[:-1], yaw_b.shape[:-1])
+    m, n = yaw_a.shape[-1], yaw_b.shape[-1]
+    n_batch = int(np.prod(lead))
+
+    def flat(x, k, tail):
+        return np.broadcast_to(x, lead + (k,) + tail).reshape((n_batch, k) + tail)
+
+    ca, ha, ya = flat(centers_a, m, (2,)), flat(half_a, m, (2,)), flat(yaw_a, m, ())
+    cb, hb, yb = flat(centers_b, n, (2,)), flat(half_b, n, (2,)), flat(yaw_b, n, ())
+    inter = np.zeros((n_batch, m, n))
+    if not inter.size:
+        return inter.reshape(lead + (m, n))
+
+    delta = ca[:, :, None, :] - cb[:, None, :, :]
+    reach = np.hypot(ha[..., 0], ha[..., 1])[:, :, None] + np.hypot(hb[..., 0], hb[..., 1])[:, None, :]
+    bi, i, j = np.nonzero(np.einsum("...d,...d->...", delta, delta) <= reach ** 2)
+    # corners relative to the centre of box a, which keeps world coordinates small
+    corners_a = box_corners_bev(np.zeros((len(bi), 2)), ha[bi, i], ya[bi, i])
+    corners_b = box_corners_bev(cb[bi, j] - ca[bi, i], hb[bi, j], yb[bi, j])
+    for s in range(0, len(bi), _PAIR_BUDGET):
+        sl = slice(s, s + _PAIR_BUDGET)
+        inter[bi[sl], i[sl], j[sl]] = convex_intersection_area(corners_a[sl], corners_b[sl])
+    return inter.reshape(lead + (m, n))
+
+
+def convex_intersection_area(poly_a: np.ndarray, poly_b: np.ndarray) -> np.ndarray:
+    """
+    Overlap area of paired convex polygons.
+
+    The overlap is the convex hull of the vertices of each polygon inside
+    the other plus the edge/edge crossings; those candidates are ordered by
+    angle around their centroid and measured with the shoelace formula.
+
+    Args:
+        poly_a, poly_b: (P, K, 2) counter-clockwise vertices.
+
+    Returns:
+        (P,) areas.
+    """
+    # x and y kept as separate (P, K) planes: much faster than (..., 2) strides
+    ax, ay = poly_a[..., 0], poly_a[..., 1]
+    bx, by = poly_b[..., 0], poly_b[..., 1]
+    eax, eay = np.roll(ax, -1, axis=1) - ax, np.roll(ay, -1, axis=1) - ay
+    ebx, eby = np.roll(bx, -1, axis=1) - bx, np.roll(by, -1, axis=1) - by
+    tol = 1e-9
+
+    # offsets from every vertex of a to every vertex of b: (P, K_a, K_b)
+    dx = bx[:, None, :] - ax[:, :, None]
+    dy = by[:, None, :] - ay[:, :, None]
+    # vertices of one polygon on the inner side of every edge of the other
+    a_in_b = np.all(ebx[:, None, :] * -dy - eby[:, None, :] * -dx >= -tol, axis=2)
+    b_in_a = np.all(eax[:, :, None] * dy - eay[:, :, None] * dx >= -tol, axis=1)
+
+    # crossings of edge k of a with edge l of b: (P, K_a, K_b)
+    rx, ry = eax[:, :, None], eay[:, :, None]
+    qx, qy = ebx[:, None, :], eby[:, None, :]
+    denom = rx * qy - ry * qx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (dx * qy - dy * qx) / denom
+        u = (dx * ry - dy * rx) / denom
+    crossing = (denom != 0.0) & (t >= 0.0) & (t <= 1.0) & (u >= 0.0) & (u <= 1.0)
+    t = np.where(crossing, t, 0.0)
+
+    n_pairs = len(poly_a)
+    px = np.concatenate([ax, bx, (ax[:, :, None] + t * rx).reshape(n_pairs, -1)], axis=1)
+    py = np.concatenate([ay, by, (ay[:, :, None] + t * ry).reshape(n_pairs, -1)], axis=1)
+    valid = np.concatenate([a_in_b, b_in_a, crossing.reshape(n_pairs, -1)], axis=1)
+    count = valid.sum(axis=1)
+    scale = 1.0 / np.maximum(count, 1)
+    px = px - (px * valid).sum(axis=1)[:, None] * scale[:, None]
+    py = py - (py * valid).sum(axis=1)[:, None] * scale[:, None]
+    order = np.argsort(np.where(valid, np.arctan2(py, px), np.inf), axis=1)
+    px = np.take_along_axis(px, order, axis=1)
+    py = np.take_along_axis(py, order, axis=1)
+    # padding repeats the first vertex: its edges have zero area
+    keep = np.take_along_axis(valid, order, axis=1)
+    px = np.where(keep, px, px[:, :1])
+    py = np.where(keep, py, py[:, :1])
+    area = 0.5 * np.abs((px * np.roll(py, -1, axis=1) - py * np.roll(px, -1, axis=1)).sum(axis=1))
+    return np.where(count >= 3, area, 0.0)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    return np.where(den > 0, num / np.where(den > 0, den, 1.0), 0.0)
@@ -0,0 +1,138 @@
+"""
+Optional JIT backend for the per-point hot loops.
+
+The NumPy implementations live next to their callers (``math_utils``,
+``geometry``); this module holds loop versions of the same kernels, compiled
+with Numba when it is installed. Callers ask :func:`jit_kernel` and fall
+back to NumPy when it returns None.
+
+The loops evaluate the same float64 expressions in the same order as the
+NumPy code (no fast-math, trigonometry computed by NumPy beforehand), so
+both backends give identical results.
+"""
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:  # optional dependency
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
+
+logger = logging.getLogger("advercpm.kernels")
+
+BACKENDS = ("numpy", "numba")
+
+_backend = "numba" if numba is not None else "numpy"
+_compiled: Dict[str, Callable] = {}
+
+
+# ----------------------------
+# Backend selection
+# ----------------------------
+
+def available_backends() -> Tuple[str, ...]:
+    return BACKENDS if numba is not None else ("numpy",)
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """Select "numba" (the default when installed) or "numpy"."""
+    global _backend
+    name = str(name).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{name}'. Available backends: {', '.join(BACKENDS)}")
+    if name == "numba" and numba is None:
+        raise ImportError("Kernel backend 'numba' requires the 'numba' package (pip install numba).")
+    _backend = name
+
+
+@contextmanager
+def use_backend(name: str) -> Iterator[None]:
+    previous = _backend
+    set_backend(name)
+    try:
+        yield
+    finally:
+        set_backend(previous)
+
+
+def jit_kernel(name: str) -> Optional[Callable]:
+    """Compiled loop kernel ``name`` (compiled on first use), or None on the NumPy backend."""
+    if _backend != "numba":
+        return None
+    kernel = _compiled.get(name)
+    if kernel is None:
+        logger.debug("Compiling kernel '%s'", name)
+        kernel = numba.njit(cache=True, nogil=True)(_LOOPS[name])
+        _compiled[name] = kernel
+    return kernel
+
+
+# ----------------------------
+# Loop kernels (plain Python; see the NumPy twin named in each docstring)
+# ----------------------------
+
+def _transform_columns(x, y, z, mat):
+    """In-place rigid transform of point columns (``math_utils.transform_columns``)."""
+    for i in range(x.shape[0]):
+        px, py, pz = np.float64(x[i]), np.float64(y[i]), np.float64(z[i])
+        x[i] = mat[0, 0] * px + mat[0, 1] * py + mat[0, 2] * pz + mat[0, 3]
+        y[i] = mat[1, 0] * px + mat[1, 1] * py + mat[1, 2] * pz + mat[1, 3]
+        z[i] = mat[2, 0] * px + mat[2, 1] * py + mat[2, 2] * pz + mat[2, 3]
+
+
+def _points_in_boxes(x, y, z, boxes, cos_yaw, sin_yaw, out):
+    """First box containing every point, -1 for none (``geometry.points_in_boxes``)."""
+    for i in range(x.shape[0]):
+        px, py, pz = np.float64(x[i]), np.float64(y[i]), np.float64(z[i])
+        out[i] = -1
+        for b in range(boxes.shape[0]):
+            dz = pz - boxes[b, 2]
+            if abs(dz) > boxes[b, 6]:
+                continue
+            dx = px - boxes[b, 0]
+            dy = py - boxes[b, 1]
+            if abs(cos_yaw[b] * dx + sin_yaw[b] * dy) <= boxes[b, 4] and \
+                    abs(cos_yaw[b] * dy - sin_yaw[b] * dx) <= boxes[b, 5]:
+                out[i] = b
+                break
+
+
+def _segments_hit_boxes(origins, targets, centers, half, cos_yaw, sin_yaw, out):
+    """Slab test of segments against oriented boxes (``geometry.segments_hit_boxes``)."""
+    for r in range(origins.shape[0]):
+        ox, oy = origins[r, 0], origins[r, 1]
+        vx, vy = targets[r, 0] - ox, targets[r, 1] - oy
+        for b in range(centers.shape[0]):
+            c, s = cos_yaw[b], sin_yaw[b]           # of -yaw
+            px, py = ox - centers[b, 0], oy - centers[b, 1]
+            start = (c * px - s * py, s * px + c * py)
+            direction = (c * vx - s * vy, s * vx + c * vy)
+            enter, leave = -np.inf, np.inf
+            for k in range(2):
+                if direction[k] == 0.0:
+                    if abs(start[k]) > half[b, k]:
+                        enter, leave = np.inf, -np.inf
+                    continue
+                inv = 1.0 / direction[k]
+                t1 = (-half[b, k] - start[k]) * inv
+                t2 = (half[b, k] - start[k]) * inv
+                enter = max(enter, min(t1, t2))
+                leave = min(leave, max(t1, t2))
+            out[r, b] = enter <= leave and leave >= 0.0 and enter <= 1.0
+
+
+_LOOPS: Dict[str, Callable] = {
+    "transform_columns": _transform_columns,
+    "points_in_boxes": _points_in_boxes,
+    "segments_hit_boxes": _segments_hit_boxes,
+}
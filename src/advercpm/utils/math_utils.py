@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import numpy as np
+
+from advercpm.utils.kernels import jit_kernel
+
+
+# Conventions (OPV2V / CARLA):
+#   - Euler angles are ``[roll, yaw, pitch]`` in degrees, as stored in
+#     ``vehicles[*]["angle"]``.
+#   - Poses are ``[x, y, z, roll, yaw, pitch]``, as ``lidar_pose`` and
+#     ``true_ego_pos``.
+#   - Box ``extent`` is the half-size, ``center`` the box offset in the
+#     object frame.
+# Every function broadcasts over leading dimensions, so a whole frame (or a
+# stack of frames) is transformed in one call.
+
+
+# ----------------------------
+# Rotations
+# ----------------------------
+
+def euler_to_rotation(angles, degrees: bool = True) -> np.ndarray:
+    """
+    Rotation matrices from ``[roll, yaw, pitch]`` angles.
+
+    Args:
+        angles: (..., 3) array.
+        degrees: whether ``angles`` are in degrees.
+
+    Returns:
+        (..., 3, 3) array mapping object-frame vectors to world frame.
+    """
+    angles = np.asarray(angles, dtype=float)
+    if degrees:
+        angles = np.radians(angles)
+    roll, yaw, pitch = angles[..., 0], angles[..., 1], angles[..., 2]
+    c_r, s_r = np.cos(roll), np.sin(roll)
+    c_y, s_y = np.cos(yaw), np.sin(yaw)
+    c_p, s_p = np.cos(pitch), np.sin(pitch)
+
+    rot = np.empty(angles.shape[:-1] + (3, 3))
+    rot[..., 0, 0] = c_p * c_y
+    rot[..., 0, 1] = c_y * s_p * s_r - s_y * c_r
+    rot[..., 0, 2] = -c_y * s_p * c_r - s_y * s_r
+    rot[..., 1, 0] = s_y * c_p
+    rot[..., 1, 1] = s_y * s_p * s_r + c_y * c_r
+    rot[..., 1, 2] = -s_y * s_p * c_r + c_y * s_r
+    rot[..., 2, 0] = s_p
+    rot[..., 2, 1] = -c_p * s_r
+    rot[..., 2, 2] = c_p * c_r
+    return rot
+
+
+def rotation_to_euler(rot, degrees: bool = True) -> np.ndarray:
+    """
+    Inverse of :func:`euler_to_rotation`.
+
+    Returns:
+        (..., 3) ``[roll, yaw, pitch]``; pitch is in [-90, 90] degrees.
+    """
+    rot = np.asarray(rot, dtype=float)
+    pitch = np.arcsin(np.clip(rot[..., 2, 0], -1.0, 1.0))
+    yaw = np.arctan2(rot[..., 1, 0], rot[..., 0, 0])
+    roll = np.arctan2(-rot[..., 2, 1], rot[..., 2, 2])
+    angles = np.stack([roll, yaw, pitch], axis=-1)
+    return np.degrees(angles) if degrees else angles
+
+
+def wrap_angle(angles, degrees: bool = True) -> np.ndarray:
+    """Wrap angles to [-180, 180) degrees (or [-pi, pi) radians)."""
+    half_turn = 180.0 if degrees else np.pi
+    return (np.asarray(angles, dtype=float) + half_turn) % (2 * half_turn) - half_turn
+
+
+# ----------------------------
+# Poses and frame changes
+# ----------------------------
+
+def pose_to_matrix(pose) -> np.ndarray:
+    """
+    Homogeneous object-to-world transforms from ``[x, y, z, roll, yaw, pitch]``.
+
+    Args:
+        pose: (..., 6) array.
+
+    Returns:
+        (..., 4, 4) array.
+    """
+    pose = np.asarray(pose, dtype=float)
+    mat = np.zeros(pose.shape[:-1] + (4, 4))
+    mat[..., :3, :3] = euler_to_rotation(pose[..., 3:6])
+    mat[..., :3, 3] = pose[..., :3]
+    mat[..., 3, 3] = 1.0
+    return mat
+
+
+def invert_transform(mat) -> np.ndarray:
+    """Inverse of rigid (..., 4, 4) transforms, without a general matrix inverse."""
+    mat = np.asarray(mat, dtype=float)
+    rot_t = np.swapaxes(mat[..., :3, :3], -1, -2)
+    inv = np.zeros_like(mat)
+    inv[..., :3, :3] = rot_t
+    inv[..., :3, 3] = -np.einsum("...ij,...j->...i", rot_t, mat[..., :3, 3])
+    inv[..., 3, 3] = 1.0
+    return inv
+
+
+def transform_points(points, mat) -> np.ndarray:
+    """
+    Apply (..., 4, 4) transforms to (..., N, 3) points.
+
+    Returns:
+        (..., N, 3) array.
+    """
+    points = np.asarray(points, dtype=float)
+    mat = np.asarray(mat, dtype=float)
+    return np.einsum("...ij,...nj->...ni", mat[..., :3, :3], points) + mat[..., None, :3, 3]
+
+
+def transform_columns(x: np.ndarray, y: np.ndarray, z: np.ndarray, mat) -> None:
+    """
+    Apply one (4, 4) transform in place to points stored as 1-D ``x``, ``y``,
+    ``z`` columns (e.g. the fields of a point cloud chunk, any float dtype).
+
+    Computed in float64 without an (N, 3) stack; uses the JIT kernel when
+    available (see :mod:`advercpm.utils.kernels`).
+    """
+    mat = np.asarray(mat, dtype=float)
+    kernel = jit_kernel("transform_columns")
+    if kernel is not None:
+        kernel(x, y, z, mat)
+        return
+    px, py, pz = np.array(x, dtype=float), np.array(y, dtype=float), np.array(z, dtype=float)
+    for row, column in enumerate((x, y, z)):
+        column[...] = mat[row, 0] * px + mat[row, 1] * py + mat[row, 2] * pz + mat[row, 3]
+
+
+def local_to_world(points, pose) -> np.ndarray:
+    """Map (..., N, 3) points from the frame at ``pose`` (e.g. a CAV's ``lidar_pose``) to world."""
+    return transform_points(points, pose_to_matrix(pose))
+
+
+def world_to_local(points, pose) -> np.ndarray:
+    """Map (..., N, 3) world points into the frame at ``pose``."""
+    return transform_points(points, invert_transform(pose_to_matrix(pose)))
+
+
+def vehicle_poses(locations, angles) -> np.ndarray:
+    """Stack (N, 3) locations and (N, 3) ``[roll, yaw, pitch]`` angles into (N, 6) poses."""
+    return np.concatenate([np.asarray(locations, dtype=float),
+                           np.asarray(angles, dtype=float)], axis=-1)
+
+
+# ----------------------------
+# Boxes
+# ----------------------------
+
+# Unit-cube corner signs: bottom face then top face, counter-clockwise from
+# front-left as seen from above.
+_CORNER_SIGNS = np.array([
+    [1, 1, -1], [-1, 1, -1], [-1, -1, -1], [1, -1, -1],
+    [1, 1, 1], [-1, 1, 1], [-1, -1, 1], [1, -1, 1],
+], dtype=float)
+
+
+def box_corners(locations, extents, angles, centers=None) -> np.ndarray:
+    """
+    World-frame corners of oriented 3D boxes.
+
+    Args:
+        locations: (..., 3) object origins.
+        extents: (..., 3) half-sizes.
+        angles: (..., 3) ``[roll, yaw, pitch]`` in degrees.
+        centers: (..., 3) box offsets in the object frame (default: none).
+
+    Returns:
+        (..., 8, 3) array.
+    """
+    extents = np.asarray(extents, dtype=float)
+    local = _CORNER_SIGNS * extents[..., None, :]
+    if centers is not None:
+        local = local + np.asarray(centers, dtype=float)[..., None, :]
+    rot = euler_to_rotation(angles)
+    return np.einsum("...ij,...nj->...ni", rot, local) + np.asarray(locations, dtype=float)[..., None, :]
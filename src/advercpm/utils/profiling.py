@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+logger = logging.getLogger("advercpm.profiling")
+
+# Settings of the active profiler, inherited by worker processes.
+_ENV_VAR = "ADVERCPM_PROFILING"
+
+_DEFAULTS = {
+    "cprofile": False,
+    "tracemalloc": False,
+    "tracemalloc_frames": 1,
+    "top_n": 20,
+    "sampler": False,
+    "sample_interval": 0.01,
+    "output_dir": None,
+}
+
+
+def _settings(cfg) -> Dict[str, Any]:
+    settings = dict(_DEFAULTS)
+    if cfg is not None:
+        for key in _DEFAULTS:
+            value = cfg.get(key, None) if hasattr(cfg, "get") else getattr(cfg, key, None)
+            if value is not None:
+                settings[key] = value
+    return settings
+
+
+# ----------------------------
+# Stack sampler
+# ----------------------------
+
+class StackSampler:
+    """
+    Periodically records the call stack of one thread from a daemon thread.
+
+    Stacks are aggregated in "collapsed" form (``outer;inner;leaf count`` per
+    line), the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.01, thread_id: Optional[int] = None):
+        self.interval = float(interval)
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="advercpm-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# ----------------------------
+# Run profiler
+# ----------------------------
+
+class Profiler:
+    """
+    Profiling hooks of one process, driven by the ``profiling`` config section.
+
+    - cprofile: dumps ``<name>.prof`` (open with pstats / snakeviz).
+    - tracemalloc: at every :meth:`stage` boundary, appends the top-N
+      allocation sites and the growth since the previous boundary to
+      ``<name>_tracemalloc.txt``.
+    - sampler: writes collapsed stacks to ``<name>_stacks.txt``.
+
+    Files go to ``output_dir`` (default: the run's log directory). While the
+    profiler runs, its settings are exported to child processes, which pick
+    them up with :func:`worker_profiler`. Everything is off by default and
+    the disabled profiler costs nothing.
+    """
+
+    def __init__(self, cfg=None, out_dir=None, name: str = "main"):
+        self.settings = _settings(cfg)
+        out = self.settings["output_dir"] or out_dir or "."
+        self.out_dir = Path(out)
+        self.name = name
+        self.enabled = bool(self.settings["cprofile"] or self.settings["tracemalloc"]
+                            or self.settings["sampler"])
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._snapshot = None
+        self._owns_tracemalloc = False
+        self._exported = False
+        self._start_time = 0.0
+
+    def start(self) -> "Profiler":
+        if not self.enabled:
+            return self
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._start_time = time.perf_counter()
+        if _ENV_VAR not in os.environ:
+            exported = dict(self.settings, output_dir=str(self.out_dir))
+            os.environ[_ENV_VAR] = json.dumps(exported)
+            self._exported = True
+        if self.settings["tracemalloc"]:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(int(self.settings["tracemalloc_frames"]))
+                self._owns_tracemalloc = True
+            self._snapshot = tracemalloc.take_snapshot()
+        if self.settings["sampler"]:
+            self._sampler = StackSampler(self.settings["sample_interval"])
+            self._sampler.start()
+        if self.settings["cprofile"]:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        logger.info("Profiling %s -> %s", self.name, self.out_dir)
+        return self
+
+    def stop(self) -> None:
+        if not self.enabled:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+            path = self.out_dir / f"{self.name}.prof"
+            self._profile.dump_stats(str(path))
+            self._profile = None
+            logger.info("cProfile stats written to %s", path)
+        if self._sampler is not None:
+            self._sampler.stop()
+            path = self.out_dir / f"{self.name}_stacks.txt"
+            self._sampler.write(path)
+            logger.info("%d stack samples written to %s", self._sampler.samples, path)
+            self._sampler = None
+        if self._snapshot is not None:
+            self.stage("end")
+            self._snapshot = None
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+        if self._exported:
+            os.environ.pop(_ENV_VAR, None)
+            self._exported = False
+
+    def stage(self, label: str) -> None:
+        """Mark a stage boundary: record a tracemalloc snapshot (if enabled)."""
+        if self._snapshot is None:
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        top_n = int(self.settings["top_n"])
+        current, peak = tracemalloc.get_traced_memory()
+        path = self.out_dir / f"{self.name}_tracemalloc.txt"
+        with open(path, "a") as f:
+            f.write(f"=== {label} @ {time.perf_counter() - self._start_time:.3f}s | "
+                    f"current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n")
+            f.write(f"--- top {top_n} allocation sites\n")
+            for stat in snapshot.statistics("lineno")[:top_n]:
+                f.write(f"{stat}\n")
+            f.write(f"--- top {top_n} changes since previous stage\n")
+            for stat in snapshot.compare_to(self._snapshot, "lineno")[:top_n]:
+                f.write(f"{stat}\n")
+            f.write("\n")
+        self._snapshot = snapshot
+        logger.debug("tracemalloc stage '%s': current %.1f MB, peak %.1f MB",
+                     label, current / 1e6, peak / 1e6)
+
+    @contextmanager
+    def section(self, label: str) -> Iterator[None]:
+        """``with profiler.section("x"):`` marks ``x:start`` and ``x:end`` boundaries."""
+        self.stage(f"{label}:start")
+        try:
+            yield
+        finally:
+            self.stage(f"{label}:end")
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def worker_profiler(name: str) -> Profiler:
+    """
+    Profiler of a worker process, configured like the parent's active one.
+
+    Returns a disabled profiler when the parent is not profiling. The file
+    names get the worker ``name`` and pid, so workers do not overwrite each other.
+    """
+    raw = os.environ.get(_ENV_VAR)
+    settings = json.loads(raw) if raw else None
+    return Profiler(settings, name=f"{name}-{os.getpid()}")
+
+
+def start_worker_profiler(name: str) -> None:
+    """
+    ``initializer`` for process pools: profiles the worker until it exits.
+    """
+    profiler = worker_profiler(name)
+    if not profiler.enabled:
+        return
+    from multiprocessing import util
+
+    profiler.start()
+    # pool workers leave through os._exit, which skips atexit
+    util.Finalize(profiler, profiler.stop, exitpriority=10)
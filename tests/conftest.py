@@ -23,4 +23,3 @@ def sim_path():
         pytest.skip(f"[SKIP] Simulation path not found: {path}")
 
     return str(path)
-
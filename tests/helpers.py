@@ -0,0 +1,82 @@
+"""Synthetic CPM frames, scenarios and run configs shared by the tests."""
+from pathlib import Path
+
+import yaml
+
+from advercpm.config.loader import load_config
+
+
+def make_vehicle(x, y, yaw=0.0, speed=0.0, extent=(2.4, 1.0, 0.8)):
+    """Build one OPV2V-style vehicle entry (angle = [roll, yaw, pitch] in degrees)."""
+    return {
+        "angle": [0.0, float(yaw), 0.0],
+        "center": [0.0, 0.0, 0.8],
+        "extent": list(extent),
+        "location": [float(x), float(y), 0.0],
+        "speed": float(speed),
+    }
+
+
+def make_cpm(pose, vehicles, ego_speed=0.0):
+    """Build a parsed CPM dict for a CAV at ``pose`` = (x, y[, yaw])."""
+    x, y = pose[0], pose[1]
+    yaw = pose[2] if len(pose) > 2 else 0.0
+    lidar_pose = [float(x), float(y), 1.9, 0.0, float(yaw), 0.0]
+    return {
+        "ego_speed": float(ego_speed),
+        "lidar_pose": lidar_pose,
+        "true_ego_pos": list(lidar_pose),
+        "predicted_ego_pos": list(lidar_pose),
+        "vehicles": dict(vehicles),
+    }
+
+
+def make_frame(n=5):
+    """One CPM reporting ``n`` objects (ids 600, 601, ...) with distinct poses and speeds."""
+    vehicles = {600 + i: make_vehicle(3.0 * i, -1.5 * i, yaw=10.0 * i, speed=i + 0.5) for i in range(n)}
+    return make_cpm((0.0, 0.0, 45.0), vehicles, ego_speed=12.5)
+
+
+def make_stream(n=8):
+    """``n`` CPMs of a CAV driving along x, reporting object 1000 ten metres ahead."""
+    return [make_cpm((float(k), 0.0), {1000: make_vehicle(10.0 + k, 0.0)}) for k in range(n)]
+
+
+def write_scenario(root, n_frames=6, cavs=(641, 650, 659), name="2021_08_test", with_pcd=True):
+    """
+    Write a small OPV2V-style scenario: ``root/<name>/<cav>/<frame>.yaml|.pcd``.
+
+    Every CAV drives along x and reports the other CAVs plus three objects.
+    """
+    scenario = Path(root) / name
+    objects = {1000: (5.0, 8.0), 1001: (20.0, -6.0), 1002: (35.0, 3.0)}
+    for c, vid in enumerate(cavs):
+        v_dir = scenario / str(vid)
+        v_dir.mkdir(parents=True, exist_ok=True)
+        for k in range(n_frames):
+            stem = f"{68 + 2 * k:06d}"
+            positions = {o: (x + k, y) for o, (x, y) in objects.items()}
+            positions.update({other: (10.0 * i + k, 0.0) for i, other in enumerate(cavs) if other != vid})
+            vehicles = {o: make_vehicle(x, y, yaw=5.0, speed=10.0) for o, (x, y) in positions.items()}
+            cpm = make_cpm((10.0 * c + k, 0.0), vehicles, ego_speed=36.0)
+            with open(v_dir / f"{stem}.yaml", "w") as f:
+                yaml.dump(cpm, f, default_flow_style=False)
+            if with_pcd:
+                (v_dir / f"{stem}.pcd").write_text(
+                    "VERSION 0.7\nFIELDS x y z intensity\nSIZE 4 4 4 4\nTYPE F F F F\n"
+                    "COUNT 1 1 1 1\nWIDTH 2\nHEIGHT 1\nVIEWPOINT 0 0 0 1 0 0 0\n"
+                    "POINTS 2\nDATA ascii\n1 2 3 0.5\n4 5 6 0.1\n"
+                )
+    return scenario
+
+
+def make_run_config(scenario, root, out="adv", results=None):
+    """
+    ``attack_drift.yaml`` pointed at a synthetic scenario: adversarial output
+    in ``root/<out>``, results in ``root/<results>`` (``<out>_results`` by default).
+    """
+    cfg = load_config(scenario_path="attack_drift.yaml")
+    cfg.data.simulation_path = str(scenario.parent)
+    cfg.data.adversarial_simulation_path = str(Path(root) / out)
+    cfg.evaluation.results_path = str(Path(root) / (results or f"{out}_results"))
+    return cfg
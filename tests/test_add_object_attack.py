@@ -3,10 +3,14 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 from matplotlib.patches import Polygon
 import math
+import numpy as np
 from tqdm import tqdm
 
 from advercpm.utils.file_ops import parse_yaml
 from advercpm.attacks.add_object import AddObjectAttack
+from advercpm.simulation import runner
+from advercpm.utils.geometry import boxes_from_vehicles, boxes_overlap_bev
+from helpers import make_cpm, make_run_config, make_vehicle, write_scenario
 
 
 def run_add_object_experiment(sim_path: str, ego_id: int = 641, malicious_id: int = 650):
@@ -120,3 +124,56 @@ def test_add_object_attack(sim_path):
     print("[TEST] Plotting first attacked frame for verification...")
     plot_add_object_example(attacked_frames[0], ego_id=641,
                             fake_id=9999, malicious_id=malicious_id)
+
+
+def test_occlusion_aware_placement_avoids_hidden_and_occupied_spots():
+    # ego at the origin heading +x, attacker behind it, a truck right where
+    # the fixed placement would put the fake vehicle
+    vehicles = {
+        600: make_vehicle(0.0, 0.0),
+        601: make_vehicle(-10.0, 0.0),
+        602: make_vehicle(10.0, 0.0, extent=(6.0, 1.5, 1.5)),
+    }
+    cpm = make_cpm((-10.0, 0.0), vehicles)
+    attack = AddObjectAttack({"ego_id": 600, "malicious_id": 601, "extent": [2.4, 1.0, 0.8]})
+    out = attack.apply(cpm)
+
+    assert attack.last_meta["placed"]
+    fake = {9999: out["vehicles"][9999]}
+    real = {k: v for k, v in out["vehicles"].items() if k != 9999}
+    _, c_f, h_f, y_f = boxes_from_vehicles(fake)
+    _, c_r, h_r, y_r = boxes_from_vehicles(real)
+    assert not boxes_overlap_bev(c_f, h_f, y_f, c_r, h_r, y_r).any()
+    assert abs(out["vehicles"][9999]["location"][1]) > 1.0  # moved out of the ego lane
+
+
+def test_occlusion_aware_placement_skips_frame_without_candidate():
+    vehicles = {600: make_vehicle(0.0, 0.0), 601: make_vehicle(-10.0, 0.0)}
+    cpm = make_cpm((-10.0, 0.0), vehicles)
+    attack = AddObjectAttack({"ego_id": 600, "malicious_id": 601, "max_range": 5.0})
+    out = attack.apply(cpm)
+    assert 9999 not in out["vehicles"]
+    assert attack.last_meta == {"placed": False}
+
+
+def test_fixed_placement_uses_yaw_in_degrees():
+    vehicles = {600: make_vehicle(0.0, 0.0, yaw=90.0), 601: make_vehicle(-10.0, 0.0)}
+    attack = AddObjectAttack({"ego_id": 600, "malicious_id": 601, "placement": "fixed"})
+    out = attack.apply(make_cpm((-10.0, 0.0), vehicles))
+    assert np.allclose(out["vehicles"][9999]["location"][:2], [0.0, 10.0])
+
+
+def test_runner_injects_into_the_attackers_own_cpm(tmp_path):
+    # a CAV's CPM never lists the CAV itself, so the ray origin is its lidar
+    scenario = write_scenario(tmp_path / "raw", n_frames=3)
+    cfg = make_run_config(scenario, tmp_path)
+    cfg.attack.type = "add_object"
+    cfg.attack.parameters = {}
+    cfg.evaluation.enabled = False
+    runner.run(cfg, tmp_path)
+
+    attacked = sorted((tmp_path / "adv" / scenario.name / "659").glob("*.yaml"))
+    assert len(attacked) == 3
+    for f in attacked:
+        assert 659 not in parse_yaml(scenario / "659" / f.name)["vehicles"]
+        assert 9999 in parse_yaml(f)["vehicles"]
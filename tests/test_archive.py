@@ -0,0 +1,65 @@
+import pytest
+import yaml
+
+from advercpm.data.archive import DirectoryWriter, ShardReader, ShardWriter
+from advercpm.utils.file_ops import _ScientificLoader, parse_yaml
+from helpers import make_cpm, make_vehicle
+
+
+def _write_scenario(writer, n_frames=20):
+    expected = {}
+    for vid in (641, 650):
+        for k in range(n_frames):
+            cpm = make_cpm((float(k), 0.0), {9: make_vehicle(k + 5.0, 1.0)})
+            key = f"{vid}/{k:06d}.yaml"
+            writer.write_yaml(key, cpm)
+            expected[key] = cpm
+    return expected
+
+
+@pytest.mark.parametrize("compression", [None, "zstd"])
+def test_shards_roundtrip_with_random_access(tmp_path, compression):
+    if compression:
+        pytest.importorskip("zstandard")
+    pcd = tmp_path / "cloud.pcd"
+    pcd.write_bytes(b"VERSION .7\n" + bytes(range(256)) * 64)
+
+    with ShardWriter(tmp_path / "out", shard_size=4096, compression=compression) as writer:
+        expected = _write_scenario(writer)
+        writer.copy_file("650/000000.pcd", pcd)
+
+    with ShardReader(tmp_path / "out") as reader:
+        assert len(reader.shards) > 1
+        assert len(reader) == len(expected) + 1
+        for key in reversed(sorted(expected)):
+            assert reader.read_yaml(key) == expected[key]
+        assert reader.read_bytes("650/000000.pcd") == pcd.read_bytes()
+        assert reader.vehicle_frames(641) == sorted(k for k in expected if k.startswith("641/"))
+        assert sum(1 for _ in reader) == len(reader)
+
+
+def test_directory_writer_matches_file_layout(tmp_path):
+    expected = _write_scenario(DirectoryWriter(tmp_path), n_frames=2)
+    for key, cpm in expected.items():
+        assert parse_yaml(tmp_path / key) == cpm
+
+
+def test_reading_many_members_leaves_yaml_resolvers_alone(tmp_path):
+    def resolvers():
+        return [sum(map(len, loader.yaml_implicit_resolvers.values()))
+                for loader in (yaml.SafeLoader, _ScientificLoader)]
+
+    with ShardWriter(tmp_path / "out") as writer:
+        expected = _write_scenario(writer, n_frames=100)
+    before = resolvers()
+    with ShardReader(tmp_path / "out") as reader:
+        for key in expected:
+            reader.read_yaml(key)
+    assert resolvers() == before
+
+
+def test_duplicate_keys_are_rejected(tmp_path):
+    with ShardWriter(tmp_path) as writer:
+        writer.write_bytes("a", b"1")
+        with pytest.raises(ValueError):
+            writer.write_bytes("a", b"2")
@@ -0,0 +1,44 @@
+import dataclasses
+
+import pytest
+from omegaconf import OmegaConf
+
+from advercpm.attacks import build_attack
+from advercpm.attacks.base_attack import compile_params
+from advercpm.attacks.burst import BurstAttack, BurstParams
+from advercpm.attacks.delay import DelayParams, Scope
+from advercpm.attacks.drift import DriftAttack, DriftMode, DriftParams
+
+
+def test_build_attack_compiles_frozen_params():
+    cfg = OmegaConf.create({"type": "drift", "parameters": {"mode": "Biased", "direction": "ne"}})
+    attack = build_attack(cfg)
+    assert isinstance(attack, DriftAttack)
+    assert isinstance(attack.parameters, DriftParams)
+    assert attack.parameters.mode is DriftMode.BIASED
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        attack.parameters.mode = DriftMode.LINEAR
+
+
+def test_unknown_parameter_is_rejected():
+    with pytest.raises(ValueError, match="unknown parameter.*'sigm'"):
+        build_attack(OmegaConf.create({"type": "white_noise", "parameters": {"sigm": 1.0}}))
+
+
+def test_bad_values_are_rejected():
+    with pytest.raises(ValueError, match="must be one of"):
+        compile_params(DelayParams, {"scope": "header"})
+    with pytest.raises(ValueError, match="delay_frames"):
+        compile_params(DelayParams, {"delay_frames": 2.5})
+    with pytest.raises(ValueError):
+        compile_params(DriftParams, {"direction": "sideways"})
+
+
+def test_aliases_and_conversion():
+    p = compile_params(BurstParams, {"lambda": 1, "max_jitter": 2})
+    assert p.rate == 1.0 and isinstance(p.rate, float) and p.max_jitter == 2.0
+    assert BurstAttack({"lambda": 0.5}).lambda_ == 0.5
+    assert compile_params(DelayParams, {"scope": "MESSAGE"}).scope is Scope.MESSAGE
+    assert compile_params(DriftParams, {"yaw_drift_deg_per_s": 0.3}).yaw_drift_deg_per_frame == 0.3
+    with pytest.raises(ValueError, match="not both"):
+        compile_params(DriftParams, {"yaw_drift_deg_per_s": 0.3, "yaw_drift_deg_per_frame": 0.1})
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from omegaconf import OmegaConf
+
+from advercpm.simulation import runner
+from advercpm.simulation.search import AttackSearch
+from helpers import make_run_config, write_scenario
+
+
+def _search(scenario, tmp_path, parameters, **overrides):
+    attack_cfg = OmegaConf.create({"type": "drift", "parameters": {"direction": "E"}})
+    search_cfg = OmegaConf.create({
+        "parameters": parameters,
+        "metric": "trajectory_divergence",
+        "target": 5.0,
+        "tolerance": 0.01,
+        "n_workers": 1,
+        "cache_dir": str(tmp_path / "cache"),
+        **overrides,
+    })
+    return AttackSearch(attack_cfg, search_cfg, scenario, vehicle_id=650)
+
+
+def test_bisection_finds_threshold_and_memoizes(tmp_path):
+    # linear drift over 10 frames: max divergence = 10 * drift_rate
+    scenario = write_scenario(tmp_path / "raw", n_frames=10)
+    result = _search(scenario, tmp_path, {"drift_rate": [0.0, 2.0]}).run()
+
+    assert result["method"] == "bisection"
+    assert result["found"]
+    assert 0.5 <= result["best"]["drift_rate"] <= 0.51
+    assert result["evaluations"] < 20
+
+    again = _search(scenario, tmp_path, {"drift_rate": [0.0, 2.0]}).run()
+    assert again["evaluations"] == 0
+    assert again["best"] == result["best"]
+
+
+def test_bisection_reports_unreachable_target(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    result = _search(scenario, tmp_path, {"drift_rate": [0.0, 0.1]}).run()
+    assert not result["found"]
+
+
+def test_successive_halving_prefers_weak_effective_attacks(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=8)
+    search = _search(
+        scenario, tmp_path,
+        {"drift_rate": [0.0, 3.0], "yaw_drift_deg_per_frame": [0.0, 1.0]},
+        candidates=8, n_workers=2,
+    )
+    result = search.run()
+
+    assert result["method"] == "successive_halving"
+    assert result["found"] and result["value"] >= 5.0
+    effective = [h for h in result["history"] if h["frames"] == 8 and h["value"] >= 5.0]
+    assert result["evaluations"] < 8 * 4
+    assert effective
+
+
+def test_successive_halving_scores_winner_on_all_frames(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=8)
+    result = _search(
+        scenario, tmp_path,
+        {"drift_rate": [0.0, 3.0], "yaw_drift_deg_per_frame": [0.0, 1.0]},
+        candidates=8, max_evals=8,
+    ).run()
+
+    assert result["evaluations"] == 9                   # first round, then the winner in full
+    final = result["history"][-1]
+    assert final["frames"] == 8 and final["params"] == result["best"]
+    assert result["value"] == final["value"] >= 5.0
+
+
+
+@pytest.mark.parametrize("generation", [False, True])
+def test_search_scores_candidates_like_the_runner(tmp_path, generation):
+    # add_object needs the ego id runner.attack_config fills in; with the CPM
+    # generation rules on, the ego is only sent in some frames
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    cfg = make_run_config(scenario, tmp_path)
+    cfg.attack.type = "add_object"
+    cfg.attack.parameters = {"placement": "fixed", "distance_ahead": 10.0}
+    cfg.cpm_generation.enabled = generation
+    runner.run(cfg, tmp_path)
+    summary = json.loads((tmp_path / "adv_results" / "summary_drift_baseline.json").read_text())
+
+    search_cfg = OmegaConf.create({"parameters": {"distance_ahead": [5.0, 20.0]},
+                                   "metric": "object_count_diff", "target": 0.1, "n_workers": 1})
+    search = AttackSearch(runner.attack_config(cfg, 659, 641), search_cfg, scenario, 659, cfg.cpm_generation)
+    value, = search.evaluate([{"distance_ahead": 10.0}])
+    assert value == summary["metrics"]["object_count_diff"] > 0
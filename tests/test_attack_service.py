@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import yaml
+from omegaconf import OmegaConf
+
+from advercpm.simulation.service import AttackService, LatencyHistogram
+from helpers import make_cpm, make_vehicle
+
+
+DRIFT_CFG = OmegaConf.create({
+    "type": "drift",
+    "parameters": {"drift_rate": 1.0, "direction": "E"},
+})
+
+
+async def _roundtrip(port, requests):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    writer.close()
+    return responses
+
+
+def _run_against_service(requests):
+    async def scenario():
+        service = AttackService(DRIFT_CFG)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await _roundtrip(port, requests)
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(scenario())
+
+
+def test_service_keeps_state_per_sender():
+    frame = make_cpm((0, 0), {641: make_vehicle(10.0, 0.0)})
+    responses = _run_against_service([
+        {"sender": 1, "frame": frame},
+        {"sender": 1, "frame": frame},
+        {"sender": 2, "frame": frame},
+        {"op": "stats"},
+    ])
+    xs = [r["frame"]["vehicles"]["641"]["location"][0] for r in responses[:3]]
+    assert xs == [11.0, 12.0, 11.0]
+    assert responses[3]["senders"] == 2
+    assert responses[3]["stats"]["count"] == 3
+
+
+def test_service_accepts_yaml_frames():
+    frame = make_cpm((0, 0), {641: make_vehicle(10.0, 0.0)})
+    response, error = _run_against_service([
+        {"sender": 7, "frame_yaml": yaml.safe_dump(frame), "id": "a"},
+        {"sender": 7},
+    ])
+    attacked = yaml.safe_load(response["frame_yaml"])
+    assert attacked["vehicles"][641]["location"][0] == 11.0
+    assert response["id"] == "a"
+    assert "error" in error
+
+
+
+def test_yaml_requests_do_not_grow_the_loader():
+    from advercpm.utils.file_ops import _ScientificLoader
+
+    def resolvers():
+        return [sum(map(len, loader.yaml_implicit_resolvers.values()))
+                for loader in (yaml.SafeLoader, _ScientificLoader)]
+
+    frame = yaml.safe_dump(make_cpm((0, 0), {641: make_vehicle(10.0, 0.0)}))
+    before = resolvers()
+    responses = _run_against_service([{"sender": 7, "frame_yaml": frame}] * 50)
+    assert all("frame_yaml" in r for r in responses)
+    assert resolvers() == before
+
+def test_service_rejects_over_long_lines():
+    async def scenario():
+        service = AttackService(DRIFT_CFG)
+        server = await service.start(port=0, limit=1024)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        try:
+            writer.write(json.dumps({"sender": 1, "pad": "x" * 4096}).encode() + b"\n")
+            await writer.drain()
+            return json.loads(await reader.readline()), await reader.read()
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+
+    response, rest = asyncio.run(scenario())
+    assert "too long" in response["error"]
+    assert rest == b""                          # connection closed
+
+
+def test_latency_histogram_percentiles():
+    hist = LatencyHistogram()
+    for ms in range(1, 101):
+        hist.record(ms / 1e3)
+    snap = hist.snapshot()
+    assert snap["count"] == 100
+    assert 45 <= snap["p50_ms"] <= 56
+    assert 95 <= snap["p99_ms"] <= 100
@@ -0,0 +1,96 @@
+import csv
+
+import numpy as np
+import pytest
+
+from advercpm.config.loader import load_config
+from advercpm.simulation import runner
+from advercpm.simulation.work_queue import WorkQueue, enqueue, run_worker
+from helpers import make_run_config, write_scenario
+
+
+def _config(cfg, **attackers):
+    cfg.attack.parameters.mode = "biased"          # random draws per frame
+    for key, value in attackers.items():
+        cfg.attackers[key] = value
+    return cfg
+
+
+def _mse(tmp_path, out, name):
+    with open(tmp_path / f"{out}_results" / f"per_frame_{name}.csv") as f:
+        return np.array([float(row["MSE_position"]) for row in csv.DictReader(f)])
+
+
+def test_select_attackers():
+    cfg = load_config(scenario_path="attack_drift.yaml")
+    ids = [641, 650, 659, 670]
+    assert runner.select_attackers(cfg, ids, 641) == [670]
+    cfg.attackers.select = "all"
+    assert runner.select_attackers(cfg, ids, 641) == [650, 659, 670]
+    cfg.attackers.select = "ids"
+    cfg.attackers.ids = [659, 650]
+    assert runner.select_attackers(cfg, ids, 641) == [650, 659]
+    cfg.attackers.ids = [641]
+    with pytest.raises(ValueError, match="non-ego"):
+        runner.select_attackers(cfg, ids, 641)
+    cfg.attackers.select = "fraction"
+    cfg.attackers.fraction = 0.6
+    picked = runner.select_attackers(cfg, ids, 641)
+    assert len(picked) == 2 and 641 not in picked
+    assert runner.select_attackers(cfg, ids, 641) == picked       # seeded
+    cfg.attackers.select = "some"
+    with pytest.raises(ValueError, match="Available selections"):
+        runner.select_attackers(cfg, ids, 641)
+
+
+def test_attack_config_per_vehicle_and_ids():
+    cfg = load_config(scenario_path="attack_drift.yaml")
+    cfg.attackers.attacks = {650: {"type": "add_object", "parameters": {"distance_ahead": 5.0}}}
+    spec = runner.attack_config(cfg, 650, 641)
+    assert spec.type == "add_object"
+    assert (spec.parameters.ego_id, spec.parameters.malicious_id) == (641, 650)
+    assert runner.attack_config(cfg, 659, 641).type == "drift"
+
+    cfg.attackers.coordinated = True
+    with pytest.raises(ValueError, match="coordinated"):
+        runner.attack_config(cfg, 650, 641)
+
+
+def test_several_attackers_in_one_pass(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=5)
+    runner.run(_config(make_run_config(scenario, tmp_path, "solo")), tmp_path)
+    runner.run(_config(make_run_config(scenario, tmp_path, "indep"), select="all"), tmp_path)
+    runner.run(_config(make_run_config(scenario, tmp_path, "coord"), select="all", coordinated=True), tmp_path)
+
+    # drift moves every object alike, so MSE only depends on the random draws:
+    # the first attacker draws what a lone attacker does, the others their own noise
+    np.testing.assert_allclose(_mse(tmp_path, "indep", "drift_baseline_650"),
+                               _mse(tmp_path, "solo", "drift_baseline"))
+    assert not np.allclose(_mse(tmp_path, "indep", "drift_baseline_650"),
+                           _mse(tmp_path, "indep", "drift_baseline_659"))
+    np.testing.assert_allclose(_mse(tmp_path, "coord", "drift_baseline_650"),
+                               _mse(tmp_path, "coord", "drift_baseline_659"))
+    # the ego is never attacked
+    for out in ("indep", "coord"):
+        raw = sorted((scenario / "641").iterdir())
+        sent = sorted((tmp_path / out / scenario.name / "641").iterdir())
+        assert [p.read_bytes() for p in raw] == [p.read_bytes() for p in sent]
+
+
+def test_worker_attackers_match_runner(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    cfg = _config(make_run_config(scenario, tmp_path, "serial"), select="ids", ids=[650, 659])
+    cfg.attackers.attacks = {650: {"type": "delay", "parameters": {"delay_frames": 1}}}
+    runner.run(cfg, tmp_path)
+
+    queued = _config(make_run_config(scenario, tmp_path, "queued"), select="ids", ids=[650, 659])
+    queued.attackers.attacks = cfg.attackers.attacks
+    queue = WorkQueue(tmp_path / "q")
+    enqueue(queued, queue)
+    assert run_worker(queue, poll_interval=0.01) == 3
+    for vid in ("641", "650", "659"):
+        serial = sorted((tmp_path / "serial" / scenario.name / vid).iterdir())
+        worker = sorted((tmp_path / "queued" / scenario.name / vid).iterdir())
+        assert [p.read_bytes() for p in serial] == [p.read_bytes() for p in worker]
+    raw = sorted((scenario / "650").glob("*.yaml"))
+    assert raw[0].read_bytes() != (tmp_path / "serial" / scenario.name / "650" / raw[1].name).read_bytes()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from advercpm.simulation.evaluator import evaluate_frames, occupancy_iou
+from advercpm.utils.bev import BevGrid, compare_frames, diff_image, rasterize_boxes, rasterize_frames
+from helpers import make_cpm, make_vehicle
+
+
+def _reference(centers, half, yaw, valid, grid):
+    cells = grid.cell_centers()
+    out = np.zeros((len(centers),) + grid.shape, dtype=bool)
+    for f in range(len(centers)):
+        for m in np.nonzero(valid[f])[0]:
+            d = cells - centers[f, m]
+            c, s = np.cos(yaw[f, m]), np.sin(yaw[f, m])
+            out[f] |= (np.abs(c * d[..., 0] + s * d[..., 1]) <= half[f, m, 0]) \
+                & (np.abs(c * d[..., 1] - s * d[..., 0]) <= half[f, m, 1])
+    return out
+
+
+def test_rasterize_boxes_matches_per_cell_reference():
+    rng = np.random.default_rng(0)
+    grid = BevGrid((-20.0, 20.0), (-10.0, 10.0), 0.25)
+    centers = rng.uniform(-22, 22, size=(12, 8, 2))      # some boxes cross the border
+    half = rng.uniform(0.3, 3.0, size=(12, 8, 2))
+    yaw = rng.uniform(-np.pi, np.pi, size=(12, 8))
+    valid = rng.random((12, 8)) > 0.2
+    occupancy = rasterize_boxes(centers, half, yaw, valid, grid)
+    assert occupancy.shape == (12, 80, 160)
+    np.testing.assert_array_equal(occupancy, _reference(centers, half, yaw, valid, grid))
+
+
+def test_rasterize_frames_in_sender_frame():
+    grid = BevGrid((-10.0, 10.0), (-10.0, 10.0), 0.5)
+    # CAV at (100, 50) facing +y; object 5 m ahead of it, parallel to it
+    cpm = make_cpm((100.0, 50.0, 90.0), {1: make_vehicle(100.0, 55.0, yaw=90.0, extent=(2.0, 1.0, 1.0))})
+    cpm["vehicles"][1]["center"] = [0.0, 0.0, 0.0]
+    occupancy = rasterize_frames([cpm], grid)[0]
+    rows, cols = np.nonzero(occupancy)
+    assert occupancy.sum() == 8 * 4
+    x = grid.x_range[0] + (cols + 0.5) * grid.resolution
+    y = grid.y_range[0] + (rows + 0.5) * grid.resolution
+    assert (x.min(), x.max(), y.min(), y.max()) == (3.25, 6.75, -0.75, 0.75)
+
+
+def test_occupancy_diff():
+    raw = make_cpm((0.0, 0.0), {1: make_vehicle(10.0, 0.0), 2: make_vehicle(-10.0, 5.0)})
+    moved = make_cpm((0.0, 0.0), {1: make_vehicle(11.0, 0.0), 2: make_vehicle(-10.0, 5.0)})
+    ghost = make_cpm((0.0, 0.0), {**raw["vehicles"], 3: make_vehicle(30.0, 0.0)})
+
+    diff = compare_frames([raw, raw, raw], [raw, moved, ghost], chunk_size=2)
+    raw_cells, ghost_cells = rasterize_frames([raw, ghost]).sum(axis=(1, 2))
+    np.testing.assert_allclose(diff["iou"][[0, 2]], [1.0, raw_cells / ghost_cells])
+    assert 0.5 < diff["iou"][1] < 1.0
+    np.testing.assert_array_equal(diff["removed"][[0, 2]], [0, 0])
+    assert diff["added"][1] > 0 and diff["removed"][1] > 0
+    assert diff["added"][2] == ghost_cells - raw_cells > 0
+
+    assert occupancy_iou(raw, moved) == diff["iou"][1]
+    np.testing.assert_array_equal(evaluate_frames([raw, raw], [moved, ghost], ["occupancy_iou"])["occupancy_iou"],
+                                  diff["iou"][1:])
+
+    grids = rasterize_frames([raw, moved])
+    image = diff_image(grids[0], grids[1])
+    assert image.shape == grids.shape[1:] + (3,)
+    assert (image == (40, 170, 40)).all(axis=-1).sum() == diff["added"][1]
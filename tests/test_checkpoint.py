@@ -0,0 +1,114 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from advercpm.data.archive import ShardReader
+from advercpm.simulation import runner
+from advercpm.simulation.checkpoint import CHECKPOINT_NAME, Checkpointer
+from advercpm.simulation.warehouse import WAREHOUSE_FILE, Warehouse
+from helpers import make_run_config, write_scenario
+
+
+def _config(cfg, mode):
+    cfg.attack.parameters.mode = "biased"          # random draws must survive the restart
+    cfg.data.output_mode = mode
+    cfg.checkpoint.enabled = True
+    cfg.checkpoint.every_frames = 3
+    return cfg
+
+
+def _outputs(root, mode):
+    if mode == "sharded":
+        with ShardReader(root) as reader:
+            return {key: reader.read_bytes(key) for key in reader.keys()}
+    return {str(p.relative_to(root)): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+@pytest.mark.parametrize("mode", ["files", "sharded"])
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch, mode):
+    scenario = write_scenario(tmp_path / "raw", n_frames=8)
+    runner.run(_config(make_run_config(scenario, tmp_path, "full"), mode), tmp_path)
+
+    # interrupt while attacking the last vehicle, between two checkpoints
+    parse_yaml = _interrupt_after(monkeypatch, 20)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(_config(make_run_config(scenario, tmp_path, "resumed"), mode), tmp_path)
+    checkpoint = tmp_path / "resumed" / scenario.name / CHECKPOINT_NAME
+    assert checkpoint.exists()
+
+    monkeypatch.setattr(runner, "parse_yaml", parse_yaml)
+    cfg = _config(make_run_config(scenario, tmp_path, "resumed"), mode)
+    cfg.checkpoint.resume = True
+    runner.run(cfg, tmp_path)
+    assert not checkpoint.exists()
+
+    full = _outputs(tmp_path / "full" / scenario.name, mode)
+    resumed = _outputs(tmp_path / "resumed" / scenario.name, mode)
+    assert full == resumed
+    summary = "summary_drift_baseline.json"
+    assert json.loads((tmp_path / "full_results" / summary).read_text()) == \
+        json.loads((tmp_path / "resumed_results" / summary).read_text())
+
+
+def test_checkpoints_count_frames_not_files(tmp_path, monkeypatch):
+    scenario = write_scenario(tmp_path / "raw", n_frames=8)        # 3 vehicles x 8 frames (YAML + PCD each)
+    saved = []
+    monkeypatch.setattr(Checkpointer, "save",
+                        lambda self, state: saved.append(state["progress"].next_file))
+    runner.run(_config(make_run_config(scenario, tmp_path, "out"), "files"), tmp_path)
+    assert saved == [6, 12, 2, 8, 14, 4, 10, 16]    # every 3 frames, at frame boundaries
+
+
+def _interrupt_after(monkeypatch, n):
+    parse_yaml = runner.parse_yaml
+    calls = {"n": 0}
+
+    def flaky_parse(path):
+        calls["n"] += 1
+        if calls["n"] > n:
+            raise KeyboardInterrupt
+        return parse_yaml(path)
+
+    monkeypatch.setattr(runner, "parse_yaml", flaky_parse)
+    return parse_yaml
+
+
+def test_resume_refuses_changed_config(tmp_path, monkeypatch):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    parse_yaml = _interrupt_after(monkeypatch, 4)
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(_config(make_run_config(scenario, tmp_path, "out"), "files"), tmp_path)
+    monkeypatch.setattr(runner, "parse_yaml", parse_yaml)
+
+    cfg = _config(make_run_config(scenario, tmp_path, "out"), "files")
+    cfg.checkpoint.resume = True
+    cfg.attack.parameters.drift_rate = 2.0
+    with pytest.raises(ValueError, match="different configuration"):
+        runner.run(cfg, tmp_path)
+
+
+def test_resumed_runs_report_whole_run_timings(tmp_path, monkeypatch):
+    # every parsed YAML takes one (fake) second
+    clock = [0.0]
+    monkeypatch.setattr(runner, "time", SimpleNamespace(perf_counter=lambda: clock[0]))
+    parse_yaml = runner.parse_yaml
+
+    def timed_parse(path):
+        clock[0] += 1.0
+        return parse_yaml(path)
+
+    monkeypatch.setattr(runner, "parse_yaml", timed_parse)
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)        # 3 vehicles x 4 frames
+    _interrupt_after(monkeypatch, 10)                               # inside the last vehicle
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(_config(make_run_config(scenario, tmp_path, "out"), "files"), tmp_path)
+    monkeypatch.setattr(runner, "parse_yaml", timed_parse)
+
+    cfg = _config(make_run_config(scenario, tmp_path, "out"), "files")
+    cfg.checkpoint.resume = True
+    runner.run(cfg, tmp_path)
+    with Warehouse(tmp_path / "out_results" / WAREHOUSE_FILE) as store:
+        perf, = [r["perf"] for r in store.runs()]
+    assert perf["resumed"]
+    assert (perf["total_s"], perf["vehicle_s"]) == (12.0, 4.0)        # as if never interrupted
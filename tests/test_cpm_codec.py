@@ -0,0 +1,110 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from advercpm.data.cpm_codec import (
+    HEADER_SIZE,
+    OBJECT_SIZE,
+    decode_frame,
+    encode_frame,
+    encode_frames,
+    message_sizes,
+    size_summary,
+)
+from advercpm.data.archive import ShardReader
+from advercpm.data.cpm_model import CpmFrame
+from advercpm.simulation import runner
+from advercpm.simulation.channel_load import compare_channel_load, scenario_message_sizes
+from advercpm.utils.file_ops import parse_yaml, save_yaml
+from helpers import make_cpm, make_run_config, make_vehicle, write_scenario
+
+
+def _frames(n=4):
+    return [
+        make_cpm((100.0 + k, -20.0, 30.0), {
+            1000 + j: make_vehicle(110.0 + 3 * j + k, -18.0 - j, yaw=-170.0 + 25 * j, speed=36.0)
+            for j in range(k + 1)
+        }, ego_speed=42.5)
+        for k in range(n)
+    ]
+
+
+def test_round_trip_within_quantization():
+    cpm = _frames()[-1]
+    decoded = decode_frame(encode_frame(cpm))
+
+    np.testing.assert_allclose(decoded["lidar_pose"], cpm["lidar_pose"], atol=0.05)
+    assert decoded["ego_speed"] == pytest.approx(42.5)
+    assert list(decoded["vehicles"]) == list(cpm["vehicles"])
+    for vid, v in cpm["vehicles"].items():
+        d = decoded["vehicles"][vid]
+        np.testing.assert_allclose(d["location"], v["location"], atol=0.005)
+        np.testing.assert_allclose(d["extent"], v["extent"], atol=0.005)
+        yaw_err = (d["angle"][1] - v["angle"][1] + 180.0) % 360.0 - 180.0
+        assert abs(yaw_err) <= 0.05
+
+
+def test_batch_matches_single_and_sizes():
+    frames = _frames()
+    messages = encode_frames(frames)
+    assert messages == [encode_frame(f) for f in frames]
+    assert encode_frames([CpmFrame.from_dict(f) for f in frames]) == messages
+    sizes = message_sizes(frames)
+    assert sizes.tolist() == [len(m) for m in messages]
+    assert sizes.tolist() == [HEADER_SIZE + OBJECT_SIZE * (k + 1) for k in range(4)]
+
+    summary = size_summary(sizes, frame_period=0.1)
+    assert summary["total_bytes"] == sum(sizes)
+    assert summary["bitrate_bps"] == pytest.approx(np.mean(sizes) * 80.0)
+
+
+def test_integer_valued_fields_are_encoded():
+    cpm = make_cpm((0.0, 0.0), {5: make_vehicle(4.0, 1.0)})
+    cpm["vehicles"][5]["speed"] = 7            # ints make the object "irregular"
+    decoded = decode_frame(encode_frame(CpmFrame.from_dict(cpm)))
+    assert decoded["vehicles"][5]["speed"] == 7.0
+    assert decoded["vehicles"][5]["location"][:2] == [4.0, 1.0]
+
+
+def test_rejects_non_integer_ids_and_truncation():
+    with pytest.raises(ValueError):
+        encode_frame(make_cpm((0.0, 0.0), {"ghost": make_vehicle(1.0, 1.0)}))
+    message = encode_frame(_frames()[1])
+    with pytest.raises(ValueError):
+        decode_frame(message[:-1])
+
+
+def test_compare_channel_load(tmp_path):
+    raw = write_scenario(tmp_path / "raw", n_frames=3)
+    adv = tmp_path / "adv" / raw.name
+    shutil.copytree(raw, adv)
+    frame = sorted((adv / "650").glob("*.yaml"))[0]
+    cpm = parse_yaml(frame)
+    cpm["vehicles"][9999] = make_vehicle(1.0, 2.0)
+    save_yaml(cpm, str(frame))
+
+    report = compare_channel_load(raw, adv)
+    assert set(report) == {"641", "650", "659"}
+    assert report["641"]["overhead_bytes"] == 0
+    assert report["650"]["overhead_bytes"] == OBJECT_SIZE
+    assert report["650"]["attacked"]["messages"] == 3
+
+
+def test_channel_load_reads_sharded_output(tmp_path):
+    raw = write_scenario(tmp_path / "raw", n_frames=3)
+    cfg = make_run_config(raw, tmp_path)
+    cfg.data.output_mode = "sharded"
+    cfg.evaluation.enabled = False
+    runner.run(cfg, tmp_path)
+
+    adv = tmp_path / "adv" / raw.name
+    sizes = scenario_message_sizes(adv)
+    assert sorted(sizes) == [641, 650, 659]
+    with ShardReader(adv) as reader:
+        for vid, found in sizes.items():
+            expected = message_sizes([reader.read_yaml(k) for k in reader.vehicle_frames(vid)])
+            np.testing.assert_array_equal(found, expected)
+    raw_sizes = scenario_message_sizes(raw)
+    assert all(len(raw_sizes[vid]) == 3 for vid in sizes)
+    np.testing.assert_array_equal(raw_sizes[641], sizes[641])
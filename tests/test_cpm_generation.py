@@ -0,0 +1,55 @@
+import numpy as np
+
+from advercpm.simulation.cpm_generation import (
+    CpmGenerationFilter,
+    GenerationParams,
+    generation_mask,
+    pack_objects,
+)
+from helpers import make_cpm, make_vehicle
+
+
+def _sequence(n=12):
+    frames = []
+    for k in range(n):
+        frames.append(make_cpm((0.0, 0.0), {
+            1000: make_vehicle(10.0, 0.0),                      # parked
+            1001: make_vehicle(20.0 + 1.5 * k, 5.0, speed=54.0),  # 15 m/s
+            1002: make_vehicle(-10.0, 3.0, yaw=5.0 * k),        # turning on the spot
+        }))
+    return frames
+
+
+def test_inclusion_rules():
+    frames = _sequence()
+    sent = [set(f["vehicles"]) for f in CpmGenerationFilter().apply_frames(frames)]
+
+    assert sent[0] == {1000, 1001, 1002}          # first detection
+    # parked car: only re-sent after max_interval (1 s = 10 frames)
+    assert [k for k, s in enumerate(sent) if 1000 in s] == [0, 10]
+    # 1.5 m per frame: past 4 m every third frame
+    assert [k for k, s in enumerate(sent) if 1001 in s] == [0, 3, 6, 9]
+    # 5 deg per frame: past 4 deg every frame
+    assert all(1002 in s for s in sent)
+
+
+def test_streaming_matches_whole_sequence():
+    frames = _sequence()
+    # drop an object for a few frames to exercise appearing / reappearing ids
+    for f in frames[4:7]:
+        del f["vehicles"][1000]
+    whole = CpmGenerationFilter().apply_frames(frames)
+    stream = CpmGenerationFilter()
+    streamed = [stream.apply(f) for f in frames]
+    assert [set(f["vehicles"]) for f in streamed] == [set(f["vehicles"]) for f in whole]
+    assert stream.stats()[1] == sum(len(f["vehicles"]) for f in whole)
+    assert len(frames[0]["vehicles"]) == 3       # input not modified
+
+
+def test_generation_mask_explicit_times():
+    frames = _sequence(n=3)
+    ids, present, position, speed, heading = pack_objects(frames)
+    include = generation_mask(present, position, speed, heading, GenerationParams(),
+                              times=np.array([0.0, 1.0, 2.0]))
+    # one second between frames: everything is re-sent every frame
+    assert include.all()
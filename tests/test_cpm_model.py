@@ -0,0 +1,81 @@
+import copy
+
+import numpy as np
+
+from advercpm.attacks.add_object import AddObjectAttack
+from advercpm.attacks.drift import DriftAttack
+from advercpm.attacks.white_noise import WhiteNoiseAttack
+from advercpm.data.cpm_model import CpmFrame
+from advercpm.data.frame_buffer import FrameRingBuffer
+from helpers import make_frame
+
+
+def test_roundtrip_is_lossless():
+    cpm = make_frame()
+    cpm["vehicles"][700] = {"location": [1, 2, 3], "note": "irregular"}
+    cpm["vehicles"][701] = copy.deepcopy(cpm["vehicles"][600])
+    cpm["vehicles"][701]["speed"] = 0
+    frame = CpmFrame.from_dict(copy.deepcopy(cpm))
+
+    assert frame.to_dict() == cpm
+    assert list(frame.to_dict()["vehicles"]) == list(cpm["vehicles"])
+    assert type(frame.to_dict()["vehicles"][701]["speed"]) is int
+    assert set(frame.irregular) == {700, 701}
+    assert CpmFrame.from_dict({"lidar_pose": [0.0]}).to_dict() == {"lidar_pose": [0.0]}
+
+
+def test_object_views_write_through():
+    frame = CpmFrame.from_dict(make_frame())
+    obj = frame[602]
+    obj.location[0] += 1.0
+    obj.speed = 9.0
+    assert frame.to_dict()["vehicles"][602]["location"][0] == 7.0
+    assert frame.to_dict()["vehicles"][602]["speed"] == 9.0
+
+    frame.remove(600)
+    frame.add(9999, frame[601].to_dict())
+    assert frame.ids == [601, 602, 603, 604, 9999]
+    assert 600 not in frame
+
+
+def test_native_attacks_match_dict_path():
+    cpm = make_frame()
+    attacks = [
+        lambda: WhiteNoiseAttack({"sigma": 0.3, "apply_velocity": True}),
+        lambda: DriftAttack({"drift_rate": 0.4, "mode": "biased", "yaw_drift_deg_per_frame": 1.0}),
+    ]
+    for make in attacks:
+        dict_attack, frame_attack = make(), make()
+        np.random.seed(3)
+        expected = [dict_attack.apply(copy.deepcopy(cpm)) for _ in range(3)][-1]
+        np.random.seed(3)
+        frames = [frame_attack.apply(CpmFrame.from_dict(copy.deepcopy(cpm))) for _ in range(3)]
+        assert frames[-1].to_dict() == expected
+
+
+def test_dict_only_attack_accepts_frame():
+    cpm = make_frame()
+    params = {"ego_id": 600, "malicious_id": 601}
+    expected = AddObjectAttack(params).apply(copy.deepcopy(cpm))
+    result = AddObjectAttack(params).apply(CpmFrame.from_dict(cpm))
+    assert isinstance(result, CpmFrame)
+    assert result.to_dict() == expected
+
+
+def test_ring_buffer_keeps_last_frames():
+    buffer = FrameRingBuffer(capacity=3, max_objects=2)
+    frames = [CpmFrame.from_dict(make_frame(k + 1)) for k in range(5)]
+    for frame in frames:
+        buffer.push(frame)
+    nbytes = buffer.nbytes()
+
+    assert len(buffer) == 3 and buffer.full
+    assert buffer.get(0).to_dict() == frames[4].to_dict()
+    assert buffer.oldest().to_dict() == frames[2].to_dict()
+    # returned frames are independent of the buffer
+    buffer.get(0).data[:] = 0.0
+    assert buffer.get(0).to_dict() == frames[4].to_dict()
+
+    buffer.push(frames[0])
+    assert buffer.nbytes() == nbytes        # no growth once the largest frame fit
+    assert buffer.get(0).to_dict() == frames[0].to_dict()
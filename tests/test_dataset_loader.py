@@ -0,0 +1,86 @@
+import os
+
+import pytest
+from omegaconf import OmegaConf
+
+from advercpm.config.loader import RootCfg
+from advercpm.data import dataset_loader
+from advercpm.data.dataset_loader import AdversarialDataLoader
+from helpers import write_scenario
+
+
+def _cfg(sim_root, **simulation):
+    cfg = OmegaConf.structured(RootCfg)
+    cfg.data.simulation_path = str(sim_root)
+    cfg.attack.type = "drift"
+    cfg.attack.parameters = {"drift_rate": 1.0, "direction": "E"}
+    for key, value in simulation.items():
+        cfg.simulation[key] = value
+    return cfg
+
+
+def _flatten(loader):
+    return [s for batch in loader for s in batch]
+
+
+def test_batches_respect_size_and_max_frames(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=6)
+    loader = AdversarialDataLoader(_cfg(scenario.parent, batch_size=4, max_frames=5))
+    batches = list(loader)
+
+    assert len(loader) == len(batches) == 4          # 3 vehicles x 5 frames
+    assert [len(b) for b in batches] == [4, 4, 4, 3]
+    samples = [s for b in batches for s in b]
+    assert {s["frame"] for s in samples} == {f"{68 + 2 * k:06d}" for k in range(5)}
+
+    # drift accumulates along each vehicle's own frame sequence
+    first = [s for s in samples if s["vehicle_id"] == 641]
+    xs = [s["cpm"]["vehicles"][1000]["location"][0] for s in first]
+    assert xs == [5.0 + k + (k + 1) for k in range(5)]
+
+
+def test_workers_match_serial_and_shuffle_is_seeded(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    serial = _flatten(AdversarialDataLoader(_cfg(scenario.parent, batch_size=3, shuffle=True)))
+    parallel = _flatten(AdversarialDataLoader(
+        _cfg(scenario.parent, batch_size=3, shuffle=True, num_workers=2, prefetch_factor=1)
+    ))
+
+    key = lambda s: (s["vehicle_id"], s["frame"])  # noqa: E731
+    assert [key(s) for s in serial] == [key(s) for s in parallel]
+    assert [key(s) for s in serial] != sorted(key(s) for s in serial)
+    assert [s["cpm"] for s in serial] == [s["cpm"] for s in parallel]
+
+
+def test_only_selected_vehicles_are_attacked(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=2)
+    loader = AdversarialDataLoader(_cfg(scenario.parent, batch_size=16), attacked_ids=[650])
+    samples = _flatten(loader)
+    assert {s["vehicle_id"] for s in samples if s["attacked"]} == {650}
+    untouched = [s for s in samples if s["vehicle_id"] == 641]
+    assert untouched[0]["cpm"]["vehicles"][1000]["location"][0] == 5.0
+
+
+def test_random_draws_vary_by_epoch_not_by_workers(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+
+    def run(**simulation):
+        cfg = _cfg(scenario.parent, batch_size=5, shuffle=True, **simulation)
+        cfg.attack.parameters.mode = "biased"
+        loader = AdversarialDataLoader(cfg)
+        key = lambda s: (s["vehicle_id"], s["frame"])  # noqa: E731
+        return [{key(s): s["cpm"] for s in _flatten(loader)} for _ in range(2)]
+
+    serial = run()
+    assert serial[0] != serial[1]
+    assert run(num_workers=2, prefetch_factor=1) == serial
+    assert run(num_workers=3) == serial
+
+
+def test_dead_worker_fails_the_loader_instead_of_hanging(tmp_path, monkeypatch):
+    scenario = write_scenario(tmp_path / "raw", n_frames=2)
+    monkeypatch.setattr(dataset_loader, "WORKER_POLL_INTERVAL", 0.1)
+    monkeypatch.setattr(dataset_loader, "_load_sample", lambda *args: os._exit(3))   # e.g. OOM-killed
+    loader = AdversarialDataLoader(_cfg(scenario.parent, num_workers=2))
+    with pytest.raises(RuntimeError, match="exit code 3"):
+        list(loader)
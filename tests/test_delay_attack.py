@@ -0,0 +1,22 @@
+from advercpm.attacks.delay import DelayAttack
+from advercpm.data.cpm_model import CpmFrame
+from helpers import make_stream
+
+
+def test_objects_lag_behind_header():
+    attack = DelayAttack({"delay_frames": 3})
+    out = [attack.apply(cpm) for cpm in make_stream()]
+
+    xs = [cpm["vehicles"][1000]["location"][0] for cpm in out]
+    assert xs == [10.0, 10.0, 10.0, 10.0, 11.0, 12.0, 13.0, 14.0]
+    assert [cpm["lidar_pose"][0] for cpm in out] == [float(k) for k in range(8)]
+    assert attack.last_meta == {"lag_frames": 3}
+
+
+def test_message_scope_and_frames():
+    stream = make_stream()
+    attack = DelayAttack({"delay_frames": 2, "scope": "message"})
+    out = [attack.apply(CpmFrame.from_dict(cpm)) for cpm in stream]
+    assert all(isinstance(f, CpmFrame) for f in out)
+    assert out[-1].to_dict() == stream[-3]
+    assert attack.buffer.capacity == 3
@@ -6,6 +6,7 @@ from tqdm import tqdm
 
 from advercpm.utils.file_ops import parse_yaml
 from advercpm.attacks.drift import DriftAttack
+from helpers import make_cpm, make_vehicle
 
 
 def run_drift_experiment(sim_path: str, drift_rate: float, direction: str = "NE", malicious_id: int = 650):
@@ -87,3 +88,16 @@ def test_drift_attack_multi_rates(sim_path):
     plt.grid(True)
     plt.tight_layout()
     plt.show()
+
+
+def test_yaw_drift_targets_yaw_index():
+    cpm = make_cpm((0.0, 0.0), {600: make_vehicle(5.0, 0.0, yaw=10.0)})
+    out = DriftAttack({"drift_rate": 0.0, "yaw_drift_deg_per_frame": 2.0}).apply(cpm)
+    assert out["vehicles"][600]["angle"] == [0.0, 12.0, 0.0]
+
+
+def test_ego_relative_direction():
+    # sender heading +y: "N" (forward) in its frame is world +y
+    cpm = make_cpm((0.0, 0.0, 90.0), {600: make_vehicle(5.0, 0.0)})
+    out = DriftAttack({"drift_rate": 1.0, "direction": "N", "reference": "ego"}).apply(cpm)
+    np.testing.assert_allclose(out["vehicles"][600]["location"][:2], [5.0, 1.0], atol=1e-12)
@@ -0,0 +1,73 @@
+import copy
+
+import numpy as np
+import pytest
+
+from advercpm.attacks.add_object import AddObjectAttack
+from advercpm.attacks.burst import BurstAttack
+from advercpm.attacks.delay import DelayAttack
+from advercpm.attacks.drift import DriftAttack
+from advercpm.attacks.remove_object import RemoveObjectAttack
+from advercpm.attacks.white_noise import WhiteNoiseAttack
+from advercpm.data.overlay import FrameOverlay, materialize
+from helpers import make_frame
+
+
+ATTACKS = [
+    lambda: WhiteNoiseAttack({"sigma": 0.3, "apply_velocity": True}),
+    lambda: DriftAttack({"drift_rate": 0.5, "yaw_drift_deg_per_frame": 1.0, "mode": "biased"}),
+    lambda: BurstAttack({"lambda": 1.0}),
+    lambda: RemoveObjectAttack({"omitted_id": 602}),
+    lambda: AddObjectAttack({"ego_id": 600, "malicious_id": 601}),
+    lambda: DelayAttack({"delay_frames": 2}),
+]
+
+
+@pytest.mark.parametrize("make", ATTACKS)
+def test_overlay_matches_in_place_attack(make):
+    base = make_frame()
+    pristine = copy.deepcopy(base)
+
+    np.random.seed(0)
+    expected = make().apply(copy.deepcopy(base))
+    np.random.seed(0)
+    result = materialize(make().apply(FrameOverlay(base)))
+
+    assert result == expected
+    assert base == pristine
+
+
+def test_unchanged_subtrees_are_shared():
+    base = make_frame()
+    overlay = FrameOverlay(base)
+    DriftAttack({"drift_rate": 1.0, "apply_to_all": False, "target_id": 603}).apply(overlay)
+    out = overlay.materialize()
+
+    assert out["vehicles"][603]["location"] != base["vehicles"][603]["location"]
+    assert out["vehicles"][600] is base["vehicles"][600]
+    assert out["vehicles"][603]["extent"] is base["vehicles"][603]["extent"]
+    assert out["lidar_pose"] is base["lidar_pose"]
+    assert FrameOverlay(base).materialize() is base
+
+
+def test_diff_and_mapping_behaviour():
+    base = make_frame()
+    overlay = FrameOverlay(base)
+    vehicles = overlay["vehicles"]
+    vehicles[601]["speed"] = 9.0
+    del vehicles[602]
+    vehicles[9999] = {"location": [1.0, 2.0, 3.0]}
+    overlay["vehicles"] = vehicles          # re-assigning the view is not a change
+    _ = overlay["true_ego_pos"]             # reads are not changes
+
+    assert len(vehicles) == 5 and 602 not in vehicles and list(vehicles)[-1] == 9999
+    diff = {path: (old, new) for path, old, new in overlay.diff()}
+    assert diff == {
+        ("vehicles", 601, "speed"): (1.5, 9.0),
+        ("vehicles", 602): (base["vehicles"][602], None),
+        ("vehicles", 9999): (None, {"location": [1.0, 2.0, 3.0]}),
+    }
+    with pytest.raises(KeyError):
+        del vehicles[602]
+    overlay.compact()
+    assert overlay.modified
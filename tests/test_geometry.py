@@ -0,0 +1,142 @@
+import numpy as np
+
+from advercpm.utils.geometry import (
+    box_corners_bev,
+    box_iou_3d,
+    box_iou_bev,
+    boxes_from_vehicles,
+    boxes_overlap_bev,
+    segments_hit_boxes,
+)
+from helpers import make_vehicle
+
+
+def test_boxes_from_vehicles_uses_degrees_and_center_offset():
+    v = make_vehicle(10.0, 0.0, yaw=90.0)
+    v["center"] = [1.0, 0.0, 0.8]
+    ids, centers, half, yaw = boxes_from_vehicles({7: v})
+    assert ids == [7]
+    np.testing.assert_allclose(yaw, [np.pi / 2])
+    np.testing.assert_allclose(centers, [[10.0, 1.0]], atol=1e-12)
+    np.testing.assert_allclose(half, [[2.4, 1.0]])
+
+    _, centers, half, _ = boxes_from_vehicles({7: v}, with_height=True)
+    np.testing.assert_allclose(centers, [[10.0, 1.0, 0.8]], atol=1e-12)
+    np.testing.assert_allclose(half, [[2.4, 1.0, 0.8]])
+    assert boxes_from_vehicles({}, with_height=True)[1].shape == (0, 3)
+
+
+def test_box_corners_rotated():
+    corners = box_corners_bev(np.zeros((1, 2)), np.array([[2.0, 1.0]]), np.array([np.pi / 2]))
+    np.testing.assert_allclose(corners[0], [[-1, 2], [-1, -2], [1, -2], [1, 2]], atol=1e-12)
+
+
+def test_segments_hit_boxes():
+    centers = np.array([[5.0, 0.0], [5.0, 10.0]])
+    half = np.array([[1.0, 1.0], [1.0, 1.0]])
+    yaw = np.array([0.0, np.pi / 4])
+    origins = np.zeros((4, 2))
+    targets = np.array([
+        [10.0, 0.0],    # straight through box 0
+        [3.0, 0.0],     # stops short of box 0
+        [10.0, 20.0],   # through the rotated box 1
+        [0.0, 10.0],    # parallel to x, misses both
+    ])
+    hits = segments_hit_boxes(origins, targets, centers, half, yaw)
+    assert hits.tolist() == [[True, False], [False, False], [False, True], [False, False]]
+
+
+def test_boxes_overlap_bev():
+    a = np.array([[0.0, 0.0]])
+    half = np.array([[2.0, 1.0]])
+    b = np.array([[3.5, 0.0], [0.0, 2.5], [3.0, 3.0]])
+    half_b = np.array([[2.0, 1.0]] * 3)
+    yaw_b = np.array([0.0, 0.0, np.pi / 4])
+    overlap = boxes_overlap_bev(a, half, np.zeros(1), b, half_b, yaw_b)
+    assert overlap.tolist() == [[True, False, False]]
+
+
+def _clip(subject, clip):
+    """Sutherland-Hodgman: ``subject`` polygon clipped by convex CCW ``clip``."""
+    out = [tuple(p) for p in subject]
+    for k in range(len(clip)):
+        (x1, y1), (x2, y2) = clip[k], clip[(k + 1) % len(clip)]
+        side = [(x2 - x1) * (py - y1) - (y2 - y1) * (px - x1) for px, py in out]
+        kept = []
+        for idx, p in enumerate(out):
+            q, sq = out[idx - 1], side[idx - 1]
+            if side[idx] >= 0:
+                if sq < 0:
+                    kept.append(_lerp(q, p, sq / (sq - side[idx])))
+                kept.append(p)
+            elif sq >= 0:
+                kept.append(_lerp(q, p, sq / (sq - side[idx])))
+        out = kept
+        if not out:
+            break
+    return out
+
+
+def _lerp(p, q, t):
+    return (p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1]))
+
+
+def _area(poly):
+    return 0.5 * abs(sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(poly, poly[1:] + poly[:1])))
+
+
+def _reference_iou(a, b):
+    """3D IoU of two [x, y, z, yaw, hl, hw, hh] boxes, one pair at a time."""
+    ca = box_corners_bev(a[None, 0:2], a[None, 4:6], a[None, 3])[0]
+    cb = box_corners_bev(b[None, 0:2], b[None, 4:6], b[None, 3])[0]
+    inter = _area(_clip(ca, cb)) if len(_clip(ca, cb)) >= 3 else 0.0
+    height = max(0.0, min(a[2] + a[6], b[2] + b[6]) - max(a[2] - a[6], b[2] - b[6]))
+    area_a, area_b = 4 * a[4] * a[5], 4 * b[4] * b[5]
+    bev = inter / (area_a + area_b - inter)
+    vol = inter * height
+    return bev, vol / (2 * area_a * a[6] + 2 * area_b * b[6] - vol)
+
+
+def _random_boxes(rng, n, spread=6.0):
+    boxes = np.empty((n, 7))
+    boxes[:, 0:2] = rng.uniform(-spread, spread, size=(n, 2))
+    boxes[:, 2] = rng.uniform(0.0, 1.5, size=n)
+    boxes[:, 3] = rng.uniform(-np.pi, np.pi, size=n)
+    boxes[:, 4:7] = rng.uniform(0.3, 3.0, size=(n, 3))
+    return boxes
+
+
+def test_box_iou_known_values():
+    c, h = np.zeros((1, 2)), np.ones((1, 2))
+    square_45 = box_iou_bev(c, h, np.zeros(1), c, h, np.array([np.pi / 4]))
+    octagon = 8.0 * (np.sqrt(2.0) - 1.0)
+    np.testing.assert_allclose(square_45, [[octagon / (8.0 - octagon)]])
+    shifted = box_iou_bev(c, h, np.zeros(1), np.array([[1.0, 0.0], [2.0, 0.0], [0.0, 0.0]]),
+                          np.ones((3, 2)), np.array([0.0, 0.0, np.pi / 2]))
+    np.testing.assert_allclose(shifted, [[1 / 3, 0.0, 1.0]], atol=1e-12)
+
+    a = np.array([[0.0, 0.0, 1.0, 0.3, 2.0, 1.0, 1.0]])
+    b = a.copy()
+    b[0, 2] = 2.0                                    # half of the heights overlap
+    np.testing.assert_allclose(box_iou_3d(a, b), [[1.0 / 3.0]])
+
+
+def test_box_iou_matches_reference():
+    rng = np.random.default_rng(7)
+    a, b = _random_boxes(rng, 40), _random_boxes(rng, 30)
+    expected = np.array([[_reference_iou(x, y) for y in b] for x in a])
+    bev = box_iou_bev(a[:, 0:2], a[:, 4:6], a[:, 3], b[:, 0:2], b[:, 4:6], b[:, 3])
+    np.testing.assert_allclose(bev, expected[..., 0], atol=1e-9)
+    np.testing.assert_allclose(box_iou_3d(a, b), expected[..., 1], atol=1e-9)
+    assert (expected[..., 0] > 0).mean() > 0.2      # the sample does exercise overlaps
+
+
+def test_box_iou_batched_over_frames():
+    rng = np.random.default_rng(3)
+    a = _random_boxes(rng, 5 * 6).reshape(5, 6, 7)
+    b = _random_boxes(rng, 5 * 4).reshape(5, 4, 7)
+    batched = box_iou_3d(a, b)
+    assert batched.shape == (5, 6, 4)
+    for f in range(5):
+        np.testing.assert_array_equal(batched[f], box_iou_3d(a[f], b[f]))
+    assert box_iou_3d(a[:, :0], b).shape == (5, 0, 4)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from advercpm.utils import geometry, kernels, math_utils
+from advercpm.utils.geometry import points_in_boxes, segments_hit_boxes
+from advercpm.utils.math_utils import pose_to_matrix, transform_columns
+
+
+@pytest.fixture(params=["loops", "numba"])
+def loop_backend(request, monkeypatch):
+    """Run the loop kernels: compiled with numba, or as plain Python (same code, no numba needed)."""
+    if request.param == "numba":
+        pytest.importorskip("numba")
+        with kernels.use_backend("numba"):
+            yield
+    else:
+        for module in (geometry, math_utils):
+            monkeypatch.setattr(module, "jit_kernel", kernels._LOOPS.get)
+        yield
+
+
+def _numpy(fn, *args):
+    with kernels.use_backend("numpy"):
+        return fn(*args)
+
+
+def _cloud(n, dtype, seed=0):
+    cloud = np.zeros(n, dtype=[("x", dtype), ("y", dtype), ("z", dtype), ("intensity", "<f4")])
+    rng = np.random.default_rng(seed)
+    for name in ("x", "y", "z"):
+        cloud[name] = rng.uniform(-40, 40, size=n)
+    return cloud
+
+
+@pytest.mark.parametrize("dtype", ["<f4", "<f8"])
+def test_transform_columns_identical(loop_backend, dtype):
+    mat = pose_to_matrix(np.array([3.0, -2.0, 0.5, 1.0, 30.0, -2.0]))
+    cloud = _cloud(300, dtype)
+    expected = cloud.copy()
+    _numpy(transform_columns, expected["x"], expected["y"], expected["z"], mat)
+    transform_columns(cloud["x"], cloud["y"], cloud["z"], mat)
+    np.testing.assert_array_equal(cloud, expected)
+
+    xyz = np.stack([_cloud(300, dtype)[a] for a in "xyz"], axis=1).astype(float)
+    np.testing.assert_allclose(np.stack([expected[a] for a in "xyz"], axis=1),
+                               xyz @ mat[:3, :3].T + mat[:3, 3], rtol=1e-6, atol=1e-4)
+
+
+def test_points_in_boxes_identical(loop_backend):
+    cloud = _cloud(400, "<f4", seed=1)
+    boxes = np.array([[0.0, 0.0, 0.0, 0.3, 20.0, 10.0, 5.0],
+                      [5.0, 5.0, 0.0, -1.0, 15.0, 15.0, 30.0],
+                      [-30.0, 30.0, 0.0, 0.0, 8.0, 8.0, 40.0]])
+    expected = _numpy(points_in_boxes, cloud["x"], cloud["y"], cloud["z"], boxes)
+    np.testing.assert_array_equal(points_in_boxes(cloud["x"], cloud["y"], cloud["z"], boxes), expected)
+    assert set(np.unique(expected)) == {-1, 0, 1, 2}
+    # axis-aligned box: a plain crop
+    crop = _numpy(points_in_boxes, cloud["x"], cloud["y"], cloud["z"], [[0, 0, 0, 0, 10, 10, 10]]) == 0
+    np.testing.assert_array_equal(crop, (np.abs(cloud["x"]) <= 10) & (np.abs(cloud["y"]) <= 10)
+                                  & (np.abs(cloud["z"]) <= 10))
+    assert (_numpy(points_in_boxes, cloud["x"], cloud["y"], cloud["z"], np.zeros((0, 7))) == -1).all()
+
+
+def test_segments_hit_boxes_identical(loop_backend):
+    rng = np.random.default_rng(2)
+    origins = np.zeros((200, 2))
+    targets = rng.uniform(-30, 30, size=(200, 2))
+    targets[:10, 1] = 0.0                                   # axis-parallel rays
+    centers = rng.uniform(-20, 20, size=(12, 2))
+    centers[0] = (10.0, 0.0)
+    half = rng.uniform(1.0, 3.0, size=(12, 2))
+    yaw = rng.uniform(-np.pi, np.pi, size=12)
+    yaw[0] = 0.0
+    expected = _numpy(segments_hit_boxes, origins, targets, centers, half, yaw)
+    np.testing.assert_array_equal(segments_hit_boxes(origins, targets, centers, half, yaw), expected)
+    assert expected.any() and not expected.all()
+
+
+def test_backend_selection():
+    assert kernels.get_backend() in kernels.available_backends()
+    with pytest.raises(ValueError, match="Available backends"):
+        kernels.set_backend("cuda")
+    with kernels.use_backend("numpy"):
+        assert kernels.jit_kernel("points_in_boxes") is None
@@ -0,0 +1,59 @@
+import numpy as np
+
+from advercpm.utils.math_utils import (
+    box_corners,
+    euler_to_rotation,
+    invert_transform,
+    local_to_world,
+    pose_to_matrix,
+    rotation_to_euler,
+    world_to_local,
+    wrap_angle,
+)
+
+
+def test_rotation_round_trip_batched():
+    rng = np.random.RandomState(0)
+    angles = np.stack([rng.uniform(-60, 60, 50), rng.uniform(-179, 179, 50),
+                       rng.uniform(-60, 60, 50)], axis=1)
+    rot = euler_to_rotation(angles)
+    assert rot.shape == (50, 3, 3)
+    np.testing.assert_allclose(rot @ np.swapaxes(rot, -1, -2), np.broadcast_to(np.eye(3), rot.shape),
+                               atol=1e-12)
+    np.testing.assert_allclose(rotation_to_euler(rot), angles, atol=1e-9)
+
+
+def test_yaw_only_rotation_is_planar():
+    rot = euler_to_rotation([0.0, 90.0, 0.0])
+    np.testing.assert_allclose(rot @ [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], atol=1e-12)
+
+
+def test_world_local_round_trip():
+    pose = [10.0, -5.0, 1.9, 2.0, 30.0, -1.0]
+    points = np.random.RandomState(1).uniform(-50, 50, (100, 3))
+    local = world_to_local(points, pose)
+    np.testing.assert_allclose(local_to_world(local, pose), points, atol=1e-9)
+    # the CAV itself sits at the local origin
+    np.testing.assert_allclose(world_to_local([pose[:3]], pose), [[0.0, 0.0, 0.0]], atol=1e-12)
+
+    mat = pose_to_matrix(pose)
+    np.testing.assert_allclose(invert_transform(mat), np.linalg.inv(mat), atol=1e-12)
+
+
+def test_stacked_poses_broadcast():
+    poses = np.array([[0.0, 0.0, 0.0, 0.0, 0.0, 0.0], [5.0, 0.0, 0.0, 0.0, 90.0, 0.0]])
+    points = np.tile([[1.0, 0.0, 0.0]], (2, 1, 1))
+    out = local_to_world(points, poses)
+    np.testing.assert_allclose(out[:, 0], [[1.0, 0.0, 0.0], [5.0, 1.0, 0.0]], atol=1e-12)
+
+
+def test_box_corners():
+    corners = box_corners([[10.0, 0.0, 0.0]], [[2.0, 1.0, 0.5]], [[0.0, 90.0, 0.0]],
+                          centers=[[0.0, 0.0, 0.5]])
+    assert corners.shape == (1, 8, 3)
+    np.testing.assert_allclose(corners[0].min(axis=0), [9.0, -2.0, 0.0], atol=1e-12)
+    np.testing.assert_allclose(corners[0].max(axis=0), [11.0, 2.0, 1.0], atol=1e-12)
+
+
+def test_wrap_angle():
+    np.testing.assert_allclose(wrap_angle([190.0, -190.0, 45.0]), [-170.0, 170.0, 45.0])
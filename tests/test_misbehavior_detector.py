@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from advercpm.simulation.detector import MisbehaviorDetector, pack_frames
+from helpers import make_cpm, make_vehicle
+
+
+CAV_POSES = {1: (0.0, 0.0), 2: (10.0, 0.0), 3: (20.0, 0.0)}
+OBJECTS = {100: (5.0, 5.0), 101: (15.0, -5.0)}
+
+
+def build_frame(malicious=None):
+    """Every CAV reports the other CAVs and both objects; ``malicious`` lies."""
+    frame = {}
+    for cid, pose in CAV_POSES.items():
+        seen = {k: v for k, v in CAV_POSES.items() if k != cid}
+        seen.update(OBJECTS)
+        vehicles = {vid: make_vehicle(*xy) for vid, xy in seen.items()}
+        if cid == malicious:
+            vehicles[9999] = make_vehicle(30.0, 10.0)           # ghost
+            vehicles[101]["location"][0] += 2.0                    # drift
+            vehicles.pop(100)                                      # omission
+        frame[cid] = make_cpm(pose, vehicles)
+    return frame
+
+
+def test_honest_frame_is_clean():
+    result = MisbehaviorDetector().detect([build_frame()])
+    assert not result.ghost.any()
+    assert not result.drifted.any()
+    assert not result.missing.any()
+
+
+def test_detects_ghost_drift_and_missing():
+    frame = build_frame(malicious=3)
+    result = MisbehaviorDetector().detect([frame])
+    c = result.cav_ids.index(3)
+
+    flagged = result.object_ids[0, c]
+    assert set(flagged[result.ghost[0, c]]) == {9999}
+    assert set(flagged[result.drifted[0, c]]) == {101}
+    assert result.missing[0].tolist() == [0, 0, 1]
+
+    honest = [i for i, cid in enumerate(result.cav_ids) if cid != 3]
+    assert not result.ghost[0, honest].any()
+    assert not result.drifted[0, honest].any()
+    assert result.summary()[3] == {"objects": 4, "ghost": 1, "drifted": 1, "missing": 1}
+
+
+def test_pack_frames_pads_missing_cavs():
+    full = build_frame()
+    partial = {1: full[1]}
+    batch = pack_frames([full, partial])
+    assert batch.positions.shape == (2, 3, 4, 2)
+    assert batch.cav_valid.tolist() == [[True, True, True], [True, False, False]]
+    assert not batch.valid[1, 1:].any()
+
+
+def test_detector_throughput():
+    frames = [build_frame(malicious=3)] * 2000
+    detector = MisbehaviorDetector()
+    batch = pack_frames(frames)
+
+    start = time.perf_counter()
+    result = detector.detect_batch(batch)
+    elapsed = time.perf_counter() - start
+
+    assert result.ghost.sum() == 2000
+    assert np.all(result.missing[:, 2] == 1)
+    print(f"[RESULT] {len(frames) / elapsed:.0f} frames/s")
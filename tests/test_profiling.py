@@ -0,0 +1,50 @@
+import os
+import pstats
+import time
+
+from advercpm.utils.profiling import Profiler, StackSampler, worker_profiler
+
+
+def _busy(seconds=0.05):
+    end = time.perf_counter() + seconds
+    data = []
+    while time.perf_counter() < end:
+        data.append(list(range(100)))
+    return data
+
+
+def test_disabled_profiler_writes_nothing(tmp_path):
+    with Profiler({}, tmp_path, name="run") as profiler:
+        profiler.stage("x")
+        _busy(0.01)
+    assert not profiler.enabled
+    assert list(tmp_path.iterdir()) == []
+    assert "ADVERCPM_PROFILING" not in os.environ
+
+
+def test_all_hooks_write_into_out_dir(tmp_path):
+    cfg = {"cprofile": True, "tracemalloc": True, "sampler": True, "sample_interval": 0.001}
+    with Profiler(cfg, tmp_path, name="run") as profiler:
+        # child processes see the active settings
+        assert worker_profiler("worker").enabled
+        with profiler.section("load"):
+            keep = _busy()
+    del keep
+
+    stats = pstats.Stats(str(tmp_path / "run.prof"))
+    assert any(func[2] == "_busy" for func in stats.stats)
+    report = (tmp_path / "run_tracemalloc.txt").read_text()
+    assert "=== load:start" in report and "=== load:end" in report and "=== end" in report
+    stacks = (tmp_path / "run_stacks.txt").read_text().splitlines()
+    assert stacks and all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert "ADVERCPM_PROFILING" not in os.environ
+    assert not worker_profiler("worker").enabled
+
+
+def test_stack_sampler_counts_samples():
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    _busy()
+    sampler.stop()
+    assert sampler.samples > 0
+    assert any("_busy" in stack for stack in sampler.stacks)
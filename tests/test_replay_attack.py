@@ -0,0 +1,23 @@
+from advercpm.attacks.replay import ReplayAttack
+from helpers import make_stream
+
+
+def _xs(frames):
+    return [cpm["vehicles"][1000]["location"][0] for cpm in frames]
+
+
+def test_replays_recorded_window_in_a_loop():
+    attack = ReplayAttack({"record_frames": 3, "start_frame": 4})
+    out = [attack.apply(cpm) for cpm in make_stream(10)]
+
+    # frames 1..3 are recorded, replayed from frame 4 on
+    assert _xs(out) == [10.0, 11.0, 12.0, 13.0, 11.0, 12.0, 13.0, 11.0, 12.0, 13.0]
+    assert out[-1]["lidar_pose"][0] == 9.0
+    assert attack.last_meta == {"replayed_frame": 3}
+
+
+def test_single_pass_then_live():
+    attack = ReplayAttack({"record_frames": 2, "loop": False, "scope": "message"})
+    out = [attack.apply(cpm) for cpm in make_stream(6)]
+    assert _xs(out) == [10.0, 11.0, 10.0, 11.0, 14.0, 15.0]
+    assert out[2]["lidar_pose"][0] == 0.0
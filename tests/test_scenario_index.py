@@ -0,0 +1,63 @@
+import os
+
+import yaml
+
+from advercpm.data import scenario_index
+from advercpm.data.scenario_index import INDEX_FILE, ScenarioIndex, count_actors, load_index
+from advercpm.simulation import runner
+from helpers import make_cpm, make_run_config, make_vehicle, write_scenario
+
+
+def test_index_lists_scenario(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    index = load_index(scenario)
+    assert index.vehicle_ids == [641, 650, 659]
+    v = index.vehicles[650]
+    assert v.frames == ["000068", "000070", "000072", "000074"]
+    assert v.actors == [5, 5, 5, 5]                 # three objects + the two other CAVs
+    assert v.files == sorted(os.listdir(scenario / "650"))
+    assert v.sizes == [(scenario / "650" / name).stat().st_size for name in v.files]
+    assert [p.name for p in index.files(650, max_frames=2)] == \
+        ["000068.pcd", "000068.yaml", "000070.pcd", "000070.yaml"]
+    assert (scenario / INDEX_FILE).exists()
+
+
+def test_sidecar_reused_until_a_folder_changes(monkeypatch, tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=3)
+    load_index(scenario)
+    scenario_index._CACHE.clear()
+
+    stored = ScenarioIndex.read(scenario)
+    assert stored is not None and stored.is_fresh()
+    builds = []
+    build = ScenarioIndex.build
+    monkeypatch.setattr(ScenarioIndex, "build", classmethod(lambda cls, p: builds.append(p) or build(p)))
+    assert load_index(scenario).vehicles[641].frames == stored.vehicles[641].frames
+    assert builds == []
+
+    (scenario / "641" / "000099.yaml").write_text(yaml.dump({"vehicles": {}}))
+    assert load_index(scenario).vehicles[641].frames[-1] == "000099"
+    assert len(builds) == 1
+    scenario_index._CACHE.clear()
+    assert load_index(scenario).vehicles[641].actors[-1] == 0
+    assert len(builds) == 1                         # the rewritten sidecar is fresh again
+
+
+def test_count_actors_matches_parsed_yaml(tmp_path):
+    cpm = make_cpm((0.0, 0.0), {i: make_vehicle(i, 0.0) for i in range(7)})
+    path = tmp_path / "000001.yaml"
+    path.write_text(yaml.dump(cpm, default_flow_style=False))
+    assert count_actors(path) == 7
+
+
+def test_runner_honours_max_frames(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=5)
+    for use_index in (True, False):
+        out = tmp_path / f"adv_{use_index}"
+        cfg = make_run_config(scenario, tmp_path, out=out.name)
+        cfg.data.scenario_index = use_index
+        cfg.evaluation.enabled = False
+        cfg.simulation.max_frames = 2
+        runner.run(cfg, tmp_path)
+        assert sorted(os.listdir(out / scenario.name / "659")) == \
+            ["000068.pcd", "000068.yaml", "000070.pcd", "000070.yaml"]
@@ -0,0 +1,96 @@
+import csv
+
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from advercpm.data.dataset_loader import AdversarialDataLoader
+from advercpm.data.scenario_index import VehicleIndex, load_index
+from advercpm.simulation import runner
+from advercpm.simulation.schedule import activation_mask, compile_schedule
+from advercpm.simulation.search import AttackSearch
+from advercpm.simulation.service import AttackService
+from helpers import make_run_config, write_scenario
+
+
+def _vehicle(positions, speeds=None):
+    n = len(positions)
+    return VehicleIndex(dir_mtime=0, frames=[f"{68 + 2 * k:06d}" for k in range(n)], actors=[0] * n,
+                        positions=positions, speeds=speeds if speeds is not None else [0.0] * n)
+
+
+def test_windows_and_duty_cycle():
+    attacker = _vehicle([[0.0, 0.0, 0.0]] * 12)
+    mask = activation_mask(compile_schedule({"windows": [[1, 3], [8, None]]}), attacker)
+    assert np.flatnonzero(mask).tolist() == [1, 2, 8, 9, 10, 11]
+    mask = activation_mask(compile_schedule({"period": 4, "on_frames": 1, "phase": 2}), attacker)
+    assert np.flatnonzero(mask).tolist() == [2, 6, 10]
+    mask = activation_mask(compile_schedule({"period": 4, "on_frames": 2, "windows": [[0, 6]]}), attacker)
+    assert np.flatnonzero(mask).tolist() == [0, 1, 4, 5]
+    assert activation_mask(compile_schedule({"windows": [[0, 10]]}), attacker, max_frames=3).all()
+
+
+def test_ego_conditions_match_timestamps():
+    attacker = _vehicle([[30.0 - 5 * k, 0.0, 1.9] for k in range(6)])
+    ego = _vehicle([[0.0, 0.0, 1.9]] * 5 + [None], speeds=[10.0, 40.0, 40.0, 10.0, 40.0, 40.0])
+    ego.frames[2] = "000071"                  # no ego frame at the attacker's third timestamp
+    near = compile_schedule({"max_ego_distance": 16.0})
+    assert np.flatnonzero(activation_mask(near, attacker, ego)).tolist() == [3, 4]
+    fast_and_near = compile_schedule({"max_ego_distance": 26.0, "min_ego_speed": 30.0})
+    assert np.flatnonzero(activation_mask(fast_and_near, attacker, ego)).tolist() == [1, 4]
+    with pytest.raises(ValueError, match="ego"):
+        activation_mask(near, attacker)
+
+
+def test_invalid_schedules():
+    assert compile_schedule({}) is None
+    with pytest.raises(ValueError, match="unknown parameter"):
+        compile_schedule({"every": 2})
+    with pytest.raises(ValueError, match="windows"):
+        compile_schedule({"windows": [[1, 2, 3]]})
+    with pytest.raises(ValueError, match="on_frames"):
+        compile_schedule({"period": 2, "on_frames": 3})
+
+
+def test_index_records_frame_state(tmp_path):
+    index = load_index(write_scenario(tmp_path / "raw", n_frames=3))
+    assert index.vehicles[650].positions == [[10.0 + k, 0.0, 1.9] for k in range(3)]
+    assert index.vehicles[650].speeds == [36.0] * 3
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_runner_attacks_scheduled_frames_only(tmp_path, use_index):
+    scenario = write_scenario(tmp_path / "raw", n_frames=5)
+    out = tmp_path / "adv"
+    cfg = make_run_config(scenario, tmp_path, results="results")
+    cfg.data.scenario_index = use_index
+    cfg.attack.schedule = {"windows": [[1, 4]], "period": 2, "on_frames": 1, "min_ego_speed": 30.0}
+    runner.run(cfg, tmp_path)
+
+    changed = [p.name for p in sorted((scenario / "659").glob("*.yaml"))
+               if p.read_bytes() != (out / scenario.name / "659" / p.name).read_bytes()]
+    assert changed == ["000072.yaml"]
+    with open(tmp_path / "results" / "per_frame_drift_baseline.csv") as f:
+        assert len(list(csv.DictReader(f))) == 1
+
+
+def test_loader_attacks_scheduled_frames_only(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=5)
+    cfg = make_run_config(scenario, tmp_path)
+    cfg.attack.schedule = {"windows": [[1, 4]], "period": 2, "on_frames": 1}
+    samples = [s for batch in AdversarialDataLoader(cfg, attacked_ids=[659]) for s in batch]
+    assert [(s["vehicle_id"], s["frame"]) for s in samples if s["attacked"]] == [(659, "000072")]
+
+
+def test_search_and_service_honour_schedule(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=10)
+    attack_cfg = OmegaConf.create({"type": "drift", "parameters": {"direction": "E"},
+                                   "schedule": {"windows": [[0, 2]]}})
+    search_cfg = OmegaConf.create({"parameters": {"drift_rate": [0.0, 2.0]}, "tolerance": 0.01,
+                                   "metric": "trajectory_divergence", "target": 3.0, "n_workers": 1})
+    result = AttackSearch(attack_cfg, search_cfg, scenario, vehicle_id=650).run()
+    # drift accumulates over the two scheduled frames only (0.3 when every frame is attacked)
+    assert 1.5 <= result["best"]["drift_rate"] <= 1.51
+
+    with pytest.raises(ValueError, match="schedule"):
+        AttackService(attack_cfg)
@@ -0,0 +1,117 @@
+import io
+
+import numpy as np
+import pytest
+
+from advercpm.attacks.spoofing import SpoofingAttack
+from advercpm.data.archive import ShardReader
+from advercpm.data.lidar_reader import iter_pcd_chunks, read_pcd, read_pcd_header, transform_pcd
+from advercpm.simulation import runner
+from advercpm.utils.file_ops import parse_yaml
+from advercpm.utils.math_utils import local_to_world, pose_to_matrix
+from helpers import make_cpm, make_run_config, make_vehicle, write_scenario
+
+
+def _write_pcd(path, points, data="binary"):
+    header = (
+        "VERSION 0.7\nFIELDS x y z intensity\nSIZE 4 4 4 4\nTYPE F F F F\nCOUNT 1 1 1 1\n"
+        f"WIDTH {len(points)}\nHEIGHT 1\nVIEWPOINT 0 0 0 1 0 0 0\nPOINTS {len(points)}\nDATA {data}\n"
+    ).encode()
+    with open(path, "wb") as f:
+        f.write(header)
+        if data == "binary":
+            f.write(points.astype("<f4").tobytes())
+        else:
+            np.savetxt(f, points, fmt="%.9g")
+
+
+def _xyz(points):
+    return np.stack([points["x"], points["y"], points["z"]], axis=1).astype(float)
+
+
+@pytest.mark.parametrize("data", ["ascii", "binary"])
+def test_transform_pcd_in_chunks(tmp_path, data):
+    rng = np.random.default_rng(0)
+    cloud = rng.uniform(-50, 50, size=(1000, 4)).astype(np.float32)
+    _write_pcd(tmp_path / "in.pcd", cloud, data)
+    matrix = pose_to_matrix(np.array([3.0, -2.0, 0.5, 0.0, 30.0, 0.0]))
+
+    out = io.BytesIO()
+    assert transform_pcd(tmp_path / "in.pcd", out, matrix, chunk_points=64) == 1000
+    out.seek(0)
+    header = read_pcd_header(out)
+    assert header.data == data and header.points == 1000
+    moved = np.concatenate(list(iter_pcd_chunks(out, header)))
+    expected = cloud[:, :3].astype(float) @ matrix[:3, :3].T + matrix[:3, 3]
+    np.testing.assert_allclose(_xyz(moved), expected, atol=1e-4)
+    np.testing.assert_array_equal(moved["intensity"], cloud[:, 3])
+
+
+def test_world_anchor_keeps_scene_in_place():
+    attack = SpoofingAttack({"offset": [3.0, 1.0], "yaw_offset_deg": 10.0})
+    cpm = make_cpm((10.0, 5.0), {1: make_vehicle(20.0, 5.0)})
+    true_pose = np.asarray(cpm["lidar_pose"], dtype=float)
+    location = list(cpm["vehicles"][1]["location"])
+    out = attack.apply(cpm)
+
+    claimed = np.asarray(out["lidar_pose"])
+    assert np.linalg.norm(claimed[:2] - true_pose[:2]) == pytest.approx(np.hypot(3.0, 1.0))
+    assert claimed[4] == pytest.approx(true_pose[4] + 10.0)
+    assert out["vehicles"][1]["location"] == location
+    # points re-expressed in the claimed frame land on the same world points
+    points = np.random.default_rng(1).uniform(-20, 20, size=(50, 3))
+    m = attack.point_cloud_transform
+    np.testing.assert_allclose(local_to_world(points @ m[:3, :3].T + m[:3, 3], claimed),
+                               local_to_world(points, true_pose), atol=1e-9)
+
+
+def test_sensor_anchor_moves_objects_and_ramps():
+    attack = SpoofingAttack({"offset": [4.0, 0.0, 0.0], "reference": "world", "anchor": "sensor",
+                             "start_frame": 1, "ramp_frames": 2})
+    shifts = []
+    for _ in range(4):
+        cpm = make_cpm((0.0, 0.0), {1: make_vehicle(20.0, 5.0)})
+        out = attack.apply(cpm)
+        assert attack.point_cloud_transform is None
+        shifts.append(out["vehicles"][1]["location"][0] - 20.0)
+        assert out["lidar_pose"][0] - make_cpm((0.0, 0.0), {})["lidar_pose"][0] == \
+            pytest.approx(shifts[-1])
+    np.testing.assert_allclose(shifts, [0.0, 2.0, 4.0, 4.0], atol=1e-9)
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError, match="offset"):
+        SpoofingAttack({"offset": [1.0]})
+    with pytest.raises(ValueError, match="anchor"):
+        SpoofingAttack({"anchor": "nowhere"})
+
+
+@pytest.mark.parametrize("output_mode", ["files", "sharded"])
+def test_runner_streams_consistent_point_clouds(tmp_path, output_mode):
+    if output_mode == "sharded":
+        pytest.importorskip("zstandard")
+    scenario = write_scenario(tmp_path / "raw", n_frames=3)
+    out = tmp_path / "adv"
+    cfg = make_run_config(scenario, tmp_path)
+    cfg.attack.type = "spoofing"
+    cfg.attack.parameters = {"offset": [2.0, 1.0], "yaw_offset_deg": 15.0}
+    cfg.data.output_mode = output_mode
+    cfg.data.shard_compression = "zstd" if output_mode == "sharded" else None
+    cfg.evaluation.enabled = False
+    runner.run(cfg, tmp_path)
+
+    for stem in ("000068", "000072"):
+        raw_cpm = parse_yaml(scenario / "659" / f"{stem}.yaml")
+        _, raw_points = read_pcd(scenario / "659" / f"{stem}.pcd")
+        if output_mode == "files":
+            cpm = parse_yaml(out / scenario.name / "659" / f"{stem}.yaml")
+            _, points = read_pcd(out / scenario.name / "659" / f"{stem}.pcd")
+        else:
+            with ShardReader(out / scenario.name) as reader:
+                cpm = reader.read_yaml(f"659/{stem}.yaml")
+                payload = io.BytesIO(reader.read_bytes(f"659/{stem}.pcd"))
+            points = np.concatenate(list(iter_pcd_chunks(payload, read_pcd_header(payload))))
+        assert cpm["lidar_pose"] != raw_cpm["lidar_pose"]
+        np.testing.assert_allclose(local_to_world(_xyz(points), np.asarray(cpm["lidar_pose"])),
+                                   local_to_world(_xyz(raw_points), np.asarray(raw_cpm["lidar_pose"])),
+                                   atol=1e-4)
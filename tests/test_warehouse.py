@@ -0,0 +1,115 @@
+import csv
+
+import numpy as np
+import pytest
+
+from advercpm.simulation import runner
+from advercpm.simulation.warehouse import WAREHOUSE_FILE, Warehouse, main
+from advercpm.simulation.work_queue import WorkQueue, enqueue, process_item, report_item, run_worker
+from helpers import make_run_config, write_scenario
+
+
+def test_append_and_query(tmp_path):
+    with Warehouse(tmp_path / "w.sqlite") as store:
+        weak = store.append("weak", "h1", ["000068", "000070"],
+                            {"MSE_position": [0.1, 0.3], "object_count_diff": [0, 1]}, scenario="s",
+                            attacker=659, attack_type="drift", attack_params={"rate": 0.1})
+        strong = store.append("strong", "h2", ["000068", "000070"], {"MSE_position": [1.0, 3.0]},
+                              scenario="s", attacker=659, attack_type="drift", attack_params={"rate": 1.0})
+        store.append("other", "h3", ["000068"], {"MSE_position": [9.0]}, scenario="s", attack_type="delay")
+
+    with Warehouse(tmp_path / "w.sqlite") as store:            # reopened: rows persisted
+        assert [r["name"] for r in store.runs(attack_type="drift")] == ["weak", "strong"]
+        assert store.runs(config_hash="h1")[0]["attack_params"] == {"rate": 0.1}
+        ranked = store.compare("MSE_position", attack_type="drift")
+        assert [r["id"] for r in ranked] == [strong, weak]
+        assert ranked[0]["mean"] == pytest.approx(2.0) and ranked[0]["frames"] == 2
+        series = store.frame_metrics(weak)
+        assert series["frame"].tolist() == ["000068", "000070"]
+        np.testing.assert_allclose(series["object_count_diff"], [0, 1])
+        assert list(store.frame_metrics(weak, ["object_count_diff"])) == ["frame", "object_count_diff"]
+        with pytest.raises(ValueError, match="Unknown run filter"):
+            store.runs(drift_rate=1.0)
+
+
+def test_run_keys_and_journal_modes(tmp_path):
+    with Warehouse(tmp_path / "w.sqlite") as store:
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        first = store.append("a", "h", ["000068"], {"MSE_position": [1.0]}, run_key="item@0")
+        assert store.append("a", "h", ["000068"], {"MSE_position": [1.0]}, run_key="item@0") is None
+        store.append("a", "h", ["000068"], {"MSE_position": [1.0]}, run_key="item@1")
+        assert [r["run_key"] for r in store.runs()] == ["item@0", "item@1"]
+        assert len(store.frame_metrics(first)["frame"]) == 1
+    with Warehouse(tmp_path / "w.sqlite", journal_mode="wal") as store:
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pytest.raises(ValueError, match="journal mode"):
+        Warehouse(tmp_path / "w.sqlite", journal_mode="memory-ish")
+
+
+def _config(cfg, name, drift_rate):
+    cfg.experiment.name = name
+    cfg.attack.parameters.drift_rate = drift_rate
+    return cfg
+
+
+def test_runs_and_workers_append_to_one_store(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    for name, rate in (("slow", 0.1), ("fast", 1.0)):
+        runner.run(_config(make_run_config(scenario, tmp_path, name, results="results"), name, rate), tmp_path)
+    queue = WorkQueue(tmp_path / "q")
+    enqueue(_config(make_run_config(scenario, tmp_path, "queued", results="results"), "queued", 0.5), queue)
+    run_worker(queue, poll_interval=0.01)
+
+    with Warehouse(tmp_path / "results" / WAREHOUSE_FILE) as store:
+        runs = store.runs()
+        assert [r["name"] for r in runs] == ["slow", "fast", f"queued_{scenario.name}_659"]
+        assert len({r["config_hash"] for r in runs}) == 3
+        assert all(r["scenario"] == scenario.name and r["attacker"] == 659 for r in runs)
+        assert runs[1]["attack_params"]["drift_rate"] == 1.0
+        assert runs[0]["run_key"] is None and runs[2]["run_key"].endswith("659@0")
+        assert runs[0]["perf"]["files"] == 8 and runs[0]["perf"]["vehicle_s"] > 0
+        assert runs[0]["fusion"] is not None and runs[0]["config"]["experiment"]["name"] == "slow"
+        assert [r["name"] for r in store.compare("MSE_position")] == \
+            ["fast", f"queued_{scenario.name}_659", "slow"]
+
+        with open(tmp_path / "results" / "per_frame_slow.csv") as f:
+            rows = list(csv.DictReader(f))
+        stored = store.frame_metrics(runs[0]["id"])
+        assert stored["frame"].tolist() == [row["frame"] for row in rows]
+        np.testing.assert_allclose(stored["MSE_position"], [float(row["MSE_position"]) for row in rows])
+
+
+def test_rows_carry_effective_seed_and_are_keyed(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=2)
+    cfg = make_run_config(scenario, tmp_path, results="results")
+    cfg.attackers.select = "all"
+    runner.run(cfg, tmp_path)
+    queue = WorkQueue(tmp_path / "q")
+    enqueue(cfg, queue)
+    lease = queue.claim()
+    while not lease.item["malicious"]:
+        queue.complete(lease)
+        lease = queue.claim()
+    result = process_item(cfg, lease.item, lease)
+    for _ in range(2):                         # e.g. reported again after a retry
+        report_item(cfg, lease.item, result, run_key=f"{lease.id}@{lease.attempt}")
+
+    seed = cfg.experiment.seed
+    with Warehouse(tmp_path / "results" / WAREHOUSE_FILE) as store:
+        assert [(r["attacker"], r["seed"]) for r in store.runs()] == \
+            [(650, seed), (659, seed + 1), (lease.item["vehicle"], lease.item["seed"])]
+
+
+def test_every_run_is_recorded_and_missing_stores_are_not_created(tmp_path, monkeypatch):
+    cfg = make_run_config(write_scenario(tmp_path / "raw", n_frames=2), tmp_path, results="results")
+    cfg.evaluation.save_results = False
+    runner.run(cfg, tmp_path)
+    with Warehouse(tmp_path / "results" / WAREHOUSE_FILE) as store:
+        assert len(store.runs()) == 1
+    assert not list((tmp_path / "results").glob("summary_*"))
+
+    missing = tmp_path / "reslts" / WAREHOUSE_FILE
+    monkeypatch.setattr("sys.argv", ["advercpm-results", str(missing)])
+    with pytest.raises(SystemExit):
+        main()
+    assert not missing.parent.exists()
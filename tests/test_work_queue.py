@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import pytest
+
+from advercpm.simulation.runner import run
+from advercpm.simulation.work_queue import LeaseLost, WorkQueue, _publish, enqueue, run_worker
+from helpers import make_run_config, write_scenario
+
+
+def test_claim_complete_and_lost_lease(tmp_path):
+    queue = WorkQueue(tmp_path / "q", lease_seconds=0.05)
+    assert queue.put("a", {"n": 1})
+    assert not queue.put("a", {"n": 1})
+
+    lease = queue.claim()
+    assert lease.item == {"n": 1} and lease.attempt == 0
+    assert queue.claim() is None
+
+    time.sleep(0.1)
+    again = queue.claim()                # expired lease goes to another worker
+    assert again.id == "a" and again.attempt == 1
+    assert not lease.renew()
+    with pytest.raises(LeaseLost):
+        queue.complete(lease)
+    queue.complete(again)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
+    assert not queue.put("a", {"n": 1})
+
+
+def test_failures_are_retried_then_given_up(tmp_path):
+    queue = WorkQueue(tmp_path / "q", max_attempts=2)
+    queue.put("a", {})
+    assert queue.fail(queue.claim(), "boom") == "pending"
+    lease = queue.claim()
+    assert lease.attempt == 1
+    assert queue.fail(lease, "boom") == "failed"
+    assert queue.claim() is None
+    assert len(os.listdir(tmp_path / "q" / "errors")) == 2
+
+
+def test_concurrent_workers_claim_each_item_once(tmp_path):
+    queue = WorkQueue(tmp_path / "q")
+    queue.put_many({f"item{i}": {"i": i} for i in range(60)})
+    claimed = []
+
+    def worker():
+        q = WorkQueue(tmp_path / "q")
+        lease = q.claim()
+        while lease is not None:
+            claimed.append(lease.item["i"])
+            q.complete(lease)
+            lease = q.claim()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == list(range(60))
+    assert queue.counts()["done"] == 60
+
+
+def test_worker_output_matches_runner(tmp_path):
+    scenario = write_scenario(tmp_path / "raw", n_frames=4)
+    run(make_run_config(scenario, tmp_path, "serial"), tmp_path)
+
+    queue = WorkQueue(tmp_path / "q")
+    assert enqueue(make_run_config(scenario, tmp_path, "queued"), queue) == 3
+    assert enqueue(make_run_config(scenario, tmp_path, "queued"), queue) == 0
+    assert run_worker(queue, poll_interval=0.01) == 3
+
+    for vid in ("641", "650", "659"):
+        serial = sorted((tmp_path / "serial" / scenario.name / vid).iterdir())
+        queued = sorted((tmp_path / "queued" / scenario.name / vid).iterdir())
+        assert [p.name for p in serial] == [p.name for p in queued]
+        assert all(a.read_bytes() == b.read_bytes() for a, b in zip(serial, queued))
+    assert not [p for p in (tmp_path / "queued" / scenario.name).iterdir() if p.name.startswith(".")]
+
+
+def test_publish_replaces_earlier_output(tmp_path):
+    dst = tmp_path / "out" / "659"
+    for content in ("first", "second"):
+        src = tmp_path / "out" / f".staging-{content}"
+        src.mkdir(parents=True)
+        (src / "000068.yaml").write_text(content)
+        _publish(src, dst)
+    assert (dst / "000068.yaml").read_text() == "second"
+    assert os.listdir(tmp_path / "out") == ["659"]